@@ -0,0 +1,422 @@
+import argparse
+import csv
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations
+import numpy as np
+import torch
+from Azul import AzulGame, split_rng
+from AzulCompact import CompactAzulState
+from AzulDQN import DuelingDQN, select_actions
+from AzulEncoding import state_to_vector, encode_action, decode_action, legal_action_mask
+from AzulEnv import AzulEnv
+from MCTS import MCTS
+from NetworkMCTS import NetworkMCTS
+
+RESULT_FIELDS = ['game', 'seed', 'player0', 'player1', 'score0', 'score1', 'winner', 'moves0', 'moves1',
+                 'time0', 'time1', 'max_time0', 'max_time1', 'duration']
+
+
+class RandomAgent:
+    """
+    AzulGame.random_player.
+    """
+
+    def select_move(self, game, state, rng):
+        return game.random_player(state, rng)
+
+
+class MCTSAgent:
+    """
+    MCTS search with a fixed budget of simulations or seconds per move.
+    With anytime, the budget is an upper bound: the search stops as soon as
+    its best move is decided and plays the most visited move.
+
+    MCTS maximizes the result of player 0, so when the agent plays as player 1
+    it searches the state with the players swapped.
+    """
+
+    def __init__(self, num_simulations=None, simulation_seconds=None, anytime=False, **mcts_params):
+        self.num_simulations = num_simulations
+        self.simulation_seconds = simulation_seconds
+        self.anytime = anytime
+        self.mcts_params = mcts_params  # Keyword arguments of MCTS
+        self.mcts = None  # Built on the first move, in the worker process
+
+    def select_move(self, game, state, rng, max_seconds=None):
+        """
+        max_seconds caps the search time (e.g. a request deadline); the search then runs in anytime mode.
+        """
+        if self.mcts is None:
+            self.mcts = MCTS(game, **self.mcts_params)
+        self.mcts.random = rng
+        compact = CompactAzulState.from_state(state)
+        if state.current_player == 1:
+            compact = compact.swap_players()
+        if max_seconds is not None:
+            seconds = min(max_seconds, self.simulation_seconds or math.inf)
+            return self.mcts.search_anytime(compact, seconds, self.num_simulations, self.anytime).best_move
+        if self.anytime:
+            return self.mcts.search_anytime(compact, self.simulation_seconds, self.num_simulations).best_move
+        best_move, _ = self.mcts.search(compact, self.num_simulations, self.simulation_seconds)
+        return best_move
+
+
+class DQNAgent:
+    """
+    Greedy DuelingDQN policy, loaded from a notebook checkpoint (model_state_dict) or a TorchScript export.
+    """
+
+    def __init__(self, path=None, net=None):
+        self.path = path
+        self.net = net  # Loaded from path on the first move, in the worker process
+
+    def select_move(self, game, state, rng):
+        if self.net is None:
+            self.net = self._load(self.path)
+        legal_mask = legal_action_mask(game.get_legal_moves(state))
+        action = select_actions(self.net, state_to_vector(state)[None], legal_mask[None])[0]
+        return decode_action(int(action))
+
+    @staticmethod
+    def _load(path):
+        try:
+            return torch.jit.load(path, map_location='cpu')
+        except RuntimeError:
+            checkpoint = torch.load(path, map_location='cpu', weights_only=False)
+            net = DuelingDQN()
+            net.load_state_dict(checkpoint['model_state_dict'])
+            return net.eval()
+
+
+class NetworkMCTSAgent:
+    """
+    NetworkMCTS search with a fixed budget of simulations or seconds per move, guided by
+    a DuelingDQN loaded like DQNAgent's. The search plays either seat as it is.
+    """
+
+    def __init__(self, path=None, net=None, num_simulations=None, simulation_seconds=None, **search_params):
+        self.path = path
+        self.net = net
+        self.num_simulations = num_simulations
+        self.simulation_seconds = simulation_seconds
+        self.search_params = search_params  # Keyword arguments of NetworkMCTS
+        self.search = None  # Built on the first move, in the worker process
+
+    def select_move(self, game, state, rng):
+        if self.search is None:
+            self.search = NetworkMCTS(self.net if self.net is not None else DQNAgent._load(self.path),
+                                      **self.search_params)
+        best_move, _ = self.search.search(state, self.num_simulations, self.simulation_seconds)
+        return best_move
+
+
+def play_game(agents, seed):
+    """
+    Plays one game between agents[0] (player 0) and agents[1] (player 1) and returns its result row.
+
+    The seed fixes the tile draws and every random choice of the agents. The
+    draws and each seat have their own random stream, so the agents' choices
+    do not change the tiles drawn from the bag.
+    """
+
+    draw_rng, *seat_rngs = split_rng(random.Random(seed), 3)
+    env = AzulEnv(AzulGame(rng=draw_rng))
+    env.reset()
+    moves = [0, 0]
+    times = [0.0, 0.0]
+    max_times = [0.0, 0.0]
+    start_time = time.perf_counter()
+
+    done = False
+    while not done:
+        player = env.state.current_player
+        move_start = time.perf_counter()
+        move = agents[player].select_move(env.game, env.state, seat_rngs[player])
+        move_time = time.perf_counter() - move_start
+        moves[player] += 1
+        times[player] += move_time
+        max_times[player] = max(max_times[player], move_time)
+        _, _, done, _ = env.step(encode_action(*move))
+
+    scores = [player['score'] for player in env.state.players]
+    return {'seed': seed, 'score0': scores[0], 'score1': scores[1],
+            'winner': 0 if scores[0] > scores[1] else 1 if scores[1] > scores[0] else -1,
+            'moves0': moves[0], 'moves1': moves[1], 'time0': times[0], 'time1': times[1],
+            'max_time0': max_times[0], 'max_time1': max_times[1], 'duration': time.perf_counter() - start_time}
+
+
+_worker_agents = None  # Agents of the arena in a worker process
+
+
+def _init_worker(agents):
+    global _worker_agents
+    _worker_agents = agents
+
+
+def _play_task(task):
+    game_id, player0, player1, seed = task
+    row = {'game': game_id, 'player0': player0, 'player1': player1}
+    row.update(play_game((_worker_agents[player0], _worker_agents[player1]), seed))
+    row['winner'] = (player0, player1, '')[row['winner']]
+    return row
+
+
+class ResultWriter:
+    """
+    Streams result rows to a .csv file, or to a .parquet file (needs pyarrow) in row groups of row_group_size.
+    """
+
+    def __init__(self, path, fields=RESULT_FIELDS, row_group_size=256):
+        self.path = path
+        self.fields = fields
+        self.row_group_size = row_group_size
+        self.rows = []
+        self.pyarrow = None
+        if path.endswith('.parquet'):
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise ImportError("Writing Parquet results needs pyarrow; use a .csv path instead")
+            self.pyarrow = pyarrow
+            self.writer = None  # Opened with the schema of the first row group
+            self.file = None
+        else:
+            self.file = open(path, 'w', newline='')
+            self.writer = csv.DictWriter(self.file, fieldnames=fields)
+            self.writer.writeheader()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, row):
+        if self.file is not None:
+            self.writer.writerow(row)
+            self.file.flush()
+            return
+        self.rows.append(row)
+        if len(self.rows) >= self.row_group_size:
+            self._write_row_group()
+
+    def _write_row_group(self):
+        table = self.pyarrow.Table.from_pylist(self.rows)
+        if self.writer is None:
+            self.writer = self.pyarrow.parquet.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+        self.rows = []
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        elif self.pyarrow is not None:
+            if self.rows:
+                self._write_row_group()
+            if self.writer is not None:
+                self.writer.close()
+            self.pyarrow = None
+
+
+class Arena:
+    """
+    Round robin between named agents over a process pool.
+
+    Every pair plays games_per_pair games. Consecutive games share a seed and
+    swap seats, so both agents get the same tile draws from both seats, and
+    the seeds are the same for every pair.
+    """
+
+    def __init__(self, agents, num_workers=None, seed=0):
+        self.agents = agents  # Name -> agent with a select_move(game, state, rng) method
+        self.num_workers = num_workers or os.cpu_count()
+        self.seed = seed
+
+    def schedule(self, games_per_pair):
+        """
+        Returns the (game, player0, player1, seed) tasks of the tournament.
+        """
+        seeder = random.Random(self.seed)
+        seeds = [seeder.getrandbits(32) for _ in range((games_per_pair + 1) // 2)]
+        tasks = []
+        for first, second in combinations(self.agents, 2):
+            for game in range(games_per_pair):
+                player0, player1 = (first, second) if game % 2 == 0 else (second, first)
+                tasks.append((len(tasks), player0, player1, seeds[game // 2]))
+        return tasks
+
+    def run(self, games_per_pair, output=None):
+        """
+        Plays the tournament and returns the result rows ordered by game, writing each one to output
+        (a .csv or .parquet path) as soon as its game finishes.
+        """
+        tasks = self.schedule(games_per_pair)
+        writer = ResultWriter(output) if output is not None else None
+        rows = []
+        pool = None
+        try:
+            if self.num_workers == 1:
+                _init_worker(self.agents)
+                results = map(_play_task, tasks)
+            else:
+                pool = ProcessPoolExecutor(max_workers=self.num_workers, initializer=_init_worker,
+                                           initargs=(self.agents,))
+                results = (future.result() for future in as_completed([pool.submit(_play_task, task) for task in tasks]))
+            for row in results:
+                rows.append(row)
+                if writer is not None:
+                    writer.write(row)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            if writer is not None:
+                writer.close()
+        return sorted(rows, key=lambda row: row['game'])
+
+
+def wilson_interval(score, games, z=1.96):
+    """
+    Wilson confidence interval of a score rate (wins plus half the draws over games).
+    """
+
+    if not games:
+        return 0.0, 1.0
+    rate = score / games
+    denominator = 1 + z * z / games
+    center = (rate + z * z / (2 * games)) / denominator
+    half_width = z * math.sqrt(rate * (1 - rate) / games + z * z / (4 * games * games)) / denominator
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+
+def elo_difference(rate):
+    """
+    Elo difference that gives an expected score rate.
+    """
+
+    if rate <= 0:
+        return -math.inf
+    if rate >= 1:
+        return math.inf
+    return 400 * math.log10(rate / (1 - rate))
+
+
+def elo_ratings(rows, names, iterations=200):
+    """
+    Maximum likelihood (Bradley-Terry) Elo of every agent, with the first name at 0.
+
+    Each played pair gets one virtual draw, so an agent that never scores still has a finite rating.
+    """
+
+    index = {name: i for i, name in enumerate(names)}
+    games = np.zeros((len(names), len(names)))
+    scores = np.zeros((len(names), len(names)))
+    for row in rows:
+        i, j = index[row['player0']], index[row['player1']]
+        games[i, j] += 1
+        games[j, i] += 1
+        score = 1.0 if row['winner'] == row['player0'] else 0.0 if row['winner'] == row['player1'] else 0.5
+        scores[i, j] += score
+        scores[j, i] += 1 - score
+    played = games > 0
+    games += played
+    scores += 0.5 * played
+
+    strengths = np.ones(len(names))
+    totals = scores.sum(axis=1)
+    for _ in range(iterations):
+        # Minorization-maximization update of the Bradley-Terry strengths
+        strengths = totals / (games / (strengths[:, None] + strengths[None, :])).sum(axis=1)
+        strengths /= np.exp(np.log(strengths).mean())
+    ratings = 400 * np.log10(strengths)
+    return dict(zip(names, ratings - ratings[0]))
+
+
+def summarize(rows, names=None, bootstrap=200, seed=0):
+    """
+    Per-agent results (win rate, Elo with a bootstrap 95% interval, time per move) and
+    per-pair score rates with their Wilson intervals.
+    """
+
+    if names is None:
+        names = list(dict.fromkeys(name for row in rows for name in (row['player0'], row['player1'])))
+    agents = {name: {'games': 0, 'wins': 0, 'draws': 0, 'losses': 0, 'moves': 0, 'time': 0.0, 'max_time': 0.0}
+              for name in names}
+    pairs = {}
+    for row in rows:
+        for seat in (0, 1):
+            stats = agents[row[f'player{seat}']]
+            stats['games'] += 1
+            stats['moves'] += int(row[f'moves{seat}'])
+            stats['time'] += float(row[f'time{seat}'])
+            stats['max_time'] = max(stats['max_time'], float(row[f'max_time{seat}']))
+            if not row['winner']:
+                stats['draws'] += 1
+            elif row['winner'] == row[f'player{seat}']:
+                stats['wins'] += 1
+            else:
+                stats['losses'] += 1
+        first, second = sorted((row['player0'], row['player1']), key=names.index)
+        pair = pairs.setdefault((first, second), {'games': 0, 'score': 0.0})
+        pair['games'] += 1
+        pair['score'] += 1.0 if row['winner'] == first else 0.5 if not row['winner'] else 0.0
+
+    ratings = elo_ratings(rows, names)
+    rng = np.random.default_rng(seed)
+    samples = [elo_ratings([rows[i] for i in rng.integers(0, len(rows), len(rows))], names)
+               for _ in range(bootstrap)] if rows else []
+    for name, stats in agents.items():
+        stats['win_rate'] = (stats['wins'] + 0.5 * stats['draws']) / stats['games'] if stats['games'] else 0.0
+        stats['elo'] = ratings[name]
+        stats['elo_interval'] = tuple(np.percentile([sample[name] for sample in samples], [2.5, 97.5])) if samples else (0.0, 0.0)
+        stats['time_per_move'] = stats['time'] / stats['moves'] if stats['moves'] else 0.0
+
+    for (first, second), pair in pairs.items():
+        pair['rate'] = pair['score'] / pair['games']
+        pair['interval'] = wilson_interval(pair['score'], pair['games'])
+        pair['elo_difference'] = elo_difference(pair['rate'])
+    return {'agents': agents, 'pairs': pairs}
+
+
+def format_summary(summary):
+    lines = [f"{'agent':16s} {'games':>6s} {'W':>5s} {'D':>4s} {'L':>5s} {'score':>6s} {'elo':>7s} {'95% interval':>17s} {'ms/move':>8s} {'max ms':>8s}"]
+    for name, stats in summary['agents'].items():
+        low, high = stats['elo_interval']
+        lines.append(f"{name:16s} {stats['games']:6d} {stats['wins']:5d} {stats['draws']:4d} {stats['losses']:5d} "
+                     f"{stats['win_rate']:6.1%} {stats['elo']:7.0f} [{low:7.0f}, {high:7.0f}] "
+                     f"{stats['time_per_move'] * 1000:8.2f} {stats['max_time'] * 1000:8.1f}")
+    lines.append("")
+    for (first, second), pair in summary['pairs'].items():
+        low, high = pair['interval']
+        lines.append(f"{first} vs {second}: {pair['rate']:.1%} [{low:.1%}, {high:.1%}] over {pair['games']} games, "
+                     f"Elo difference {pair['elo_difference']:+.0f}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Round robin between random_player, MCTS budgets and a DQN checkpoint")
+    parser.add_argument('--games', type=int, default=20, help="Games per pair of agents")
+    parser.add_argument('--mcts', type=int, nargs='*', default=[200, 1000], help="MCTS budgets in simulations per move")
+    parser.add_argument('--dqn', help="DQN checkpoint (model.pth) or TorchScript export")
+    parser.add_argument('--puct', type=int, nargs='*', default=[], help="NetworkMCTS budgets with the --dqn network")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='arena.csv', help=".csv or .parquet file with one row per game")
+    args = parser.parse_args()
+
+    agents = {'random': RandomAgent()}
+    for budget in args.mcts:
+        agents[f'mcts-{budget}'] = MCTSAgent(num_simulations=budget)
+    if args.dqn:
+        agents['dqn'] = DQNAgent(args.dqn)
+        for budget in args.puct:
+            agents[f'puct-{budget}'] = NetworkMCTSAgent(args.dqn, num_simulations=budget)
+
+    arena = Arena(agents, num_workers=args.workers, seed=args.seed)
+    rows = arena.run(args.games, args.output)
+    print(format_summary(summarize(rows, list(agents))))
@@ -1,5 +1,68 @@
 import random
 
+TILE_ORDER = {'B': 0, 'Y': 1, 'R': 2, 'K': 3, 'W': 4}  # Order of the colors in a sorted bag
+
+
+# Scoring tables shared with CompactAzulGame. Walls are read as 25-bit masks (bit row * 5 + col).
+# Column of the wall where each color goes in each row: WALL_COLUMN[row][color]
+WALL_COLUMN = [[(color + row) % 5 for color in range(5)] for row in range(5)]
+
+# Completion masks over the 25-bit wall
+ROW_MASKS = [31 << (row * 5) for row in range(5)]
+COL_MASKS = [sum(1 << (row * 5 + col) for row in range(5)) for col in range(5)]
+COLOR_MASKS = [sum(1 << (row * 5 + WALL_COLUMN[row][color]) for row in range(5)) for color in range(5)]
+
+
+def _run_length(line_bits, index):
+    """
+    Length of the run of set bits through index in a 5-bit line.
+    """
+
+    length = 1
+    i = index + 1
+    while i < 5 and line_bits >> i & 1:
+        length += 1
+        i += 1
+    i = index - 1
+    while i >= 0 and line_bits >> i & 1:
+        length += 1
+        i -= 1
+    return length
+
+
+# RUN_LENGTH[line_bits][i]: tiles adjacent through cell i of a row (or column) holding line_bits
+RUN_LENGTH = [[_run_length(line_bits, i) for i in range(5)] for line_bits in range(32)]
+# PLACEMENT_SCORE[horizontal_run][vertical_run]: points for placing a tile with those runs
+PLACEMENT_SCORE = [[1 if h == 1 and v == 1 else (h if h > 1 else 0) + (v if v > 1 else 0)
+                    for v in range(6)] for h in range(6)]
+
+
+def line_mask(line):
+    """
+    5-bit mask of the filled cells of a row (or column) of a dict-based board.
+    """
+
+    return ((line[0] != '') | (line[1] != '') << 1 | (line[2] != '') << 2 | (line[3] != '') << 3
+            | (line[4] != '') << 4)
+
+
+def wall_mask(board):
+    """
+    25-bit mask (bit row * 5 + col) of the filled cells of a dict-based board.
+    """
+
+    return (line_mask(board[0]) | line_mask(board[1]) << 5 | line_mask(board[2]) << 10 | line_mask(board[3]) << 15
+            | line_mask(board[4]) << 20)
+
+
+def split_rng(rng, count):
+    """
+    Returns count independent random.Random streams seeded from rng, e.g. one per worker or per game.
+    """
+
+    return [random.Random(rng.getrandbits(64)) for _ in range(count)]
+
+
 class AzulState:
     def __init__(self, tiles, factories, player_boards, center, bag, discard, player, board_pattern):
         self.tiles = tiles  # Available tile colors
@@ -14,6 +77,41 @@ class AzulState:
         self.empty_floor = []  # Empty floor for penalties
         
 
+    def to_dict(self):
+        """
+        JSON-serializable copy of the state, e.g. to send it to MoveServer.
+        """
+
+        return {'tiles': list(self.tiles),
+                'factories': [list(factory) for factory in self.factories],
+                'players': [{'board': [list(row) for row in player['board']],
+                             'pattern_lines': [list(line) for line in player['pattern_lines']],
+                             'floor': list(player['floor']),
+                             'score': player['score']} for player in self.players],
+                'center': list(self.center),
+                'bag': list(self.bag),
+                'discard': list(self.discard),
+                'current_player': self.current_player,
+                'board_pattern': [list(row) for row in self.board_pattern]}
+
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        State rebuilt from to_dict. Raises KeyError or TypeError on a malformed dict.
+        """
+
+        return cls(list(data['tiles']),
+                   [list(factory) for factory in data['factories']],
+                   [{'board': [list(row) for row in player['board']],
+                     'pattern_lines': [list(line) for line in player['pattern_lines']],
+                     'floor': list(player['floor']),
+                     'score': int(player['score'])} for player in data['players']],
+                   list(data['center']), list(data['bag']), list(data['discard']),
+                   int(data['current_player']),
+                   [list(row) for row in data['board_pattern']])
+
+
     def display_state(self):
         """
         Initializes the game state with the initial parameters.
@@ -184,6 +282,10 @@ class AzulState:
 
 class AzulGame:
 
+    def __init__(self, rng=random, sampled_draw=False):
+        self.rng = rng  # random.Random (or the random module) used for the draws and random_player
+        self.sampled_draw = sampled_draw  # Draw each tile with one randrange instead of shuffling the bag
+
     def get_initial_state(self):
         """
         Returns the initial state of the game with factories, boards, and tile bag ready.
@@ -211,13 +313,18 @@ class AzulGame:
         return AzulState( tiles, initial_factories, initial_player_boards, initial_center, initial_bag, initial_discard, initial_player, board_pattern)
 
 
-    @staticmethod
-    def draw_tiles(state):
+    def draw_tiles(self, state, rng=None):
         """
-        Draws tiles from the bag and distributes them to the factories at the start of the round.
+        Draws tiles from the bag and distributes them to the factories at the start of the round,
+        with rng or the game's rng.
         """
 
-        random.shuffle(state.bag)
+        if self.sampled_draw:
+            self.sample_tiles(state, rng)
+            return
+
+        rng = rng or self.rng
+        rng.shuffle(state.bag)
 
         for factory in state.factories:
             factory.clear()
@@ -229,13 +336,38 @@ class AzulGame:
                     state.discard = [x for x in state.discard if x != '1']
                     state.bag = state.discard
                     state.discard = []
-                    random.shuffle(state.bag)
+                    rng.shuffle(state.bag)
                     if state.bag:
                         factory.append(state.bag.pop())
         # Add the first player token to the center at the beginning of the round
         state.center = ['1'] 
 
 
+    def sample_tiles(self, state, rng=None):
+        """
+        draw_tiles without shuffling the bag: the bag is sorted by color and each of the 20 tiles placed
+        is popped at one randrange. A pop moves the tiles after it, so each draw is O(len(bag)), which
+        for a 100-tile bag is still cheaper than walking color counts in Python.
+        With the same rng it draws exactly the tiles of CompactAzulGame.draw_tiles.
+        """
+
+        rng = rng or self.rng
+        state.bag.sort(key=TILE_ORDER.__getitem__)
+
+        for factory in state.factories:
+            factory.clear()
+            for _ in range(4):
+                if not state.bag:
+                    # If the bag is empty, refill it with discard pile
+                    state.bag = sorted((x for x in state.discard if x != '1'), key=TILE_ORDER.__getitem__)
+                    state.discard = []
+                    if not state.bag:
+                        continue
+                factory.append(state.bag.pop(rng.randrange(len(state.bag))))
+        # Add the first player token to the center at the beginning of the round
+        state.center = ['1']
+
+
     @staticmethod
     def get_result(state):
         """
@@ -249,45 +381,17 @@ class AzulGame:
     def calculate_score(player, row_num=None, col_num=None):
         """
         Calculates the points earned by placing tiles on the wall.
+        The runs through the tile are looked up in RUN_LENGTH from the masks of its row and column.
         """
 
-        score = 0
-        if row_num is not None and col_num is not None:
-            # Check horizontally
-            horizontal_count = 1
-            for i in range(col_num + 1, 5):
-                if player['board'][row_num][i] != '':
-                    horizontal_count += 1
-                else:
-                    break
-            for i in range(col_num - 1, -1, -1):
-                if player['board'][row_num][i] != '':
-                    horizontal_count += 1
-                else:
-                    break
-            if horizontal_count > 1:
-                score += horizontal_count
-
-            # Check vertically
-            vertical_count = 1
-            for i in range(row_num + 1, 5):
-                if player['board'][i][col_num] != '':
-                    vertical_count += 1
-                else:
-                    break
-            for i in range(row_num - 1, -1, -1):
-                if player['board'][i][col_num] != '':
-                    vertical_count += 1
-                else:
-                    break
-            if vertical_count > 1:
-                score += vertical_count
-
-            # If it's a single tile, it gets 1 point
-            if horizontal_count == 1 and vertical_count == 1:
-                score += 1
-
-        return score
+        if row_num is None or col_num is None:
+            return 0
+        board = player['board']
+        horizontal_count = RUN_LENGTH[line_mask(board[row_num])][col_num]
+        column = ((board[0][col_num] != '') | (board[1][col_num] != '') << 1 | (board[2][col_num] != '') << 2
+                  | (board[3][col_num] != '') << 3 | (board[4][col_num] != '') << 4)
+        vertical_count = RUN_LENGTH[column][row_num]
+        return PLACEMENT_SCORE[horizontal_count][vertical_count]
 
 
     @staticmethod
@@ -319,18 +423,19 @@ class AzulGame:
             future_points = AzulGame.calculate_score(player, row_num, col_num)
             points += future_points 
 
+            wall = wall_mask(player['board'])
             # Additional bonus for completing a row on the board
-            if all(tile != '' for tile in player['board'][row_num]):
+            if wall & ROW_MASKS[row_num] == ROW_MASKS[row_num]:
                 points += 10
 
             # Additional bonus for completing a column on the board
-            if all(player['board'][r][col_num] != '' for r in range(5)):
-                points += 25 
+            if wall & COL_MASKS[col_num] == COL_MASKS[col_num]:
+                points += 25
 
             # Additional bonus for completing all tiles of one color on the board
-            color_count = sum(row.count(tile_color) for row in player['board'])
-            if color_count == 5:
-                points += 30  
+            color_mask = COLOR_MASKS[TILE_ORDER[tile_color]]
+            if wall & color_mask == color_mask:
+                points += 30
 
         # Penalty for tiles that fall to the floor
         if len(state.empty_floor) < len(player['floor']):
@@ -359,16 +464,17 @@ class AzulGame:
         Grants additional points for completing rows, columns, or colors on the wall.
         """
 
-        for row in player['board']:
-            if all(tile != '' for tile in row):
+        wall = wall_mask(player['board'])
+        for mask in ROW_MASKS:
+            if wall & mask == mask:
                 player['score'] += 2
 
-        for col in range(5):
-            if all(player['board'][row][col] != '' for row in range(5)):
+        for mask in COL_MASKS:
+            if wall & mask == mask:
                 player['score'] += 7
 
-        for color in ['B', 'Y', 'R', 'K', 'W']:
-            if sum(row.count(color) for row in player['board']) == 5:
+        for mask in COLOR_MASKS:
+            if wall & mask == mask:
                 player['score'] += 10
 
 
@@ -380,30 +486,28 @@ class AzulGame:
         legal_actions = []
         player = state.players[state.current_player]
 
-        # Loop through all factories
+        # Loop through all factories (colors in order of appearance: set order changes with the hash seed)
         for i, factory in enumerate(state.factories):
-            for tile_color in set(factory):
+            for tile_color in dict.fromkeys(factory):
                 can_place = False
                 for row_num in range(5):
-                    
+                    # can_place_tiles already rejects pattern lines holding another color
                     if self.can_place_tiles(player, tile_color, row_num):
-                        if not any(tile != '' and tile != tile_color for tile in player['pattern_lines'][row_num]):
-                            legal_actions.append((i, tile_color, row_num))
-                            can_place = True
+                        legal_actions.append((i, tile_color, row_num))
+                        can_place = True
                 if not can_place:
                     legal_actions.append((i, tile_color, -1)) 
         
         # Loop through the center of the table
         if state.center:
-            for tile_color in set(state.center):
+            for tile_color in dict.fromkeys(state.center):
                 if tile_color == '1':   # Ignore the '1' tile
                     continue
                 can_place = False
                 for row_num in range(5):
                     if self.can_place_tiles(player, tile_color, row_num):
-                        if not any(tile != '' and tile != tile_color for tile in player['pattern_lines'][row_num]):
-                            legal_actions.append((-1, tile_color, row_num))
-                            can_place = True
+                        legal_actions.append((-1, tile_color, row_num))
+                        can_place = True
                 if not can_place:
                     legal_actions.append((-1, tile_color, -1)) 
 
@@ -448,7 +552,7 @@ class AzulGame:
         
         for player in state.players:
             for row in player['board']:
-                if all(tile != '' for tile in row):
+                if line_mask(row) == 31:
                     return True
         return False
     
@@ -476,13 +580,13 @@ class AzulGame:
         return state, reward
 
 
-    def random_player(self, state):
+    def random_player(self, state, rng=None):
         """
-        Chooses a random action from the possible legal moves.
+        Chooses a random action from the possible legal moves, with rng or the game's rng.
         """
 
         legal_actions = self.get_legal_moves(state)
-        return random.choice(legal_actions)
+        return (rng or self.rng).choice(legal_actions)
 
 
     def play_game(self, state):
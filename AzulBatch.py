@@ -0,0 +1,330 @@
+import numpy as np
+from AzulCompact import (CompactAzulState, TILES, TOKEN, FLOOR_PENALTIES, RUN_LENGTH, PLACEMENT_SCORE,
+                         ROW_MASKS, COL_MASKS, COLOR_MASKS)
+from AzulEncoding import inverse_color_mapping, input_dim, num_actions
+
+# Tile colors follow TILES (B, Y, R, K, W) and actions follow color_mapping: ACTION_TO_TILE[action color] = tile color
+ACTION_TO_TILE = np.array([TILES.index(inverse_color_mapping[i]) for i in range(5)])
+
+RUN_LENGTH_TABLE = np.array(RUN_LENGTH)
+PLACEMENT_SCORE_TABLE = np.array(PLACEMENT_SCORE)
+FLOOR_PENALTY_TABLE = np.array(FLOOR_PENALTIES)
+ROW_MASK_ARRAY = np.array(ROW_MASKS)
+COL_MASK_ARRAY = np.array(COL_MASKS)
+COLOR_MASK_ARRAY = np.array(COLOR_MASKS)
+
+ROWS = np.arange(5)
+# Placeable masks use the bit color * 5 + row, as CompactAzulState.placeable
+EMPTY_ROW_BITS = [sum(1 << (color * 5 + row) for color in range(5)) for row in range(5)]
+# Wall value of each cell in the state vector: tile color index + 1
+BOARD_VALUES = np.array([(col - row) % 5 + 1 for row in range(5) for col in range(5)], dtype=np.int8)
+# Row and position of each of the 15 pattern line cells in the state vector
+LINE_ROW = np.array([row for row in range(5) for _ in range(row + 1)])
+LINE_POS = np.array([pos for row in range(5) for pos in range(row + 1)])
+MAX_BAG = 100  # Tiles that can be in the bag, and also in the discard pile
+
+
+class BatchAzulGame:
+    """
+    batch_size Azul games stored as NumPy arrays and stepped together.
+
+    step follows AzulGame.step (move_tiles and immediate_action_scoring) and
+    then, for the games whose round ended, AzulState.move_tiles_to_wall and a
+    refill as in the DQN training loop. Observations are the 115-dim
+    state_to_vector encoding and actions the 180 indices of encode_action.
+    A round ends when no tiles are left: a first player token alone in the
+    center does not keep the round open, since no move could take it.
+    """
+
+    def __init__(self, batch_size, seed=None, auto_reset=True):
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+        self.auto_reset = auto_reset  # Restart finished games inside step
+        self.index = np.arange(batch_size)
+
+        self.factories = np.zeros((batch_size, 5, 5), dtype=np.int16)
+        self.center = np.zeros((batch_size, 5), dtype=np.int16)
+        self.center_token = np.zeros(batch_size, dtype=bool)
+        self.tiles_left = np.zeros(batch_size, dtype=np.int16)  # Tiles in the factories and the center
+        self.bag = np.zeros((batch_size, 5), dtype=np.int16)
+        self.discard = np.zeros((batch_size, 5), dtype=np.int16)
+        self.walls = np.zeros((batch_size, 2), dtype=np.int64)  # 25-bit masks, bit row * 5 + col
+        self.columns = np.zeros((batch_size, 2), dtype=np.int64)  # Same walls with bit col * 5 + row
+        self.color_walls = np.zeros((batch_size, 2), dtype=np.int64)  # Same walls with bit color * 5 + row
+        self.line_colors = np.full((batch_size, 2, 5), -1, dtype=np.int8)
+        self.line_counts = np.zeros((batch_size, 2, 5), dtype=np.int8)
+        self.floors = np.zeros((batch_size, 2, 5), dtype=np.int16)
+        self.floor_tokens = np.zeros((batch_size, 2), dtype=bool)
+        self.floor_counts = np.zeros((batch_size, 2), dtype=np.int16)  # Floor tiles, token included
+        self.scores = np.zeros((batch_size, 2), dtype=np.int32)
+        self.current_player = np.zeros(batch_size, dtype=np.int64)
+        self.final_scores = np.zeros((batch_size, 2), dtype=np.int32)  # Scores of the last finished game
+
+        self.reset()
+
+    def reset(self, mask=None):
+        """
+        Starts new games (all of them, or those selected by a boolean mask) and returns the observations.
+        """
+        if mask is None:
+            mask = np.ones(self.batch_size, dtype=bool)
+        self._clear(mask)
+        self._draw_tiles(mask)
+        return self.observations()
+
+    def _clear(self, mask):
+        self.bag[mask] = 20
+        self.discard[mask] = 0
+        self.walls[mask] = 0
+        self.columns[mask] = 0
+        self.color_walls[mask] = 0
+        self.line_colors[mask] = -1
+        self.line_counts[mask] = 0
+        self.floors[mask] = 0
+        self.floor_tokens[mask] = False
+        self.floor_counts[mask] = 0
+        self.scores[mask] = 0
+        self.current_player[mask] = 0
+
+    def set_states(self, states):
+        """
+        Loads one AzulState (or CompactAzulState) per game.
+        """
+        for i, state in enumerate(states):
+            if not isinstance(state, CompactAzulState):
+                state = CompactAzulState.from_state(state)
+            self.factories[i] = np.reshape(state.factories, (5, 5))
+            self.center[i] = state.center[:TOKEN]
+            self.center_token[i] = bool(state.center[TOKEN])
+            self.tiles_left[i] = sum(state.factories) + sum(state.center[:TOKEN])
+            self.bag[i] = state.bag
+            self.discard[i] = state.discard
+            self.walls[i] = state.walls
+            self.columns[i] = state.columns
+            for player, wall in enumerate(state.walls):
+                self.color_walls[i, player] = sum(1 << (((col - row) % 5) * 5 + row)
+                                                  for row in range(5) for col in range(5) if wall >> (row * 5 + col) & 1)
+            self.line_colors[i] = np.reshape(state.line_colors, (2, 5))
+            self.line_counts[i] = np.reshape(state.line_counts, (2, 5))
+            floors = np.reshape(state.floors, (2, 6))
+            self.floors[i] = floors[:, :TOKEN]
+            self.floor_tokens[i] = floors[:, TOKEN] > 0
+            self.floor_counts[i] = floors.sum(axis=1)
+            self.scores[i] = state.scores
+            self.current_player[i] = state.current_player
+
+    def _draw_tiles(self, mask):
+        """
+        Refills the factories of the selected games, as AzulGame.draw_tiles.
+
+        The 20 tiles are the first ones of the bag shuffled, followed by the
+        discard pile shuffled, which is what popping from the bag and refilling
+        it when empty produces.
+        """
+        games = np.nonzero(mask)[0]
+        bag = self.bag[games]
+        discard = self.discard[games]
+        # Tiles sorted by color, with color 5 marking the unused slots
+        slots = np.arange(MAX_BAG)
+        bag_tiles = (slots >= np.cumsum(bag, axis=1)[:, :, None]).sum(axis=1)
+        discard_tiles = (slots >= np.cumsum(discard, axis=1)[:, :, None]).sum(axis=1)
+        tiles = np.concatenate([bag_tiles, discard_tiles], axis=1)
+        keys = self.rng.random(tiles.shape)
+        keys[:, MAX_BAG:] += 1
+        keys[tiles == 5] = 3
+        drawn = np.take_along_axis(tiles, np.argsort(keys, axis=1)[:, :20], axis=1)
+
+        factories = (drawn.reshape(len(games), 5, 4, 1) == ROWS).sum(axis=2)
+        drawn_counts = factories.sum(axis=1)
+        refilled = bag.sum(axis=1) < 20
+        bag[refilled] += discard[refilled]
+        discard[refilled] = 0
+        self.bag[games] = bag - drawn_counts
+        self.discard[games] = discard
+        self.factories[games] = factories
+        self.tiles_left[games] = drawn_counts.sum(axis=1)
+        # Add the first player token to the center at the beginning of the round
+        self.center[games] = 0
+        self.center_token[games] = True
+
+    def observations(self, out=None):
+        """
+        Returns the (batch_size, 115) state_to_vector encoding of every game.
+        """
+        if out is None:
+            out = np.empty((self.batch_size, input_dim), dtype=np.float32)
+        out[:, 0:25] = self.factories.reshape(self.batch_size, 25)
+        out[:, 25:30] = self.center
+        out[:, 30] = self.center_token
+        players = out[:, 31:113].reshape(self.batch_size, 2, 41)
+        wall_bytes = self.walls.astype('<u4').view(np.uint8).reshape(self.batch_size, 2, 4)
+        wall_cells = np.unpackbits(wall_bytes, axis=2, count=25, bitorder='little')
+        players[:, :, 0:25] = wall_cells * BOARD_VALUES
+        counts = self.line_counts[:, :, LINE_ROW]
+        colors = self.line_colors[:, :, LINE_ROW]
+        players[:, :, 25:40] = (LINE_POS < counts) * (colors + 1)
+        players[:, :, 40] = self.floor_counts
+        out[:, 113] = self.current_player == 0
+        out[:, 114] = self.current_player == 1
+        return out
+
+    def _placeable(self, player):
+        """
+        Bit mask per game of the (color, row) pairs where player can place tiles.
+        """
+        counts = self.line_counts[self.index, player]
+        colors = self.line_colors[self.index, player].astype(np.int64)
+        placeable = np.zeros(self.batch_size, dtype=np.int64)
+        for row_num in range(5):
+            color = colors[:, row_num]
+            bits = np.where(color < 0, EMPTY_ROW_BITS[row_num], 1 << (np.maximum(color, 0) * 5 + row_num))
+            placeable |= np.where(counts[:, row_num] <= row_num, bits, 0)
+        return placeable & ~self.color_walls[self.index, player]
+
+    def legal_mask(self):
+        """
+        Returns the (batch_size, 180) boolean mask of the legal actions, as AzulGame.get_legal_moves.
+        """
+        # Rows that take each action color, with bit 5 (the floor) set when none does
+        rows = (self._placeable(self.current_player)[:, None] >> (ACTION_TO_TILE * 5)) & 31
+        targets = (rows | ((rows == 0) << 5)) << (ROWS * 6)
+        present = np.concatenate([self.factories, self.center[:, None]], axis=1)[:, :, ACTION_TO_TILE] > 0
+        # 30 action bits per source, in encode_action order
+        words = (present * targets[:, None, :]).sum(axis=2)
+        word_bytes = words.astype('<u4').view(np.uint8).reshape(self.batch_size, 6, 4)
+        bits = np.unpackbits(word_bytes, axis=2, count=30, bitorder='little')
+        return bits.reshape(self.batch_size, num_actions).view(bool)
+
+    def step(self, actions):
+        """
+        Plays one encoded action per game. Returns (observations, rewards, dones, legal_mask).
+        """
+        actions = np.asarray(actions)
+        index = self.index
+        player = self.current_player
+        source = actions // 30
+        tile = ACTION_TO_TILE[(actions % 30) // 6]
+        row = actions % 6
+
+        # Take the tiles from the factory (leftovers go to the center) or from the center
+        from_center = source == 5
+        factory_num = np.minimum(source, 4)
+        factory_counts = self.factories[index, factory_num]
+        taken = np.where(from_center, self.center[index, tile], factory_counts[index, tile])
+        from_factory = np.nonzero(~from_center)[0]
+        leftovers = factory_counts[from_factory]
+        leftovers[np.arange(len(from_factory)), tile[from_factory]] = 0
+        self.center[from_factory] += leftovers
+        self.factories[from_factory, factory_num[from_factory]] = 0
+        center_games = np.nonzero(from_center)[0]
+        self.center[center_games, tile[center_games]] = 0
+        self.tiles_left -= taken
+        token_moved = from_center & self.center_token
+        token_games = np.nonzero(token_moved)[0]
+        self.floor_tokens[token_games, player[token_games]] = True
+        self.center_token[token_games] = False
+
+        # Place them on the pattern line, the excess falls to the floor
+        to_line = row < 5
+        row_num = np.minimum(row, 4)
+        empty_spaces = row_num + 1 - self.line_counts[index, player, row_num]
+        placed = np.where(to_line, np.minimum(taken, empty_spaces), 0)
+        self.line_counts[index, player, row_num] += placed.astype(np.int8)
+        colored = np.nonzero(to_line & (taken > 0))[0]
+        self.line_colors[colored, player[colored], row_num[colored]] = tile[colored]
+        fallen = taken - placed
+        self.floors[index, player, tile] += fallen.astype(np.int16)
+        fallen += token_moved
+        self.floor_counts[index, player] += fallen.astype(np.int16)
+
+        rewards = self._immediate_action_scoring(player, tile, row_num, to_line, fallen)
+        self.current_player = 1 - player
+
+        dones = np.zeros(self.batch_size, dtype=bool)
+        round_over = self.tiles_left == 0
+        if round_over.any():
+            self._move_tiles_to_wall(round_over)
+            dones = round_over & self.game_over()
+            self.final_scores[dones] = self.scores[dones]
+            if self.auto_reset:
+                self._clear(dones)
+            else:
+                round_over &= ~dones
+            self._draw_tiles(round_over)
+
+        return self.observations(), rewards, dones, self.legal_mask()
+
+    def _immediate_action_scoring(self, player, tile, row_num, to_line, fallen):
+        """
+        AzulGame.immediate_action_scoring for the player that just moved, evaluated after the move.
+        """
+        index = self.index
+        wall = self.walls[index, player]
+        columns = self.columns[index, player]
+        col_num = (tile + row_num) % 5
+
+        # Points for getting closer to completing a pattern line
+        filled_spaces = self.line_counts[index, player, row_num]
+        progress_bonus = np.where(filled_spaces <= 0, 1.0, filled_spaces / (row_num + 1))
+        points = progress_bonus * 3
+
+        # Points for the future placement of the tile on the wall
+        horizontal = RUN_LENGTH_TABLE[(wall >> (row_num * 5)) & 31, col_num]
+        vertical = RUN_LENGTH_TABLE[(columns >> (col_num * 5)) & 31, row_num]
+        points += PLACEMENT_SCORE_TABLE[horizontal, vertical]
+
+        # Bonuses for an already complete row, column or color
+        points += 10 * ((wall >> (row_num * 5)) & 31 == 31)
+        points += 25 * ((columns >> (col_num * 5)) & 31 == 31)
+        color_mask = COLOR_MASK_ARRAY[tile]
+        points += 30 * (wall & color_mask == color_mask)
+        points = np.where(to_line, points, 0.0)
+
+        # Penalty for tiles that fall to the floor
+        points -= 3 * fallen
+        return points.astype(np.float32)
+
+    def _move_tiles_to_wall(self, mask):
+        """
+        AzulState.move_tiles_to_wall for the selected games.
+        """
+        games = np.nonzero(mask)[0]
+        for row_num in range(5):
+            full, player = np.nonzero(self.line_counts[games, :, row_num] == row_num + 1)
+            if not len(full):
+                continue
+            full = games[full]
+            color = self.line_colors[full, player, row_num].astype(np.int64)
+            col_num = (color + row_num) % 5
+            self.walls[full, player] |= 1 << (row_num * 5 + col_num)
+            self.columns[full, player] |= 1 << (col_num * 5 + row_num)
+            self.color_walls[full, player] |= 1 << (color * 5 + row_num)
+            self.line_counts[full, player, row_num] = 0
+            self.line_colors[full, player, row_num] = -1
+            # Add remaining tiles to discard (both players of a game may discard the same color)
+            np.add.at(self.discard, (full, color), row_num)
+            horizontal = RUN_LENGTH_TABLE[(self.walls[full, player] >> (row_num * 5)) & 31, col_num]
+            vertical = RUN_LENGTH_TABLE[(self.columns[full, player] >> (col_num * 5)) & 31, row_num]
+            self.scores[full, player] += PLACEMENT_SCORE_TABLE[horizontal, vertical]
+
+        # Penalties for the floor line and bonuses for complete rows, columns and colors
+        num_floor_tiles = np.minimum(self.floor_counts[games], len(FLOOR_PENALTIES) - 1)
+        self.scores[games] += FLOOR_PENALTY_TABLE[num_floor_tiles]
+        wall = self.walls[games, :, None]
+        bonus = (2 * (wall & ROW_MASK_ARRAY == ROW_MASK_ARRAY).sum(axis=2)
+                 + 7 * (wall & COL_MASK_ARRAY == COL_MASK_ARRAY).sum(axis=2)
+                 + 10 * (wall & COLOR_MASK_ARRAY == COLOR_MASK_ARRAY).sum(axis=2))
+        self.scores[games] += bonus.astype(np.int32)
+
+        # Empty the floor lines
+        self.discard[games] += self.floors[games].sum(axis=1)
+        self.floors[games] = 0
+        self.floor_tokens[games] = False
+        self.floor_counts[games] = 0
+
+    def game_over(self):
+        """
+        Boolean per game: a player has completed a row on the wall.
+        """
+        rows = (self.walls[:, :, None] >> (ROWS * 5)) & 31
+        return (rows == 31).any(axis=(1, 2))
@@ -0,0 +1,667 @@
+import random
+from Azul import AzulState, WALL_COLUMN, ROW_MASKS, COL_MASKS, COLOR_MASKS, RUN_LENGTH, PLACEMENT_SCORE
+
+TILES = ['B', 'Y', 'R', 'K', 'W']  # Blue, Yellow, Red, Black, White
+COLOR_INDEX = {color: i for i, color in enumerate(TILES)}
+NUM_FACTORIES = 5
+NUM_PLAYERS = 2
+TOKEN = 5  # Slot of the first player token in the center and floor vectors
+FLOOR_PENALTIES = [0, -1, -2, -4, -6, -8, -11, -14]
+EMPTY_FACTORY = (0, 0, 0, 0, 0)
+
+# Kinds of undo records returned by make_move, make_move_tiles_to_wall and CompactAzulGame.make_draw_tiles
+MOVE_RECORD = 0
+WALL_RECORD = 1
+DRAW_RECORD = 2
+
+# Color pattern on the wall, shared by every state instead of being copied
+BOARD_PATTERN = [[TILES[(col - row) % 5] for col in range(5)] for row in range(5)]
+# Placeability masks use bit color * 5 + row, so the rows open to a color are (mask >> color * 5) & 31
+PLACEABLE_ROW_MASKS = [sum(1 << (color * 5 + row) for color in range(5)) for row in range(5)]
+# MOVE_TABLE[source][color][row_bits]: legal moves taking color from a source (5 is the center)
+MOVE_TABLE = [[[tuple((factory_num, TILES[color], row) for row in range(5) if row_bits >> row & 1)
+                or ((factory_num, TILES[color], -1),)
+                for row_bits in range(32)]
+               for color in range(5)]
+              for factory_num in list(range(NUM_FACTORIES)) + [-1]]
+
+# Zobrist keys, drawn from a fixed seed so hashes agree across processes.
+# Count features are keyed by (slot, count), with count 0 keyed as 0 so empty slots cost nothing.
+MAX_COUNT = 100
+_zobrist_random = random.Random(20240801)
+
+
+def _zobrist_keys(slots, values):
+    return [[0] + [_zobrist_random.getrandbits(64) for _ in range(values - 1)] for _ in range(slots)]
+
+
+ZOBRIST_FACTORIES = _zobrist_keys(NUM_FACTORIES * 5, MAX_COUNT + 1)
+ZOBRIST_CENTER = _zobrist_keys(6, MAX_COUNT + 1)
+ZOBRIST_BAG = _zobrist_keys(5, MAX_COUNT + 1)
+ZOBRIST_DISCARD = _zobrist_keys(5, MAX_COUNT + 1)
+ZOBRIST_FLOORS = _zobrist_keys(NUM_PLAYERS * 6, MAX_COUNT + 1)
+ZOBRIST_WALLS = [_zobrist_random.getrandbits(64) for _ in range(NUM_PLAYERS * 25)]
+ZOBRIST_LINES = _zobrist_keys(NUM_PLAYERS * 5, 6 * 6)  # Indexed by (line color + 1) * 6 + line count
+ZOBRIST_SCORES = _zobrist_keys(NUM_PLAYERS, 512)  # Indexed by score & 511
+ZOBRIST_PLAYER = _zobrist_random.getrandbits(64)
+
+
+class CompactAzulState:
+    """
+    Array-backed Azul state with the same game semantics as AzulState.
+
+    Factories, center, bag, discard and floors are per-color count vectors,
+    walls are 25-bit masks (bit row * 5 + col), kept together with their
+    column-major transpose so both adjacency runs are a shift and a table
+    lookup, and pattern lines are stored as a color and a count per row.
+    Cloning copies a handful of small flat lists.
+    """
+
+    __slots__ = ('factories', 'center', 'bag', 'discard', 'walls', 'columns', 'line_colors',
+                 'line_counts', 'floors', 'scores', 'current_player', 'game_over', 'placeable', 'hash')
+
+    tiles = TILES
+    board_pattern = BOARD_PATTERN
+
+    def __init__(self, factories, center, bag, discard, walls, line_colors, line_counts, floors, scores, player):
+        self.factories = factories  # factory * 5 + color -> count
+        self.center = center  # color -> count, plus the first player token at TOKEN
+        self.bag = bag  # color -> count
+        self.discard = discard  # color -> count
+        self.walls = walls  # player -> 25-bit wall mask
+        self.columns = [transpose(wall) for wall in walls]  # player -> wall mask with bit col * 5 + row
+        self.line_colors = line_colors  # player * 5 + row -> color, -1 when empty
+        self.line_counts = line_counts  # player * 5 + row -> tiles in the pattern line
+        self.floors = floors  # player * 6 + color -> count, plus the token at TOKEN
+        self.scores = scores
+        self.current_player = player
+        self.game_over = any(wall & mask == mask for wall in walls for mask in ROW_MASKS)
+        # player -> color x row mask of the pattern lines that can take each color
+        self.placeable = [sum(row_placeability(walls[p], line_colors[p * 5 + row], line_counts[p * 5 + row], row)
+                              for row in range(5))
+                          for p in range(NUM_PLAYERS)]
+        self.hash = self.compute_hash()  # Zobrist hash, kept up to date by every change to the state
+
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Builds a compact state from a dict-based AzulState.
+        """
+
+        factories = [0] * (NUM_FACTORIES * 5)
+        for i, factory in enumerate(state.factories):
+            for tile in factory:
+                factories[i * 5 + COLOR_INDEX[tile]] += 1
+
+        center = cls._count_tiles(state.center)
+        bag = cls._count_tiles(state.bag)[:5]
+        discard = cls._count_tiles(state.discard)[:5]
+
+        walls = []
+        line_colors = []
+        line_counts = []
+        floors = []
+        scores = []
+        for player in state.players:
+            wall = 0
+            for row_num, row in enumerate(player['board']):
+                for col_num, tile in enumerate(row):
+                    if tile != '':
+                        wall |= 1 << (row_num * 5 + col_num)
+            walls.append(wall)
+
+            for pattern_line in player['pattern_lines']:
+                filled = [tile for tile in pattern_line if tile != '']
+                line_colors.append(COLOR_INDEX[filled[0]] if filled else -1)
+                line_counts.append(len(filled))
+
+            floors.extend(cls._count_tiles(player['floor']))
+            scores.append(player['score'])
+
+        return cls(factories, center, bag, discard, walls, line_colors, line_counts, floors, scores, state.current_player)
+
+
+    @staticmethod
+    def _count_tiles(tiles):
+        """
+        Counts a list of tiles per color, with the first player token in the last slot.
+        """
+
+        counts = [0] * 6
+        for tile in tiles:
+            if tile == '1':
+                counts[TOKEN] += 1
+            else:
+                counts[COLOR_INDEX[tile]] += 1
+        return counts
+
+
+    def to_state(self):
+        """
+        Builds the equivalent dict-based AzulState.
+        """
+
+        factories = []
+        for i in range(NUM_FACTORIES):
+            factory = []
+            for color in range(5):
+                factory.extend([TILES[color]] * self.factories[i * 5 + color])
+            factories.append(factory)
+
+        center = ['1'] if self.center[TOKEN] else []
+        for color in range(5):
+            center.extend([TILES[color]] * self.center[color])
+
+        player_boards = []
+        for p in range(NUM_PLAYERS):
+            wall = self.walls[p]
+            board = [[BOARD_PATTERN[row][col] if wall >> (row * 5 + col) & 1 else '' for col in range(5)]
+                     for row in range(5)]
+            pattern_lines = []
+            for row in range(5):
+                count = self.line_counts[p * 5 + row]
+                color = TILES[self.line_colors[p * 5 + row]] if count else ''
+                pattern_lines.append([color] * count + [''] * (row + 1 - count))
+            floor = ['1'] if self.floors[p * 6 + TOKEN] else []
+            for color in range(5):
+                floor.extend([TILES[color]] * self.floors[p * 6 + color])
+            player_boards.append({'board': board,
+                                  'pattern_lines': pattern_lines,
+                                  'floor': floor,
+                                  'score': self.scores[p]})
+
+        bag = []
+        discard = []
+        for color in range(5):
+            bag.extend([TILES[color]] * self.bag[color])
+            discard.extend([TILES[color]] * self.discard[color])
+
+        return AzulState(TILES.copy(), factories, player_boards, center, bag, discard,
+                         self.current_player, [row.copy() for row in BOARD_PATTERN])
+
+
+    def clone(self):
+        """
+        Returns an independent copy of the state. Only the flat count lists are copied.
+        """
+
+        new_state = CompactAzulState.__new__(CompactAzulState)
+        new_state.factories = self.factories[:]
+        new_state.center = self.center[:]
+        new_state.bag = self.bag[:]
+        new_state.discard = self.discard[:]
+        new_state.walls = self.walls[:]
+        new_state.columns = self.columns[:]
+        new_state.line_colors = self.line_colors[:]
+        new_state.line_counts = self.line_counts[:]
+        new_state.floors = self.floors[:]
+        new_state.scores = self.scores[:]
+        new_state.current_player = self.current_player
+        new_state.game_over = self.game_over
+        new_state.placeable = self.placeable[:]
+        new_state.hash = self.hash
+        return new_state
+
+
+    def compute_hash(self):
+        """
+        Computes the Zobrist hash of the state from scratch.
+        """
+
+        h = ZOBRIST_PLAYER if self.current_player else 0
+        for i, count in enumerate(self.factories):
+            h ^= ZOBRIST_FACTORIES[i][count]
+        for i, count in enumerate(self.center):
+            h ^= ZOBRIST_CENTER[i][count]
+        for color in range(5):
+            h ^= ZOBRIST_BAG[color][self.bag[color]] ^ ZOBRIST_DISCARD[color][self.discard[color]]
+        for i, count in enumerate(self.floors):
+            h ^= ZOBRIST_FLOORS[i][count]
+        for line in range(NUM_PLAYERS * 5):
+            h ^= ZOBRIST_LINES[line][(self.line_colors[line] + 1) * 6 + self.line_counts[line]]
+        for player in range(NUM_PLAYERS):
+            for cell in range(25):
+                if self.walls[player] >> cell & 1:
+                    h ^= ZOBRIST_WALLS[player * 25 + cell]
+            h ^= ZOBRIST_SCORES[player][self.scores[player] & 511]
+        return h
+
+
+    def key(self):
+        """
+        Returns a hashable snapshot of the state. Equal keys mean equal positions.
+        """
+
+        return (tuple(self.factories), tuple(self.center), tuple(self.bag), tuple(self.discard), tuple(self.walls),
+                tuple(self.line_colors), tuple(self.line_counts), tuple(self.floors), tuple(self.scores),
+                self.current_player)
+
+
+    def unordered_key(self):
+        """
+        key() with the factories as a sorted list of their contents: equal for positions that only differ
+        in which factory holds which tiles, as after CompactAzulGame.sort_factories.
+        """
+
+        factories = tuple(sorted(tuple(self.factories[offset:offset + 5]) for offset in range(0, NUM_FACTORIES * 5, 5)))
+        return (factories,) + self.key()[1:]
+
+
+    def swap_players(self):
+        """
+        Returns a copy of the state with the two players exchanged, e.g. so a search that maximizes
+        the result of player 0 can play as player 1. Moves are the same in both states.
+        """
+
+        return CompactAzulState(self.factories[:], self.center[:], self.bag[:], self.discard[:], self.walls[::-1],
+                                self.line_colors[5:] + self.line_colors[:5], self.line_counts[5:] + self.line_counts[:5],
+                                self.floors[6:] + self.floors[:6], self.scores[::-1], 1 - self.current_player)
+
+
+    def display_state(self):
+        """
+        Prints the state using the AzulState layout.
+        """
+
+        self.to_state().display_state()
+
+
+    def move_tiles(self, factory_num, tile_color, row_num):
+        """
+        Moves selected tiles from the factory or center to the pattern lines or floor if they can't be placed.
+        """
+
+        self.make_move(factory_num, tile_color, row_num)
+
+
+    def make_move(self, factory_num, tile_color, row_num):
+        """
+        Applies move_tiles and returns the record unmake_move needs to revert it.
+        """
+
+        color = COLOR_INDEX[tile_color]
+        player = self.current_player
+        floor = player * 6
+        center = self.center
+        floors = self.floors
+        token_moved = False
+        previous_hash = h = self.hash
+
+        if factory_num == -1:
+            source = taken = center[color]
+            center[color] = 0
+            h ^= ZOBRIST_CENTER[color][taken]
+            if center[TOKEN]:
+                center[TOKEN] = 0
+                floors[floor + TOKEN] = 1  # The first player token is added to the floor line
+                h ^= ZOBRIST_CENTER[TOKEN][1] ^ ZOBRIST_FLOORS[floor + TOKEN][1]
+                token_moved = True
+        else:
+            factories = self.factories
+            offset = factory_num * 5
+            source = factories[offset:offset + 5]
+            taken = source[color]
+            for other in range(5):
+                count = source[other]
+                if count:
+                    h ^= ZOBRIST_FACTORIES[offset + other][count]
+                    if other != color:
+                        keys = ZOBRIST_CENTER[other]
+                        h ^= keys[center[other]] ^ keys[center[other] + count]
+                        center[other] += count
+            factories[offset:offset + 5] = EMPTY_FACTORY
+
+        placeable = self.placeable[player]
+        line_state = None
+        fallen = taken  # Can't place selected tiles in any row
+        if row_num != -1 and taken:
+            line = player * 5 + row_num
+            line_color, line_count = line_state = (self.line_colors[line], self.line_counts[line])
+            empty_spaces = row_num + 1 - line_count
+            if empty_spaces >= taken:
+                self.line_counts[line] = line_count + taken
+                fallen = 0
+            else:
+                self.line_counts[line] = line_count + empty_spaces
+                fallen = taken - empty_spaces
+            self.line_colors[line] = color
+            keys = ZOBRIST_LINES[line]
+            h ^= keys[(line_color + 1) * 6 + line_count] ^ keys[(color + 1) * 6 + self.line_counts[line]]
+            self.placeable[player] = (placeable & ~PLACEABLE_ROW_MASKS[row_num]
+                                      | row_placeability(self.walls[player], color, self.line_counts[line], row_num))
+        if fallen:
+            keys = ZOBRIST_FLOORS[floor + color]
+            h ^= keys[floors[floor + color]] ^ keys[floors[floor + color] + fallen]
+            floors[floor + color] += fallen
+
+        self.current_player = 1 - player
+        self.hash = h ^ ZOBRIST_PLAYER
+        return (MOVE_RECORD, factory_num, color, row_num, source, token_moved, line_state, fallen, placeable,
+                previous_hash)
+
+
+    def make_move_tiles_to_wall(self):
+        """
+        Applies move_tiles_to_wall and returns the record unmake_move needs to revert it.
+        """
+
+        record = (WALL_RECORD, self.walls[:], self.columns[:], self.line_colors[:], self.line_counts[:],
+                  self.floors[:], self.scores[:], self.discard[:], self.placeable[:], self.game_over, self.hash)
+        self.move_tiles_to_wall()
+        return record
+
+
+    def unmake_move(self, record):
+        """
+        Reverts a move, wall tiling or tile draw. Records must be reverted in the reverse order they were made.
+        """
+
+        if record[0] == MOVE_RECORD:
+            _, factory_num, color, row_num, source, token_moved, line_state, fallen, placeable, self.hash = record
+            player = 1 - self.current_player
+            floor = player * 6
+            center = self.center
+
+            self.current_player = player
+            self.floors[floor + color] -= fallen
+            self.placeable[player] = placeable
+            if line_state is not None:
+                line = player * 5 + row_num
+                self.line_colors[line], self.line_counts[line] = line_state
+
+            if factory_num == -1:
+                center[color] = source
+                if token_moved:
+                    center[TOKEN] = 1
+                    self.floors[floor + TOKEN] = 0
+            else:
+                for other in range(5):
+                    if other != color:
+                        center[other] -= source[other]
+                self.factories[factory_num * 5:factory_num * 5 + 5] = source
+        elif record[0] == WALL_RECORD:
+            (_, self.walls, self.columns, self.line_colors, self.line_counts,
+             self.floors, self.scores, self.discard, self.placeable, self.game_over, self.hash) = record
+        else:
+            _, self.factories, self.center, self.bag, self.discard, self.hash = record
+
+
+    def move_tiles_to_wall(self):
+        """
+        Moves tiles from the pattern lines to the wall, calculates points, and updates the discarded tiles.
+        """
+
+        for player in range(NUM_PLAYERS):
+            wall = self.walls[player]
+            columns = self.columns[player]
+            score = self.scores[player]
+            placeable = self.placeable[player]
+            for row_num in range(5):
+                line = player * 5 + row_num
+                if self.line_counts[line] == row_num + 1:
+                    color = self.line_colors[line]
+                    col_num = WALL_COLUMN[row_num][color]
+                    wall |= 1 << (row_num * 5 + col_num)
+                    columns |= 1 << (col_num * 5 + row_num)
+                    self.line_counts[line] = 0
+                    self.line_colors[line] = -1
+                    # Add remaining tiles to discard
+                    self.discard[color] += row_num
+                    score += calculate_score(wall, row_num, col_num, columns)
+                    if wall >> (row_num * 5) & 31 == 31:
+                        self.game_over = True
+                    placeable = placeable & ~PLACEABLE_ROW_MASKS[row_num] | row_placeability(wall, -1, 0, row_num)
+            self.walls[player] = wall
+            self.columns[player] = columns
+            self.placeable[player] = placeable
+
+            floor = player * 6
+            score += penalty(sum(self.floors[floor:floor + 6]))
+            score += bounties(wall)
+            self.scores[player] = score
+
+            # Empty the floor line, the first player token is not discarded
+            for color in range(5):
+                self.discard[color] += self.floors[floor + color]
+            self.floors[floor:floor + 6] = [0] * 6
+
+        # Tiling touches most of the state once per round, so the hash is rebuilt rather than patched
+        self.hash = self.compute_hash()
+
+
+def transpose(wall):
+    """
+    Returns the column-major version of a wall mask (bit col * 5 + row).
+    """
+
+    columns = 0
+    for row in range(5):
+        for col in range(5):
+            if wall >> (row * 5 + col) & 1:
+                columns |= 1 << (col * 5 + row)
+    return columns
+
+
+def row_placeability(wall, line_color, line_count, row_num):
+    """
+    Returns the placeability bits (color * 5 + row_num) of one pattern line.
+    """
+
+    if line_count > row_num:
+        return 0
+    bits = 0
+    for color in range(5):
+        if (line_color == -1 or line_color == color) and not wall >> (row_num * 5 + WALL_COLUMN[row_num][color]) & 1:
+            bits |= 1 << (color * 5 + row_num)
+    return bits
+
+
+def calculate_score(wall, row_num, col_num, columns=None):
+    """
+    Calculates the points earned by the tile placed at (row_num, col_num) of a wall mask.
+    """
+
+    if columns is None:
+        columns = transpose(wall)
+    horizontal_count = RUN_LENGTH[wall >> (row_num * 5) & 31][col_num]
+    vertical_count = RUN_LENGTH[columns >> (col_num * 5) & 31][row_num]
+    return PLACEMENT_SCORE[horizontal_count][vertical_count]
+
+
+def penalty(num_floor_tiles):
+    """
+    Returns the (negative) points for a floor line holding num_floor_tiles tiles.
+    """
+
+    return FLOOR_PENALTIES[min(num_floor_tiles, len(FLOOR_PENALTIES) - 1)]
+
+
+def bounties(wall):
+    """
+    Returns the additional points for completed rows, columns and colors on a wall mask.
+    """
+
+    points = 0
+    for mask in ROW_MASKS:
+        if wall & mask == mask:
+            points += 2
+    for mask in COL_MASKS:
+        if wall & mask == mask:
+            points += 7
+    for mask in COLOR_MASKS:
+        if wall & mask == mask:
+            points += 10
+    return points
+
+
+class CompactAzulGame:
+    """
+    Game rules of AzulGame operating on CompactAzulState.
+    """
+
+    def get_initial_state(self):
+        """
+        Returns the initial state of the game with empty factories and a full tile bag.
+        """
+
+        return CompactAzulState(factories=[0] * (NUM_FACTORIES * 5),
+                                center=[0, 0, 0, 0, 0, 1],
+                                bag=[20] * 5,
+                                discard=[0] * 5,
+                                walls=[0] * NUM_PLAYERS,
+                                line_colors=[-1] * (NUM_PLAYERS * 5),
+                                line_counts=[0] * (NUM_PLAYERS * 5),
+                                floors=[0] * (NUM_PLAYERS * 6),
+                                scores=[0] * NUM_PLAYERS,
+                                player=0)
+
+
+    @staticmethod
+    def draw_tiles(state, rng=random):
+        """
+        Draws tiles from the bag and distributes them to the factories at the start of the round.
+        """
+
+        factories = state.factories
+        bag = state.bag
+        remaining = sum(bag)
+
+        for offset in range(0, NUM_FACTORIES * 5, 5):
+            factories[offset:offset + 5] = [0] * 5
+            for _ in range(4):
+                if not remaining:
+                    # If the bag is empty, refill it with discard pile
+                    bag = state.bag = state.discard
+                    state.discard = [0] * 5
+                    remaining = sum(bag)
+                    if not remaining:
+                        continue
+                # Drawing a uniformly random tile is the same as popping from a shuffled bag
+                pick = rng.randrange(remaining)
+                color = 0
+                while pick >= bag[color]:
+                    pick -= bag[color]
+                    color += 1
+                bag[color] -= 1
+                factories[offset + color] += 1
+                remaining -= 1
+        # Add the first player token to the center at the beginning of the round
+        state.center = [0, 0, 0, 0, 0, 1]
+        state.hash = state.compute_hash()
+
+
+    @staticmethod
+    def make_draw_tiles(state, rng=random):
+        """
+        Applies draw_tiles and returns the record state.unmake_move needs to put the drawn tiles back.
+        """
+
+        record = (DRAW_RECORD, state.factories[:], state.center[:], state.bag[:], state.discard[:], state.hash)
+        CompactAzulGame.draw_tiles(state, rng)
+        return record
+
+
+    @staticmethod
+    def sort_factories(state):
+        """
+        Orders the factories by their contents, so refills that only differ in which factory got
+        which tiles become the same state (and hash).
+        """
+
+        factories = state.factories
+        contents = sorted(tuple(factories[offset:offset + 5]) for offset in range(0, NUM_FACTORIES * 5, 5))
+        state.factories = [count for content in contents for count in content]
+        state.hash = state.compute_hash()
+
+
+    @staticmethod
+    def refill_of(state):
+        """
+        Snapshot of the tiles left by a refill (factories, center, bag, discard and hash), for make_refill.
+        """
+
+        return (tuple(state.factories), tuple(state.center), tuple(state.bag), tuple(state.discard), state.hash)
+
+
+    @staticmethod
+    def make_refill(state, refill):
+        """
+        Puts back a refill saved with refill_of and returns the record state.unmake_move needs to revert it.
+        """
+
+        record = (DRAW_RECORD, state.factories[:], state.center[:], state.bag[:], state.discard[:], state.hash)
+        factories, center, bag, discard, state.hash = refill
+        state.factories = list(factories)
+        state.center = list(center)
+        state.bag = list(bag)
+        state.discard = list(discard)
+        return record
+
+
+    @staticmethod
+    def get_result(state):
+        """
+        Returns the result of the game, providing the player's score.
+        """
+
+        return state.scores[0]
+
+
+    @staticmethod
+    def get_legal_moves(state):
+        """
+        Returns all possible legal moves from the current game state.
+        Factories with identical contents only contribute their moves once.
+        """
+
+        legal_actions = []
+        placeable = state.placeable[state.current_player]
+        factories = state.factories
+        seen = set()
+
+        for factory_num in range(NUM_FACTORIES):
+            offset = factory_num * 5
+            counts = tuple(factories[offset:offset + 5])
+            if counts in seen:
+                continue
+            seen.add(counts)
+            moves = MOVE_TABLE[factory_num]
+            for color in range(5):
+                if counts[color]:
+                    legal_actions.extend(moves[color][placeable >> (color * 5) & 31])
+
+        # The center is never merged with a factory: taking from it also takes the first player token
+        center = state.center
+        moves = MOVE_TABLE[NUM_FACTORIES]
+        for color in range(5):
+            if center[color]:
+                legal_actions.extend(moves[color][placeable >> (color * 5) & 31])
+
+        return legal_actions
+
+
+    @staticmethod
+    def check_end_of_round(state):
+        """
+        Checks if the round has ended (all factories and the center are empty).
+        """
+
+        return not any(state.factories) and not any(state.center)
+
+
+    @staticmethod
+    def check_end_of_game(state):
+        """
+        Checks if the game has ended (a player has completed a row on the wall).
+        """
+
+        return state.game_over
+
+
+    def random_player(self, state, rng=random):
+        """
+        Chooses a random action from the possible legal moves.
+        """
+
+        return rng.choice(self.get_legal_moves(state))
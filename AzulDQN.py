@@ -0,0 +1,118 @@
+import copy
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from AzulEncoding import input_dim, num_actions, encode_action
+from AzulEnv import AzulEnv
+
+
+class DuelingDQN(nn.Module):
+    """
+    Dueling Q-network of Azul_DQN.ipynb: Q = V + (A - mean(A)) over the 180 actions.
+    """
+
+    def __init__(self, input_dim=input_dim, num_actions=num_actions):
+        super(DuelingDQN, self).__init__()
+        self.fc1 = nn.Linear(input_dim, 128)
+        self.bn1 = nn.BatchNorm1d(128)
+        self.fc2 = nn.Linear(128, 128)
+        self.bn2 = nn.BatchNorm1d(128)
+        self.fc3 = nn.Linear(128, 128)
+        self.bn3 = nn.BatchNorm1d(128)
+        self.V = nn.Linear(128, 1)
+        self.A = nn.Linear(128, num_actions)
+
+    def forward(self, state):
+        x = F.relu(self.fc1(state))
+        x = F.relu(self.fc2(x))
+        x = F.relu(self.fc3(x))
+        V = self.V(x)
+        A = self.A(x)
+        Q = V + (A - A.mean(dim=1, keepdim=True))
+        return Q
+
+
+def masked_argmax(q_values, legal_masks):
+    """
+    Index of the best legal action of every row of q_values, with a (B, 180) boolean mask.
+    """
+
+    return q_values.masked_fill(~legal_masks, float('-inf')).argmax(dim=1)
+
+
+def select_actions(net, state_vectors, legal_masks, device='cpu'):
+    """
+    Greedy action indices for a batch of state vectors and legal_action_mask masks, with one forward pass.
+    """
+
+    with torch.no_grad():
+        states = torch.as_tensor(np.asarray(state_vectors, dtype=np.float32), device=device)
+        masks = torch.as_tensor(np.asarray(legal_masks, dtype=bool), device=device)
+        return masked_argmax(net(states), masks).cpu().numpy()
+
+
+def export_inference_model(net, path=None, compile_model=False):
+    """
+    CPU copy of net for evaluation: traced and frozen TorchScript, or torch.compile when compile_model is set.
+
+    The TorchScript module is saved to path when given (load it with torch.jit.load).
+    """
+
+    model = copy.deepcopy(net).cpu().eval()
+    if compile_model:
+        return torch.compile(model)
+    with torch.no_grad():
+        scripted = torch.jit.freeze(torch.jit.trace(model, torch.zeros(1, input_dim)))
+    if path is not None:
+        scripted.save(path)
+    return torch.jit.optimize_for_inference(scripted)
+
+
+def play_against_random(net, num_games, num_envs=256, device='cpu'):
+    """
+    Plays num_games of net (player 0, greedy) against AzulGame.random_player.
+
+    num_envs games run side by side so the network moves of all of them are
+    chosen with a single select_actions call. Returns one dict per game with
+    both scores, the reward of player 0 and its number of moves.
+    """
+
+    results = []
+    games = []
+    for _ in range(min(num_envs, num_games)):
+        env = AzulEnv()
+        state_vector, legal_mask = env.reset()
+        games.append({'env': env, 'obs': state_vector, 'mask': legal_mask, 'done': False, 'reward': 0.0, 'moves': 0})
+    started = len(games)
+
+    while games:
+        # Network moves, batched over every game where player 0 is to move
+        turn = [game for game in games if game['env'].state.current_player == 0]
+        if turn:
+            actions = select_actions(net, [game['obs'] for game in turn], [game['mask'] for game in turn], device)
+            for game, action in zip(turn, actions.tolist()):
+                game['obs'], reward, game['done'], game['mask'] = game['env'].step(action)
+                game['reward'] += reward
+                game['moves'] += 1
+
+        # Random player moves
+        for game in games:
+            env = game['env']
+            if not game['done'] and env.state.current_player == 1:
+                action = encode_action(*env.game.random_player(env.state))
+                game['obs'], _, game['done'], game['mask'] = env.step(action)
+
+        # Record the finished games and start new ones in their place
+        for game in [game for game in games if game['done']]:
+            players = game['env'].state.players
+            results.append({'score': players[0]['score'], 'opponent_score': players[1]['score'],
+                            'reward': game['reward'], 'moves': game['moves']})
+            if started < num_games:
+                game['obs'], game['mask'] = game['env'].reset()
+                game.update(done=False, reward=0.0, moves=0)
+                started += 1
+            else:
+                games.remove(game)
+
+    return results
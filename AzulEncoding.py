@@ -0,0 +1,162 @@
+from itertools import chain
+import numpy as np
+
+input_dim = 115  # Size of the state vector
+num_actions = 180  # Total number of possible actions
+
+# Game parameters for the action encoding
+num_factories = 6  # Number of factories (including the center)
+num_colors = 5     # Number of tile colors
+num_rows = 6       # Number of pattern lines + the floor line
+
+# Colors to action indices
+color_mapping = {'W': 0, 'Y': 1, 'B': 2, 'R': 3, 'K': 4}
+inverse_color_mapping = {v: k for k, v in color_mapping.items()}
+
+
+# Value of every tile in the state vector: 0 for an empty cell, tile color index + 1 otherwise
+TILE_COLORS = ('B', 'Y', 'R', 'K', 'W')
+TILE_CODES = {'': 0, 'B': 1, 'Y': 2, 'R': 3, 'K': 4, 'W': 5}
+tile_code = TILE_CODES.__getitem__
+
+# Wall and pattern line values of the compact state, by row and bit mask / count and color
+WALL_ROW_CODES = [[bytes((col - row) % 5 + 1 if bits >> col & 1 else 0 for col in range(5)) for bits in range(32)]
+                  for row in range(5)]
+LINE_CODES = [[[bytes([color + 1] * count + [0] * (row + 1 - count)) for color in range(-1, 5)]
+               for count in range(row + 2)] for row in range(5)]
+
+
+def state_to_vector(state, out=None):
+    """
+    Encodes an AzulState as the 115-dim vector used by the DQN agent.
+
+    It is written into out (e.g. a row of a batch matrix) when given.
+    """
+
+    return _to_float(_state_codes(state), out)
+
+
+def compact_state_to_vector(state, out=None):
+    """
+    state_to_vector for a CompactAzulState.
+    """
+
+    return _to_float(_compact_state_codes(state), out)
+
+
+def states_to_matrix(states, out=None):
+    """
+    Encodes several AzulStates (or CompactAzulStates) as the rows of a (len(states), 115) matrix.
+    """
+
+    codes = bytearray()
+    for state in states:
+        codes += _state_codes(state) if hasattr(state, 'players') else _compact_state_codes(state)
+    return _to_float(codes, out, (len(states), input_dim))
+
+
+def _state_codes(state):
+    """
+    The encoding of an AzulState as bytes: every entry is a small integer, so it is built in a bytearray.
+    """
+
+    values = bytearray(input_dim)
+
+    # Encode the factories and the center (grouped by color) and the first player token
+    offset = 0
+    for factory in state.factories:
+        values[offset:offset + 5] = map(factory.count, TILE_COLORS)
+        offset += 5
+    values[25:30] = map(state.center.count, TILE_COLORS)
+    values[30] = '1' in state.center
+
+    # Encode the wall, the pattern lines and the floor length (only the number of tiles matters) of each player
+    offset = 31
+    for player in state.players:
+        values[offset:offset + 25] = map(tile_code, chain.from_iterable(player['board']))
+        values[offset + 25:offset + 40] = map(tile_code, chain.from_iterable(player['pattern_lines']))
+        values[offset + 40] = len(player['floor'])
+        offset += 41
+
+    # Encode the current player (one-hot encoding)
+    values[offset + state.current_player] = 1
+    return values
+
+
+def _compact_state_codes(state):
+    """
+    The encoding of a CompactAzulState as bytes, built from its counts and bit masks.
+    """
+
+    values = bytearray(state.factories)
+    values += bytes(state.center)
+    for player in range(2):
+        wall = state.walls[player]
+        for row in range(5):
+            values += WALL_ROW_CODES[row][wall >> (row * 5) & 31]
+        for row in range(5):
+            line = player * 5 + row
+            values += LINE_CODES[row][state.line_counts[line]][state.line_colors[line] + 1]
+        values.append(sum(state.floors[player * 6:player * 6 + 6]))
+    values += b'\x00\x01' if state.current_player else b'\x01\x00'
+    return values
+
+
+def _to_float(codes, out, shape=(input_dim,)):
+    codes = np.frombuffer(codes, dtype=np.uint8).reshape(shape)
+    if out is None:
+        return codes.astype(np.float32)
+    out[:] = codes
+    return out
+
+
+def encode_action(factory_num, tile_color, row_num):
+    """
+    Encodes an action as a single index from factory_num, tile_color and row_num.
+    """
+
+    # Map the center (-1) to 5 and the floor (-1) to 5
+    if factory_num == -1:
+        factory_num = 5
+    if row_num == -1:
+        row_num = 5
+
+    # Map the color with the dictionary
+    tile_color = color_mapping[tile_color]
+
+    # Encode the action as a unique index
+    action_index = factory_num * (num_colors * num_rows) + tile_color * num_rows + row_num
+    return action_index
+
+
+def decode_action(action_index):
+    """
+    Decodes a unique index back into factory_num, tile_color and row_num.
+    """
+
+    factory_num = action_index // (num_colors * num_rows)
+    remainder = action_index % (num_colors * num_rows)
+    tile_color = remainder // num_rows
+    row_num = remainder % num_rows
+
+    # Restore the original values
+    if factory_num == 5:
+        factory_num = -1
+    if row_num == 5:
+        row_num = -1
+
+    # Restore the color letter
+    tile_color = inverse_color_mapping[tile_color]
+
+    return factory_num, tile_color, row_num
+
+
+def legal_action_mask(legal_actions):
+    """
+    Returns a boolean mask over the 180 actions with the legal actions set.
+    """
+
+    mask = np.zeros(num_actions, dtype=bool)
+    for action in legal_actions:
+        mask[encode_action(*action)] = True
+    return mask
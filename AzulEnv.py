@@ -0,0 +1,159 @@
+import multiprocessing
+import os
+import random
+import numpy as np
+from Azul import AzulGame, split_rng
+from AzulEncoding import state_to_vector, decode_action, legal_action_mask, input_dim, num_actions
+
+
+class AzulEnv:
+    """
+    One Azul game behind a reset/step interface, with actions given as encode_action indices.
+
+    step plays the action with AzulGame.step and handles the end of the round
+    (move_tiles_to_wall and draw_tiles), so observations are always of a state
+    where the next player can move. A round also ends when nobody can move,
+    which happens if the first player token is left alone in the center.
+    """
+
+    def __init__(self, game=None, reward_scale=1.0):
+        self.game = game or AzulGame()
+        self.reward_scale = reward_scale  # Factor applied to the immediate_action_scoring reward
+        self.rng = None  # random.Random of a seeded reset, used for the draws instead of the game's rng
+        self.state = None
+
+    def reset(self, seed=None, out=None):
+        """
+        Starts a new game. With a seed the env draws its tiles from its own random.Random(seed) from then
+        on, leaving the game's rng (which may be the random module, or shared with other users of the
+        game) untouched. Returns (obs, legal_mask), with obs written into out when given.
+        """
+        if seed is not None:
+            self.rng = random.Random(seed)
+        self.state = self.game.get_initial_state()
+        self.game.draw_tiles(self.state, self.rng)
+        return state_to_vector(self.state, out), self.legal_mask()
+
+    def legal_mask(self):
+        return legal_action_mask(self.game.get_legal_moves(self.state))
+
+    def step(self, action, out=None):
+        """
+        Plays an action index. Returns (obs, reward, done, legal_mask), with obs written into out when given.
+        """
+        game, state = self.game, self.state
+        state, reward = game.step(state, decode_action(action))
+
+        done = False
+        if game.check_end_of_round(state) or not game.get_legal_moves(state):
+            state.move_tiles_to_wall()
+            done = game.check_end_of_game(state)
+            if not done:
+                game.draw_tiles(state, self.rng)
+
+        return state_to_vector(state, out), reward * self.reward_scale, done, self.legal_mask()
+
+
+def _env_worker(conn, buffers, start, rngs, reward_scale):
+    """
+    Steps the environments [start, start + len(rngs)) of an AzulVectorEnv, writing the results to the shared buffers.
+    """
+
+    obs, masks, rewards, dones, actions = (np.frombuffer(buffer, dtype=dtype).reshape(shape)
+                                           for buffer, dtype, shape in buffers)
+    envs = [AzulEnv(AzulGame(rng=rng), reward_scale=reward_scale) for rng in rngs]
+    while True:
+        command = conn.recv()
+        if command == 'reset':
+            for i, env in enumerate(envs, start):
+                _, masks[i] = env.reset(out=obs[i])
+        elif command == 'step':
+            for i, env in enumerate(envs, start):
+                _, rewards[i], dones[i], masks[i] = env.step(actions[i], out=obs[i])
+                if dones[i]:
+                    _, masks[i] = env.reset(out=obs[i])
+        elif command == 'close':
+            break
+        conn.send(True)
+    conn.close()
+
+
+class AzulVectorEnv:
+    """
+    num_envs AzulEnv games split among worker processes.
+
+    Observations, masks, rewards, dones and actions live in shared memory, so
+    a step only sends a short command to each worker. Finished games are reset
+    inside step: the observation returned for them is the first one of the
+    new game. The arrays returned by reset and step are views of the shared
+    buffers and are overwritten by the next call. Every environment has its own
+    random stream split from seed, so the games do not depend on num_workers.
+    """
+
+    def __init__(self, num_envs, num_workers=None, seed=None, reward_scale=1.0):
+        self.num_envs = num_envs
+        self.num_workers = min(num_workers or os.cpu_count(), num_envs)
+        specs = [(np.float32, 'f', (num_envs, input_dim)),
+                 (np.bool_, 'b', (num_envs, num_actions)),
+                 (np.float32, 'f', (num_envs,)),
+                 (np.bool_, 'b', (num_envs,)),
+                 (np.int64, 'q', (num_envs,))]
+        buffers = [(multiprocessing.RawArray(typecode, int(np.prod(shape))), dtype, shape)
+                   for dtype, typecode, shape in specs]
+        self.obs, self.masks, self.rewards, self.dones, self.actions = (
+            np.frombuffer(buffer, dtype=dtype).reshape(shape) for buffer, dtype, shape in buffers)
+
+        rngs = split_rng(random.Random(seed), num_envs)
+        self.connections = []
+        self.workers = []
+        for worker in range(self.num_workers):
+            start = worker * num_envs // self.num_workers
+            end = (worker + 1) * num_envs // self.num_workers
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_env_worker, daemon=True,
+                                              args=(child_conn, buffers, start, rngs[start:end], reward_scale))
+            process.start()
+            child_conn.close()
+            self.connections.append(parent_conn)
+            self.workers.append(process)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self, command):
+        for conn in self.connections:
+            conn.send(command)
+        for conn in self.connections:
+            conn.recv()
+
+    def reset(self):
+        """
+        Starts a new game in every environment. Returns (obs, legal_masks).
+        """
+        self._run('reset')
+        return self.obs, self.masks
+
+    def step(self, actions):
+        """
+        Plays one action index per environment. Returns (obs, rewards, dones, legal_masks).
+        """
+        self.actions[:] = actions
+        self._run('step')
+        return self.obs, self.rewards, self.dones, self.masks
+
+    def close(self):
+        """
+        Stops the worker processes.
+        """
+        if not self.workers:
+            return
+        for conn in self.connections:
+            conn.send('close')
+            conn.close()
+        for process in self.workers:
+            process.join()
+        self.connections = []
+        self.workers = []
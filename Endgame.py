@@ -0,0 +1,131 @@
+import math
+from Azul import AzulState
+from AzulCompact import CompactAzulState, CompactAzulGame, NUM_FACTORIES
+from RolloutPolicies import move_values
+
+# Flags of the transposition table entries: the stored value is exact, a lower bound or an upper bound
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+def remaining_picks(state):
+    """
+    Estimate of the picks left in the round of a CompactAzulState: one per non-empty factory
+    and one per color still on the table, which will be taken from the center once.
+    """
+
+    factories = state.factories
+    center = state.center
+    picks = 0
+    colors = 0
+    for offset in range(0, NUM_FACTORIES * 5, 5):
+        for color in range(5):
+            if factories[offset + color]:
+                picks += 1
+                break
+    for color in range(5):
+        if center[color] or any(factories[offset + color] for offset in range(0, NUM_FACTORIES * 5, 5)):
+            colors += 1
+    return picks + colors
+
+
+class BudgetExceeded(Exception):
+    """
+    The solver visited more than max_nodes positions.
+    """
+
+
+class EndgameSolver:
+    """
+    Exact solver for the rest of a round, which has no randomness left.
+
+    Negamax with alpha-beta pruning over the remaining picks, scoring the end of
+    the round with move_tiles_to_wall: the value of a position is the score of the
+    player to move minus the score of the opponent once the walls are tiled.
+    Positions are cached by Zobrist hash with their bound, and the moves are tried
+    best first by RolloutPolicies.move_values (and the cached best move).
+    """
+
+    def __init__(self, max_nodes=200000, max_table_size=1000000):
+        self.max_nodes = max_nodes  # Positions one solve may visit before giving up
+        self.max_table_size = max_table_size  # The table is cleared when it grows past this
+        self.table = {}  # Hash -> (value, flag, best move)
+        self.engine = CompactAzulGame()
+        self.nodes = 0  # Positions visited by the last solve
+
+    def solve(self, state):
+        """
+        Returns (best move, value) for the player to move in an AzulState or CompactAzulState,
+        or None when the round cannot be solved within max_nodes positions. The value is the
+        final lead of the player to move.
+        """
+        if isinstance(state, AzulState):
+            state = CompactAzulState.from_state(state)
+        else:
+            state = state.clone()
+        if len(self.table) > self.max_table_size:
+            self.table.clear()
+        self.nodes = 0
+        try:
+            value, best_move = self._negamax(state, -math.inf, math.inf)
+        except BudgetExceeded:
+            return None
+        return best_move, value
+
+    def _negamax(self, state, alpha, beta):
+        """
+        (value, best move) of the position for the player to move, exact when it lies between alpha and beta
+        """
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise BudgetExceeded()
+
+        legal_moves = self.engine.get_legal_moves(state)
+        if not legal_moves:
+            # End of the round (possibly with the first player token left in the center)
+            record = state.make_move_tiles_to_wall()
+            player = state.current_player
+            value = state.scores[player] - state.scores[1 - player]
+            state.unmake_move(record)
+            return value, None
+
+        key = state.hash
+        entry = self.table.get(key)
+        first = None
+        original_alpha = alpha  # The stored bound is relative to the window the caller asked for
+        if entry is not None:
+            value, flag, first = entry
+            if flag == EXACT:
+                return value, first
+            if flag == LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value, first
+
+        values = move_values(state, legal_moves)
+        order = sorted(range(len(legal_moves)), key=values.__getitem__, reverse=True)
+        moves = [legal_moves[i] for i in order]
+        if first is not None and first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+
+        best_value = -math.inf
+        best_move = moves[0]
+        for move in moves:
+            record = state.make_move(*move)
+            value = -self._negamax(state, -beta, -alpha)[0]
+            state.unmake_move(record)
+            if value > best_value:
+                best_value = value
+                best_move = move
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        break
+
+        flag = UPPER if best_value <= original_alpha else LOWER if best_value >= beta else EXACT
+        self.table[key] = (best_value, flag, best_move)
+        return best_value, best_move
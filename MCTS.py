@@ -1,31 +1,55 @@
+import cProfile
 import math
+import pstats
 import random
 import time
-import copy
-import csv
-from Azul import AzulState, AzulGame
+from collections import OrderedDict
+from Azul import AzulState
+from AzulCompact import CompactAzulState, CompactAzulGame, NUM_FACTORIES
+from Endgame import EndgameSolver, remaining_picks
+
+CHECK_INTERVAL = 0.001  # Seconds of simulations between two checks of the clock and the stopping rules
+MAX_CHECK_BATCH = 256  # Most simulations between two checks
 
 
 class MCTSNode:
+    # Fixed-layout nodes. The legal moves are kept in a single list whose first
+    # len(children) entries are the moves of the children, in the same order.
+    __slots__ = ('parent', 'parent_move', 'children', 'moves', 'visits', 'wins')
+
     def __init__(self, state, game, parent=None, move =None):
-        self.state = state
+        # The state is only read here: the search keeps a single working state and replays moves on it
         self.parent = parent
         self.parent_move = move
         self.children = []
-        self.untried_actions = game.get_legal_moves(self.state)
+        self.moves = game.get_legal_moves(state)
         self.visits = 0
         self.wins = 0
 
+    @property
+    def untried_actions(self):
+        """
+        Moves that have no child node yet
+        """
+        return self.moves[len(self.children):]
+
     def is_fully_expanded(self):
         """
         Returns True if all possible actions have been explored
         """
-        return len(self.untried_actions) == 0
+        return len(self.children) == len(self.moves)
 
     def best_child(self, exploration_weight=1.4):
         """
         Selects the best child based on UCB (Upper Confidence Bound)
         """
+        return self.children[self.best_child_index(exploration_weight)]
+
+    def best_child_index(self, exploration_weight=1.4):
+        """
+        Index of the best child based on UCB. With a transposition table a child can be shared
+        by several parents, so its move is moves[index] rather than child.parent_move.
+        """
         if not self.children:
             raise Exception("No children nodes available to select the best child.")
         
@@ -33,7 +57,7 @@ class MCTSNode:
             (child.wins / child.visits) + exploration_weight * math.sqrt((2 * math.log(self.visits) / child.visits))
             for child in self.children
         ]
-        return self.children[choices_weights.index(max(choices_weights))]
+        return choices_weights.index(max(choices_weights))
     
     def update(self, result):
         """ 
@@ -44,115 +68,738 @@ class MCTSNode:
 
     def print_children_info(self):
         print("Children of current node:")
-        for child in self.children:
-            print(f"Move: {child.parent_move}, Wins: {child.wins}, Visits: {child.visits}, Win Rate: {child.wins / child.visits if child.visits > 0 else 0}")
+        for move, child in zip(self.moves, self.children):
+            print(f"Move: {move}, Wins: {child.wins}, Visits: {child.visits}, Win Rate: {child.wins / child.visits if child.visits > 0 else 0}")
 
     def print_legal_actions(self):
         print(f"Legal actions: {self.untried_actions}")
    
 
 
+class ChanceNode:
+    # End of a round. Going through it tiles the walls and refills the factories:
+    # each child is one sampled refill, whose tiles are kept in refills (see
+    # CompactAzulGame.refill_of) with the number of times it was drawn in counts.
+    __slots__ = ('parent', 'parent_move', 'children', 'refills', 'counts', 'outcome_index', 'visits', 'wins')
+
+    moves = ()  # No moves to play: the children are reached by chance
+
+    def __init__(self, parent=None, move=None):
+        self.parent = parent
+        self.parent_move = move
+        self.children = []
+        self.refills = []
+        self.counts = []
+        self.outcome_index = {}  # Hash of a refilled state -> index of its child
+        self.visits = 0
+        self.wins = 0
+
+    def update(self, result):
+        self.visits += 1
+        self.wins += result
+
+
+
+class TranspositionTable:
+    """
+    Bounded map from the Zobrist hash of a position to the tree node that holds its statistics.
+
+    When full, the least recently used entry (eviction='lru') or the oldest
+    stored entry (eviction='fifo') is dropped. Evicted nodes stay in the tree,
+    they just stop being shared with new transpositions.
+    """
+
+    def __init__(self, capacity=100000, eviction='lru'):
+        if eviction not in ('lru', 'fifo'):
+            raise ValueError("eviction must be 'lru' or 'fifo'")
+        self.capacity = capacity
+        self.eviction = eviction
+        self.nodes = OrderedDict()
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def lookup(self, key):
+        """
+        Returns the node stored for key, or None
+        """
+        self.lookups += 1
+        node = self.nodes.get(key)
+        if node is not None:
+            self.hits += 1
+            if self.eviction == 'lru':
+                self.nodes.move_to_end(key)
+        return node
+
+    def store(self, key, node):
+        """
+        Stores the node of a position, evicting an entry if the table is full
+        """
+        if key not in self.nodes and len(self.nodes) >= self.capacity:
+            self.nodes.popitem(last=False)
+            self.evictions += 1
+        self.nodes[key] = node
+
+    def clear(self):
+        self.nodes.clear()
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    @property
+    def occupancy(self):
+        return len(self.nodes) / self.capacity
+
+
+
+class SearchStats:
+    """
+    Phase times and counters of one instrumented search.
+
+    times holds the seconds spent in select (excluding expand), expand,
+    simulate, backpropagate and copy (building the working state and undoing
+    the moves of every simulation). Rollouts are counted by how they ended:
+    end of the game, max_simulation_depth, or a round with no legal moves.
+    legal_moves maps each tree depth to [nodes, total legal moves, most legal moves]
+    of the nodes allocated at that depth.
+    """
+
+    PHASES = ('select', 'expand', 'simulate', 'backpropagate', 'copy')
+
+    def __init__(self):
+        self.times = dict.fromkeys(self.PHASES, 0.0)
+        self.simulations = 0
+        self.nodes_allocated = 0
+        self.max_depth = 0
+        self.rollouts = {'end_of_game': 0, 'max_depth': 0, 'no_moves': 0}
+        self.legal_moves = {}
+        self.profile = None  # pstats.Stats of the search when profiling
+
+    def record_node(self, depth, num_moves):
+        entry = self.legal_moves.setdefault(depth, [0, 0, 0])
+        entry[0] += 1
+        entry[1] += num_moves
+        entry[2] = max(entry[2], num_moves)
+
+    def as_dict(self):
+        """
+        The statistics as plain values, e.g. to store them as JSON.
+        """
+        total = sum(self.times.values())
+        return {'simulations': self.simulations,
+                'times': dict(self.times),
+                'time_per_simulation': total / self.simulations if self.simulations else 0.0,
+                'nodes_allocated': self.nodes_allocated,
+                'max_depth': self.max_depth,
+                'rollouts': dict(self.rollouts),
+                'legal_moves': {depth: {'nodes': nodes, 'mean': moves / nodes, 'max': most}
+                                for depth, (nodes, moves, most) in sorted(self.legal_moves.items())}}
+
+    def __str__(self):
+        total = sum(self.times.values()) or 1.0
+        lines = [f"{self.simulations} simulations, {self.nodes_allocated} nodes, depth {self.max_depth}",
+                 "  " + ", ".join(f"{phase} {seconds * 1000:.1f} ms ({seconds / total:.0%})"
+                                  for phase, seconds in self.times.items()),
+                 "  rollouts: " + ", ".join(f"{reason} {count}" for reason, count in self.rollouts.items())]
+        for depth, (nodes, moves, most) in sorted(self.legal_moves.items()):
+            lines.append(f"  depth {depth}: {nodes} nodes, {moves / nodes:.1f} legal moves on average, {most} at most")
+        return "\n".join(lines)
+
+
+
+class SearchResult:
+    """
+    Outcome of MCTS.search_anytime.
+
+    best_move is the root move with the most visits (the average result breaks
+    ties), visits and values map every expanded root move to its visits and
+    average result, and stop_reason is one of 'budget', 'deadline', 'decided'
+    or 'interrupted'. A move of the EndgameSolver has stop_reason 'solved', no
+    root and no visits.
+    """
+
+    def __init__(self, root, simulations, elapsed, stop_reason, best_move=None):
+        children = list(zip(root.moves, root.children)) if root is not None else []
+        self.visits = {move: child.visits for move, child in children}
+        self.values = {move: child.wins / child.visits if child.visits else 0.0 for move, child in children}
+        self.best_move = best_move if best_move is not None else MCTS.most_visited_move(root)
+        self.simulations = simulations
+        self.elapsed = elapsed
+        self.stop_reason = stop_reason
+
+    def visit_distribution(self):
+        """
+        Share of the root visits of every expanded move.
+        """
+        total = sum(self.visits.values())
+        return {move: visits / total for move, visits in self.visits.items()} if total else {}
+
+
+
 class MCTS:
-    def __init__(self, game, exploration_weight=2.5, max_simulation_depth=10, min_visits_per_node=15):
+    def __init__(self, game, exploration_weight=2.5, max_simulation_depth=10, min_visits_per_node=15,
+                 reuse_tree=False, reuse_depth=2, transposition_table=None, rng=random,
+                 instrument=False, profile=None, rollout_policy=None, chance_nodes=False, chance_widening=1.0,
+                 chance_exponent=0.5, endgame_picks=None, endgame_nodes=20000):
         self.game = game
+        self.engine = CompactAzulGame()  # Rules on the compact state used inside the search
         self.exploration_weight = exploration_weight    # Exploration parameter for UCB
         self.max_simulation_depth = max_simulation_depth
         self.min_visits_per_node = min_visits_per_node
+        self.random = rng  # Source of randomness for expansion, refills and rollouts (random.Random or the random module)
+        self.reuse_tree = reuse_tree  # Keep the tree between searches and re-root it at the new state
+        self.reuse_depth = reuse_depth  # How many plies below the previous root the new state is looked for
+        self.root = None  # Root of the last search and its state, kept when reuse_tree is set
+        self.root_state = None
+        self.reused_visits = 0  # Visits transplanted from the previous tree into the last search
+        self.transposition_table = transposition_table  # Optional TranspositionTable shared by transposed nodes
+        self.rollout_policy = rollout_policy  # Optional RolloutPolicies policy for the simulations, uniformly random moves otherwise
+        # Continue the tree past the end of a round through ChanceNodes, which sample at most
+        # ceil(chance_widening * visits ** chance_exponent) different refills (progressive widening)
+        self.chance_nodes = chance_nodes
+        self.chance_widening = chance_widening
+        self.chance_exponent = chance_exponent
+        # search() and search_anytime() solve the rest of the round exactly with an EndgameSolver when at most
+        # endgame_picks picks are left, falling back to the tree search if it needs more than endgame_nodes positions
+        self.endgame_picks = endgame_picks
+        self.endgame = EndgameSolver(max_nodes=endgame_nodes) if endgame_picks is not None else None
+        self.solved = False  # Whether the move of the last search came from the EndgameSolver
+        self.instrument = instrument  # Collect a SearchStats for every search in self.stats
+        self.profile = profile  # True to profile every search with cProfile, or a path for its pstats dump
+        self.stats = None  # SearchStats of the last search, when instrumenting or profiling
+        self.search_root = None  # Root of the search in progress (or the last one), for current_best_move
+        self._interrupted = False
 
     def search(self, initial_state, num_simulations=None, simulation_seconds=None):
         """
         Executes the MCTS search. Runs simulations for a given number of iterations or within a time limit.
+        With endgame_picks set, the end of the round is solved exactly instead when few picks are left.
         """
-        root = MCTSNode(initial_state, self.game)
-        start_time = time.time()
+        start_time = time.perf_counter()
+        solved_move = self._solve_endgame(initial_state)
+        if solved_move is not None:
+            return solved_move, time.perf_counter() - start_time
+        root = self.build_tree(initial_state, num_simulations, simulation_seconds)
 
-        if num_simulations is None :
-            # Time-limited search
-            assert(simulation_seconds is not None)
-            end_time = time.time() + simulation_seconds
-            while time.time() < end_time:
-                if root.is_fully_expanded() and all(child.is_fully_expanded() for child in root.children):
-                    break  
-                node = self._select(root)
-                result = self._simulate(node.state)
-                self._backpropagate(node, result)
+        best_move = root.moves[root.best_child_index(0)]
+        search_time = time.perf_counter() - start_time
+
+        return best_move, search_time
+
+
+    def search_anytime(self, initial_state, max_seconds=None, max_simulations=None, stop_when_decided=True):
+        """
+        Searches until the deadline (max_seconds from now), the simulation budget, a call to interrupt(),
+        or, with stop_when_decided, until the most visited root move can no longer be overtaken
+        within the remaining budget. Returns a SearchResult. With endgame_picks set, the end of the round
+        is solved exactly instead when few picks are left, as in search().
+
+        The clock is read once per batch of simulations, and current_best_move() can be
+        called from another thread at any moment of the search.
+        """
+        start_time = time.perf_counter()
+        if max_seconds is None and max_simulations is None:
+            raise ValueError("search_anytime needs max_seconds or max_simulations")
+        solved_move = self._solve_endgame(initial_state)
+        if solved_move is not None:
+            return SearchResult(None, 0, time.perf_counter() - start_time, 'solved', best_move=solved_move)
+        end_time = start_time + max_seconds if max_seconds is not None else None
+        root = self.build_tree(initial_state, max_simulations, end_time=end_time, stop_when_decided=stop_when_decided)
+        return SearchResult(root, self.simulations, time.perf_counter() - start_time, self.stop_reason)
+
+
+    def _solve_endgame(self, initial_state):
+        """
+        Move of the EndgameSolver when endgame_picks is set and at most that many picks are left in the round,
+        otherwise (or when the solver runs out of nodes) None, for the tree search to take over.
+        """
+        self.solved = False
+        if self.endgame is None:
+            return None
+        state = CompactAzulState.from_state(initial_state) if isinstance(initial_state, AzulState) else initial_state
+        if remaining_picks(state) > self.endgame_picks:
+            return None
+        solution = self.endgame.solve(state)
+        if solution is None:
+            return None
+        self.solved = True
+        # No tree for this move: an interrupt() meant for it is spent, and current_best_move() has nothing to show
+        self.search_root = None
+        self._interrupted = False
+        return solution[0]
+
+
+    def interrupt(self):
+        """
+        Stops the search in progress at its next check. The search returns as usual with what it has.
+        """
+        self._interrupted = True
+
+
+    def current_best_move(self):
+        """
+        Most visited root move of the search in progress (or of the last search), or None before any simulation.
+        """
+        root = self.search_root
+        return self.most_visited_move(root) if root is not None and root.children else None
+
+
+    @staticmethod
+    def most_visited_move(root):
+        """
+        Root move with the most visits, the average result breaking ties.
+        A root without children (no simulation run) falls back to its first legal move.
+        """
+        if not root.children:
+            if not root.moves:
+                raise ValueError("No legal moves to choose from.")
+            return root.moves[0]
+        index = max(range(len(root.children)),
+                    key=lambda i: (root.children[i].visits, root.children[i].wins / max(root.children[i].visits, 1)))
+        return root.moves[index]
+
+
+    def build_tree(self, initial_state, num_simulations=None, simulation_seconds=None, end_time=None,
+                   stop_when_decided=False):
+        """
+        Runs the simulations of a search and returns the root node with its statistics.
+        end_time is a time.perf_counter() deadline, used instead of simulation_seconds by search_anytime.
+        """
+        if not (self.instrument or self.profile):
+            return self._build_tree(initial_state, num_simulations, simulation_seconds, end_time, stop_when_decided)
+
+        self.stats = SearchStats()
+        profiler = cProfile.Profile() if self.profile else None
+        if profiler is not None:
+            profiler.enable()
+        try:
+            root = self._build_tree(initial_state, num_simulations, simulation_seconds, end_time, stop_when_decided)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+        if profiler is not None:
+            self.stats.profile = pstats.Stats(profiler)
+            if isinstance(self.profile, str):
+                profiler.dump_stats(self.profile)
+        return root
+
+
+    def _build_tree(self, initial_state, num_simulations, simulation_seconds, end_time, stop_when_decided):
+        """
+        build_tree without the instrumentation setup
+        """
+        copy_start = time.perf_counter()
+        if isinstance(initial_state, AzulState):
+            state = CompactAzulState.from_state(initial_state)
         else:
-            # Search limited by number of simulations
-            for i in range(num_simulations):
-                node = self._select(root)
-                result = self._simulate(node.state)
-                self._backpropagate(node, result)
+            state = initial_state.clone()
+        copy_time = time.perf_counter() - copy_start
+        table = self.transposition_table
+        if table is not None and not self.reuse_tree:
+            table.clear()
+        root = self._reuse_root(state) if self.reuse_tree else None
+        if root is None:
+            root = MCTSNode(state, self.engine)
+        if table is not None:
+            table.store(state.hash, root)
+        self.reused_visits = root.visits
+        run_simulation = self._run_simulation
+        if self.instrument:
+            self.stats.times['copy'] += copy_time
+            run_simulation = self._run_simulation_instrumented
+
+        self.search_root = root
+        if end_time is not None or num_simulations is not None:
+            # Anytime search, or a search limited by number of simulations (transplanted visits included)
+            max_simulations = num_simulations - root.visits if num_simulations is not None else None
+            self.simulations, self.stop_reason = self._run_until(root, state, run_simulation, max_simulations,
+                                                                 end_time, stop_when_decided)
+        else:
+            # Time-limited search, which also ends once the first two levels of the tree are expanded
+            assert(simulation_seconds is not None)
+            self.simulations, self.stop_reason = self._run_until(root, state, run_simulation, None,
+                                                                 time.perf_counter() + simulation_seconds,
+                                                                 stop_when_expanded=True)
 
-        best_child_node = root.best_child(0)
-        best_move = best_child_node.parent_move
-        search_time = time.time() - start_time
+        if self.reuse_tree:
+            self.root = root
+            self.root_state = state
+        return root
 
-        return best_move, search_time
+
+    def _run_until(self, root, state, run_simulation, max_simulations=None, end_time=None,
+                   stop_when_decided=False, stop_when_expanded=False):
+        """
+        Runs simulations until max_simulations, end_time (a time.perf_counter() value), interrupt(),
+        or one of the optional stopping rules. The clock and the rules are checked between batches
+        of simulations sized to last about CHECK_INTERVAL, so the checks cost nothing per simulation
+        and the deadline is overshot by about CHECK_INTERVAL at most. The first simulation always runs,
+        whatever the deadline or an interrupt() sent before the search began, so the root has a move to return.
+        Returns the number of simulations run and the reason the search stopped.
+        """
+        clock = time.perf_counter
+        start_time = clock()
+        simulations = 0
+        batch = 1
+        try:
+            while True:
+                if simulations:
+                    if self._interrupted:
+                        return simulations, 'interrupted'
+                    if end_time is not None:
+                        now = clock()
+                        if now >= end_time:
+                            return simulations, 'deadline'
+                if stop_when_expanded and root.is_fully_expanded() and all(child.is_fully_expanded() for child in root.children):
+                    return simulations, 'expanded'
+                if max_simulations is not None:
+                    if simulations >= max_simulations:
+                        return simulations, 'budget'
+                    batch = min(batch, max_simulations - simulations)
+
+                if simulations:
+                    seconds_per_simulation = (clock() - start_time) / simulations
+                    if stop_when_decided:
+                        remaining = max_simulations - simulations if max_simulations is not None else math.inf
+                        if end_time is not None:
+                            remaining = min(remaining, (end_time - now) / seconds_per_simulation)
+                        if self._is_decided(root, remaining):
+                            return simulations, 'decided'
+
+                for _ in range(batch):
+                    run_simulation(root, state)
+                simulations += batch
+
+                seconds_per_simulation = (clock() - start_time) / simulations
+                batch = max(1, min(MAX_CHECK_BATCH, int(CHECK_INTERVAL / seconds_per_simulation)))
+        finally:
+            # Cleared at the end rather than the start, so an interrupt() sent before the search began still stops it
+            self._interrupted = False
+
+
+    @staticmethod
+    def _is_decided(root, remaining):
+        """
+        True when the most visited root move keeps the most visits even if every remaining simulation goes to another move
+        """
+        if not root.children:
+            return False
+        if len(root.moves) == 1:
+            return True
+        visits = sorted((child.visits for child in root.children), reverse=True)
+        runner_up = visits[1] if len(visits) > 1 else 0
+        return visits[0] - runner_up > remaining
+
+
+    def _reuse_root(self, state):
+        """
+        Returns the node of the previous tree that matches state, detached from its parent, or None
+        """
+        root, root_state = self.root, self.root_state
+        self.root = self.root_state = None
+        if root is None:
+            return None
+
+        found = self._find_node(root, root_state, state, self.reuse_depth)
+        if found is None:
+            return None
+        node, order = found
+        if order is not None and order != list(range(NUM_FACTORIES)):
+            # The node lies past a refill, whose factories the tree keeps sorted: renumber them as in state
+            self._renumber_factories(node, order)
+            if self.transposition_table is not None:
+                # The stored hashes are those of the sorted factories
+                self.transposition_table.clear()
+        node.parent = None
+        node.parent_move = None
+        return node
+
+
+    def _find_node(self, node, node_state, state, depth, refilled=False):
+        """
+        Looks for the descendant of node (at most depth plies below) whose position is state. Going
+        through a ChanceNode matches the refill drawn in state among the sampled ones and costs no ply;
+        past it the factories are sorted, so positions are compared regardless of the factory order.
+        Returns (node, order), with order[i] the factory of state holding the tiles of factory i of
+        the node (None if no refill was crossed), or None if there is no such node.
+        """
+        if refilled:
+            if node_state.unordered_key() == state.unordered_key():
+                return node, self._factory_order(node_state, state)
+        elif node_state.hash == state.hash and node_state.key() == state.key():
+            return node, None
+
+        if node.__class__ is ChanceNode:
+            found = None
+            record = node_state.make_move_tiles_to_wall()
+            if not self.engine.check_end_of_game(node_state):
+                # Moves do not change the bag and discard, so they tell the refill drawn in state
+                bag, discard = tuple(state.bag), tuple(state.discard)
+                for refill, child in zip(node.refills, node.children):
+                    if refill[2] != bag or refill[3] != discard:
+                        continue
+                    refill_record = self.engine.make_refill(node_state, refill)
+                    found = self._find_node(child, node_state, state, depth, True)
+                    node_state.unmake_move(refill_record)
+                    if found is not None:
+                        break
+            node_state.unmake_move(record)
+            return found
+
+        if depth == 0:
+            return None
+        for move, child in zip(node.moves, node.children):
+            record = node_state.make_move(*move)
+            found = self._find_node(child, node_state, state, depth - 1, refilled)
+            node_state.unmake_move(record)
+            if found is not None:
+                return found
+        return None
+
+
+    @staticmethod
+    def _factory_order(node_state, state):
+        """
+        order[i] is the factory of state with the contents of factory i of node_state.
+        Factories with the same contents keep their relative order.
+        """
+        positions = {}
+        for factory in range(NUM_FACTORIES):
+            positions.setdefault(tuple(state.factories[factory * 5:factory * 5 + 5]), []).append(factory)
+        return [positions[tuple(node_state.factories[factory * 5:factory * 5 + 5])].pop(0)
+                for factory in range(NUM_FACTORIES)]
+
+
+    @staticmethod
+    def _renumber_factories(root, order):
+        """
+        Replaces factory i by order[i] in the moves of root and of its descendants up to the end of the round
+        """
+        def renumber(move):
+            factory_num, tile_color, row_num = move
+            return (order[factory_num] if factory_num != -1 else -1, tile_color, row_num)
+
+        seen = set()  # Nodes shared through the transposition table are renumbered once
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            if node.parent_move is not None:
+                node.parent_move = renumber(node.parent_move)
+            if node.__class__ is not ChanceNode:
+                node.moves = [renumber(move) for move in node.moves]
+                stack.extend(node.children)
     
 
-    def _select(self, node):
+    def _run_simulation(self, root, state):
+        """
+        Runs one select-simulate-backpropagate iteration on the working state and reverts it afterwards
+        """
+        records = []
+        path = [root]
+        self._select(root, state, records, path)
+        result = self._simulate(state, records)
+        self._backpropagate(path, result)
+        while records:
+            state.unmake_move(records.pop())
+
+
+    def _run_simulation_instrumented(self, root, state):
+        """
+        _run_simulation that also records the phase times and counters in self.stats
+        """
+        stats = self.stats
+        times = stats.times
+        clock = time.perf_counter
+        records = []
+        path = [root]
+        expand_time = times['expand']
+
+        start = clock()
+        self._select(root, state, records, path)
+        selected = clock()
+        result = self._simulate(state, records)
+        simulated = clock()
+        self._backpropagate(path, result)
+        backpropagated = clock()
+        if self.engine.check_end_of_game(state):
+            stats.rollouts['end_of_game'] += 1
+        elif self.engine.get_legal_moves(state) or any(state.bag) or any(state.discard):
+            # The rollout would have gone on (tiling the walls and drawing new tiles if the round is over)
+            stats.rollouts['max_depth'] += 1
+        else:
+            stats.rollouts['no_moves'] += 1
+        restore_start = clock()
+        while records:
+            state.unmake_move(records.pop())
+
+        times['copy'] += clock() - restore_start
+        times['select'] += selected - start - (times['expand'] - expand_time)
+        times['simulate'] += simulated - selected
+        times['backpropagate'] += backpropagated - simulated
+        stats.simulations += 1
+        stats.max_depth = max(stats.max_depth, len(path) - 1)
+
+
+    def _select(self, node, state, records, path):
         """
-        Selects the node to expand using the UCB policy
+        Selects the node to expand using the UCB policy, applying the moves on the way down to the working state.
+        Every node below the starting one is appended to path.
         """
-        while not self.game.check_end_of_game(node.state):
-            if node.is_fully_expanded():
+        while not self.engine.check_end_of_game(state):
+            if node.__class__ is ChanceNode:
+                child = self._sample_refill(node, state, records)
+                if child is None:
+                    return node  # Tiling the walls ended the game
+                path.append(child)
+                if not child.visits:
+                    return child
+                node = child
+            elif node.is_fully_expanded():
                 if not node.children:
                     return node  
                 else:
                     # Select the best child if the node is fully expanded
                     if node.children and all(child.visits >= self.min_visits_per_node for child in node.children):
-                        node = node.best_child(self.exploration_weight)
+                        index = node.best_child_index(self.exploration_weight)
                     else:
-                        node = self._select_child_with_less_visits(node)
+                        index = self._select_child_with_less_visits(node)
+                    records.append(state.make_move(*node.moves[index]))
+                    node = node.children[index]
+                    path.append(node)
             else:
-                return self._expand(node)
+                node = self._expand(node, state, records)
+                path.append(node)
+                return node
         return node
     
     def _select_child_with_less_visits(self, node):
         """
-        Select the best child without the minimun number of visits
+        Index of the first child without the minimun number of visits
         """
-        for child in node.children:
+        for index, child in enumerate(node.children):
             if child.visits < self.min_visits_per_node:
-                return child
+                return index
 
-        return node.children[0]
+        return 0
 
 
-    def _expand(self, node):
+    def _expand(self, node, state, records):
         """
-        Expands the node by trying a new action
+        Expands the node by trying a new action. When instrumenting, its time is added to self.stats.
         """
-        if not node.untried_actions:
+        if self.instrument:
+            start = time.perf_counter()
+        moves = node.moves
+        expanded = len(node.children)
+        if expanded == len(moves):
             raise Exception("No untried actions available for expansion.")
 
-        rand_idx = random.randrange(len(node.untried_actions))
-        move = node.untried_actions.pop(rand_idx)
-        new_state = self.apply_move(node.state, move)
+        # Swap a random untried move into the first untried slot, keeping moves[i] the move of children[i]
+        rand_idx = self.random.randrange(expanded, len(moves))
+        moves[expanded], moves[rand_idx] = moves[rand_idx], moves[expanded]
+        move = moves[expanded]
+        records.append(state.make_move(*move))
         
-        child_node = MCTSNode(new_state, self.game, parent=node, move=move)
+        table = self.transposition_table
+        child_node = table.lookup(state.hash) if table is not None else None
+        if child_node is None:
+            child_node = self._new_node(state, node, move)
+            if table is not None:
+                table.store(state.hash, child_node)
         node.children.append(child_node)
 
-        return child_node   
-    
-    
-    def _simulate(self, state):
+        if self.instrument:
+            self.stats.times['expand'] += time.perf_counter() - start
+        return child_node
+
+
+    def _new_node(self, state, parent, move):
+        """
+        Node of state, reached from parent by move (None after a refill): a ChanceNode when chance_nodes is set
+        and the move ended the round, otherwise an MCTSNode. Every node below the root is allocated here, so
+        this is where an instrumented search counts them, with their depth and legal moves.
+        """
+        node = MCTSNode(state, self.engine, parent=parent, move=move)
+        if self.chance_nodes and move is not None and not node.moves:
+            # The move ended the round
+            node = ChanceNode(parent=parent, move=move)
+        if self.instrument:
+            stats = self.stats
+            stats.nodes_allocated += 1
+            depth = 1
+            while parent.parent is not None:
+                depth += 1
+                parent = parent.parent
+            stats.record_node(depth, len(node.moves))
+        return node
+
+
+    def _sample_refill(self, node, state, records):
+        """
+        Tiles the walls and refills the factories below a ChanceNode. While the widening limit allows
+        it a new refill is drawn, otherwise one of the drawn refills is replayed with the frequency it
+        was drawn. Returns the child of the refill, or None if tiling the walls ended the game.
+        """
+        records.append(state.make_move_tiles_to_wall())
+        if self.engine.check_end_of_game(state):
+            return None
+
+        if len(node.children) < math.ceil(self.chance_widening * node.visits ** self.chance_exponent):
+            records.append(self.engine.make_draw_tiles(state, self.random))
+            # Refills with the same factory contents in another order share their child
+            self.engine.sort_factories(state)
+            index = node.outcome_index.get(state.hash)
+            if index is not None:
+                node.counts[index] += 1
+                return node.children[index]
+
+            table = self.transposition_table
+            child_node = table.lookup(state.hash) if table is not None else None
+            if child_node is None:
+                child_node = self._new_node(state, node, None)
+                if table is not None:
+                    table.store(state.hash, child_node)
+            node.outcome_index[state.hash] = len(node.children)
+            node.children.append(child_node)
+            node.refills.append(self.engine.refill_of(state))
+            node.counts.append(1)
+            return child_node
+
+        index = self.random.choices(range(len(node.children)), node.counts)[0]
+        records.append(self.engine.make_refill(state, node.refills[index]))
+        return node.children[index]
+
+
+    def _simulate(self, state, records):
         """
-        Simulates a game to its end or until the maximum depth is reached
+        Simulates a game to its end or until the maximum depth is reached, recording every change to the state
         """
         depth = 0
-        while not self.game.check_end_of_game(state) and depth < self.max_simulation_depth:
-            if self.game.check_end_of_round(state):
-                self.game.draw_tiles(state)
-                state.move_tiles_to_wall()
-            legal_moves = self.game.get_legal_moves(state)
+        policy = self.rollout_policy
+        while not self.engine.check_end_of_game(state) and depth < self.max_simulation_depth:
+            legal_moves = self.engine.get_legal_moves(state)
             if not legal_moves:
-                break  
-            move = random.choice(legal_moves)
-            state = self.apply_move(state, move)
+                # The round is over (the first player token may be left in the center):
+                # tile the walls first, so the refill can use the tiles they discard
+                records.append(state.make_move_tiles_to_wall())
+                if self.engine.check_end_of_game(state):
+                    break
+                records.append(self.engine.make_draw_tiles(state, self.random))
+                legal_moves = self.engine.get_legal_moves(state)
+                if not legal_moves:
+                    break  # Nothing left to draw
+            move = self.random.choice(legal_moves) if policy is None else policy.choose(state, legal_moves, self.random)
+            records.append(state.make_move(*move))
             depth += 1     
         
-        result = self.game.get_result(state)
+        result = self.engine.get_result(state)
         return result
     
 
@@ -160,75 +807,29 @@ class MCTS:
         """
         Returns a copy of the new state after the move
         """
-        if not isinstance(state, AzulState):
-            raise ValueError("state debe ser una instancia de AzulState")
+        if not isinstance(state, CompactAzulState):
+            raise ValueError("state debe ser una instancia de CompactAzulState")
        
         factory_num, tile_color, row_num = move
-        new_state = copy.deepcopy(state)
+        new_state = state.clone()
 
         new_state.move_tiles(factory_num, tile_color, row_num)
         return new_state
     
 
-    def _backpropagate(self, node, result):
+    def _backpropagate(self, path, result):
         """
-        Propagates the result of the simulation upwards through the tree
+        Propagates the result of the simulation upwards through the nodes of the selected path
         """
-        while node:
+        for node in path:
             node.update(result)
-            node = node.parent
 
 
 
-# Example of MCTS vs Random player simulation
+# Example of MCTS vs Random player simulation (see Arena.py for full tournaments)
 if __name__ == "__main__":
-    azul_game = AzulGame()
-    initial_state = azul_game.get_initial_state() 
-    azul_game.draw_tiles(initial_state) 
-    initial_state.display_state()
-
-    mcts = MCTS(azul_game)
-    current_state = initial_state
-    total_games = 20
-
-    for game_number in range(total_games):
-        round_number = 0
-        round_execution_times = []
-
-        while not azul_game.check_end_of_game(current_state):
-            if current_state.current_player == 0:
-                print("MCTS's turn")
-                best_move, search_time = mcts.search(current_state, num_simulations=5000)
-                print(f"MCTS action: {best_move}")
-                current_state.move_tiles(best_move[0], best_move[1], best_move[2])
-                current_state.display_state()
-            else:
-                print("Random player's turn")
-                random_move = azul_game.random_player(current_state)
-                print(f"Random action: {random_move}")
-                current_state.move_tiles(random_move[0], random_move[1], random_move[2])
-                current_state.display_state()
-            
-            if azul_game.check_end_of_round(current_state):
-                current_state.move_tiles_to_wall()
-                azul_game.display_scores(current_state)
-                current_state.display_state()
-
-                azul_game.draw_tiles(current_state)
-
-
-        print(f"Game Over: {game_number}")
-        print("Final State:")
-        current_state.display_state()
-        input()
-
-        azul_game.display_scores(current_state)
-        for i, player in enumerate(current_state.players):
-                print(f"Player {i+1} final score: {player['score']} points")
-
-        # Reset for next game
-        current_state = azul_game.get_initial_state() 
-        azul_game.draw_tiles(current_state)
-        
-
+    from Arena import Arena, RandomAgent, MCTSAgent, summarize, format_summary
 
+    agents = {'random': RandomAgent(), 'mcts-5000': MCTSAgent(num_simulations=5000, reuse_tree=True)}
+    rows = Arena(agents, seed=0).run(20, 'mcts_vs_random.csv')
+    print(format_summary(summarize(rows, list(agents))))
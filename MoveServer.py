@@ -0,0 +1,488 @@
+import argparse
+import asyncio
+import bisect
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from Azul import AzulState, AzulGame
+from AzulDQN import select_actions
+from AzulEncoding import state_to_vector, legal_action_mask, decode_action
+from Arena import RandomAgent, MCTSAgent, DQNAgent
+
+# Protocol: one JSON object per line in each direction.
+#   request  {"id": 1, "agent": "mcts-1000", "state": AzulState.to_dict(), "deadline_ms": 500, "seed": 7}
+#   response {"id": 1, "agent": "mcts-1000", "move": [factory, color, row], "latency_ms": 212.4}
+#         or {"id": 1, "error": "deadline exceeded"}
+#   request  {"id": 2, "type": "stats"} -> {"id": 2, "stats": {agent: {...}}}
+# factory is -1 for the center. Requests on one connection are served concurrently and
+# answered as they finish, so clients match responses by id.
+
+LATENCY_BOUNDS = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0]  # Upper bounds in seconds
+
+
+class LatencyHistogram:
+    """
+    Request latencies in fixed buckets (the last one is unbounded), with approximate percentiles.
+    """
+
+    def __init__(self, bounds=LATENCY_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def count(self):
+        return sum(self.counts)
+
+    def percentile(self, q):
+        """
+        q-th percentile (q in [0, 100]), interpolated inside its bucket. The maximum bounds the last bucket.
+        """
+        target = q / 100 * self.count()
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.bounds + [self.max], self.counts):
+            upper = min(bound, self.max)
+            if count and seen + count >= target:
+                return lower + (upper - lower) * (target - seen) / count
+            seen += count
+            lower = upper
+        return 0.0
+
+    def as_dict(self):
+        count = self.count()
+        return {'count': count,
+                'mean_ms': self.total / count * 1000 if count else 0.0,
+                'p50_ms': self.percentile(50) * 1000,
+                'p95_ms': self.percentile(95) * 1000,
+                'p99_ms': self.percentile(99) * 1000,
+                'max_ms': self.max * 1000,
+                'buckets_ms': {f'{bound * 1000:g}': n for bound, n in zip(self.bounds, self.counts)} | {'inf': self.counts[-1]}}
+
+
+class AgentStats:
+    """
+    Latency histogram and outcome counters of one agent.
+    """
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.errors = {}  # Error message -> count
+        self.batches = 0  # DQN forward passes
+        self.batched = 0  # Requests served by those passes
+
+    def as_dict(self):
+        stats = {'latency': self.latency.as_dict(), 'errors': dict(self.errors)}
+        if self.batches:
+            stats['mean_batch'] = self.batched / self.batches
+        return stats
+
+
+class RequestError(Exception):
+    """
+    Request rejected with a message for the client (bad request, overloaded server, expired deadline).
+    """
+
+
+_worker_agents = None  # Agents searched in a worker process
+
+
+def _init_worker(agents):
+    global _worker_agents
+    _worker_agents = agents
+
+
+def _search_task(name, state_dict, deadline, seed):
+    """
+    Move of agent name in a worker process, searching until the deadline (a time.time() value) at most.
+    A deadline already past still gets the one simulation an anytime search always runs.
+    """
+    max_seconds = max(deadline - time.time(), 0.0)
+    state = AzulState.from_dict(state_dict)
+    return _worker_agents[name].select_move(AzulGame(), state, random.Random(seed), max_seconds=max_seconds)
+
+
+class DQNBatcher:
+    """
+    Collects DQNAgent requests for up to max_wait seconds (or max_batch requests) and
+    answers them with a single forward pass, in a background thread.
+    """
+
+    def __init__(self, agent, stats, max_queue=1024, max_batch=256, max_wait=0.002):
+        self.agent = agent
+        self.stats = stats
+        self.queue = asyncio.Queue(max_queue)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.executor = ThreadPoolExecutor(1)  # A single thread keeps the passes in order and off the event loop
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.executor.shutdown()
+
+    def submit(self, state, deadline):
+        """
+        Future of the move for state. Raises RequestError when the queue is full.
+        """
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((state, deadline, future))
+        except asyncio.QueueFull:
+            raise RequestError("overloaded")
+        return future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            end_time = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = end_time - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Requests whose deadline passed while waiting are not evaluated
+            now = time.time()
+            live = []
+            for state, deadline, future in batch:
+                if future.done():
+                    continue
+                if now >= deadline:
+                    future.set_exception(RequestError("deadline exceeded"))
+                else:
+                    live.append((state, future))
+            if not live:
+                continue
+            try:
+                moves = await loop.run_in_executor(self.executor, self._select_moves, [state for state, _ in live])
+            except Exception as error:
+                for _, future in live:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            self.stats.batches += 1
+            self.stats.batched += len(live)
+            for (_, future), move in zip(live, moves):
+                if not future.done():
+                    future.set_result(move)
+
+    def _select_moves(self, states):
+        if self.agent.net is None:
+            self.agent.net = self.agent._load(self.agent.path)
+        game = AzulGame()
+        vectors = np.stack([state_to_vector(state) for state in states])
+        masks = np.stack([legal_action_mask(game.get_legal_moves(state)) for state in states])
+        return [decode_action(int(action)) for action in select_actions(self.agent.net, vectors, masks)]
+
+
+class MoveServer:
+    """
+    Asyncio move service for many concurrent game sessions, over TCP or a Unix socket.
+
+    MCTSAgent searches run in a process pool, with at most max_pending requests
+    waiting or running; DQNAgent requests are micro-batched into one forward pass;
+    other agents (RandomAgent) answer inline. Every request has a deadline
+    (deadline_ms, or default_deadline seconds): MCTS searches are cut to it, but
+    run one simulation at least, and requests that miss it are answered with an error.
+    """
+
+    def __init__(self, agents, num_workers=None, max_pending=64, max_queue=1024, default_deadline=1.0, max_batch=256,
+                 max_wait=0.002):
+        self.agents = agents  # Name -> agent
+        self.game = AzulGame()
+        self.num_workers = num_workers or os.cpu_count()
+        self.max_pending = max_pending  # MCTS requests waiting for or running in the pool
+        self.max_queue = max_queue  # Requests waiting for each DQN batch
+        self.default_deadline = default_deadline
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.stats = {name: AgentStats() for name in agents}
+        self.pending = 0  # MCTS requests in the process pool
+        self.pool = None
+        self.batchers = {}
+        self.server = None
+        self.connections = {}  # Writer -> handler task of every open connection, closed by stop
+
+    async def start(self, host='127.0.0.1', port=8765, path=None):
+        """
+        Listens on path (a Unix socket) when given, otherwise on host:port (port 0 picks a free one).
+        """
+        search_agents = {name: agent for name, agent in self.agents.items() if isinstance(agent, MCTSAgent)}
+        if search_agents:
+            self.pool = ProcessPoolExecutor(self.num_workers, initializer=_init_worker, initargs=(search_agents,))
+        for name, agent in self.agents.items():
+            if isinstance(agent, DQNAgent):
+                self.batchers[name] = DQNBatcher(agent, self.stats[name], self.max_queue, self.max_batch,
+                                                 self.max_wait)
+                self.batchers[name].start()
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self._handle_connection, path)
+        else:
+            self.server = await asyncio.start_server(self._handle_connection, host, port)
+        return self.server.sockets[0].getsockname()
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def stop(self):
+        self.server.close()
+        for writer in self.connections:
+            writer.close()
+        await asyncio.gather(*self.connections.values(), return_exceptions=True)
+        await self.server.wait_closed()
+        for batcher in self.batchers.values():
+            await batcher.stop()
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+    async def _handle_connection(self, reader, writer):
+        tasks = set()
+        self.connections[writer] = asyncio.current_task()
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self._answer(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            self.connections.pop(writer, None)
+            writer.close()
+
+    async def _answer(self, line, writer):
+        response = await self.handle_request(line)
+        try:
+            writer.write(json.dumps(response).encode() + b'\n')
+            await writer.drain()
+        except ConnectionError:
+            pass  # The client left before its answer
+
+    async def handle_request(self, line):
+        """
+        Response dict of one request line.
+        """
+        start_time = time.perf_counter()
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError:
+            return {'id': None, 'error': "invalid JSON"}
+        if not isinstance(request, dict):
+            return {'id': None, 'error': "invalid JSON"}
+        request_id = request.get('id')
+        if request.get('type') == 'stats':
+            return {'id': request_id, 'stats': {name: stats.as_dict() for name, stats in self.stats.items()}}
+
+        name = request.get('agent')
+        if name not in self.agents:
+            return {'id': request_id, 'error': f"unknown agent {name!r}"}
+        try:
+            move = await self._select_move(name, request)
+        except RequestError as error:
+            message = str(error)
+        except Exception as error:
+            message = f"{type(error).__name__}: {error}"
+        else:
+            latency = time.perf_counter() - start_time
+            self.stats[name].latency.record(latency)
+            return {'id': request_id, 'agent': name, 'move': list(move), 'latency_ms': latency * 1000}
+        errors = self.stats[name].errors
+        errors[message] = errors.get(message, 0) + 1
+        return {'id': request_id, 'agent': name, 'error': message}
+
+    async def _select_move(self, name, request):
+        deadline_ms = request.get('deadline_ms')
+        seconds = max(deadline_ms / 1000 if deadline_ms is not None else self.default_deadline, 0.0)
+        deadline = time.time() + seconds
+        try:
+            state = AzulState.from_dict(request['state'])
+        except (KeyError, TypeError, ValueError):
+            raise RequestError("invalid state")
+        if not self.game.get_legal_moves(state):
+            raise RequestError("no legal moves")
+
+        agent = self.agents[name]
+        if name in self.batchers:
+            future = self.batchers[name].submit(state, deadline)
+        elif isinstance(agent, MCTSAgent):
+            if self.pending >= self.max_pending:
+                raise RequestError("overloaded")
+            self.pending += 1
+            future = asyncio.get_running_loop().run_in_executor(self.pool, _search_task, name, request['state'],
+                                                                deadline, request.get('seed'))
+            future.add_done_callback(self._search_done)
+        else:
+            return agent.select_move(self.game, state, random.Random(request.get('seed')))
+
+        try:
+            # A little grace for the search to return once its time is up
+            move = await asyncio.wait_for(asyncio.shield(future), seconds + 0.05)
+        except asyncio.TimeoutError:
+            raise RequestError("deadline exceeded")
+        return move
+
+    def _search_done(self, future):
+        self.pending -= 1
+
+
+class MoveClient:
+    """
+    Stand-in asyncio client: many concurrent request_move calls share one connection.
+    """
+
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self.ids = itertools.count()
+        self.waiting = {}  # Request id -> future of its response
+        self.task = None
+
+    async def connect(self, host='127.0.0.1', port=8765, path=None):
+        if path is not None:
+            self.reader, self.writer = await asyncio.open_unix_connection(path)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.task = asyncio.create_task(self._read_responses())
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.task.cancel()
+
+    async def request(self, request):
+        """
+        Sends request (an id is added) and returns the response dict.
+        """
+        request = dict(request, id=next(self.ids))
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[request['id']] = future
+        self.writer.write(json.dumps(request).encode() + b'\n')
+        await self.writer.drain()
+        return await future
+
+    async def request_move(self, state, agent, deadline_ms=None, seed=None):
+        """
+        Move (factory, color, row) of agent for the AzulState, or the response dict when it is an error.
+        """
+        response = await self.request({'agent': agent, 'state': state.to_dict(), 'deadline_ms': deadline_ms,
+                                        'seed': seed})
+        return tuple(response['move']) if 'move' in response else response
+
+    async def stats(self):
+        return (await self.request({'type': 'stats'}))['stats']
+
+    async def _read_responses(self):
+        while line := await self.reader.readline():
+            response = json.loads(line)
+            future = self.waiting.pop(response.get('id'), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        for future in self.waiting.values():
+            if not future.done():
+                future.set_exception(ConnectionError("server closed the connection"))
+
+
+async def play_session(client, agent, seed, deadline_ms=None):
+    """
+    One game session: agent (served by the MoveServer) as player 0 against random_player.
+    Returns the final scores and the number of failed requests, which are replaced by random moves.
+    """
+
+    rng = random.Random(seed)
+    game = AzulGame(rng=random.Random(seed))
+    state = game.get_initial_state()
+    game.draw_tiles(state)
+    failures = 0
+    while True:
+        move = None
+        if state.current_player == 0:
+            move = await client.request_move(state, agent, deadline_ms, rng.getrandbits(32))
+            if isinstance(move, dict):
+                failures += 1
+                move = None
+        state.move_tiles(*(move or game.random_player(state, rng)))
+        if game.check_end_of_round(state) or not game.get_legal_moves(state):
+            state.move_tiles_to_wall()
+            if game.check_end_of_game(state):
+                return [player['score'] for player in state.players], failures
+            game.draw_tiles(state)
+
+
+def build_agents(mcts_budgets=(), mcts_seconds=None, dqn=None):
+    """
+    Agents of the command line: 'random', 'mcts-<simulations>' and 'dqn'.
+    """
+
+    agents = {'random': RandomAgent()}
+    for budget in mcts_budgets:
+        agents[f'mcts-{budget}'] = MCTSAgent(num_simulations=budget, simulation_seconds=mcts_seconds, anytime=True)
+    if dqn:
+        agents['dqn'] = DQNAgent(dqn)
+    return agents
+
+
+async def _serve(args):
+    server = MoveServer(build_agents(args.mcts, dqn=args.dqn), args.workers, args.max_pending,
+                        default_deadline=args.deadline_ms / 1000)
+    address = await server.start(args.host, args.port, args.unix)
+    print(f"Serving {', '.join(server.agents)} on {address}")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.stop()
+
+
+async def _client(args):
+    client = MoveClient()
+    await client.connect(args.host, args.port, args.unix)
+    start_time = time.perf_counter()
+    results = await asyncio.gather(*(play_session(client, args.agent, args.seed + i, args.deadline_ms)
+                                     for i in range(args.sessions)))
+    duration = time.perf_counter() - start_time
+    wins = sum(scores[0] > scores[1] for scores, _ in results)
+    failures = sum(failed for _, failed in results)
+    print(f"{args.sessions} sessions in {duration:.1f}s: {args.agent} won {wins}, {failures} failed requests")
+    print(json.dumps((await client.stats())[args.agent], indent=2))
+    await client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Asyncio move server for MCTS and DQN agents, and a stand-in client")
+    parser.add_argument('mode', choices=['serve', 'client'])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="Unix socket path instead of TCP")
+    parser.add_argument('--mcts', type=int, nargs='*', default=[1000], help="MCTS agents by simulations per move")
+    parser.add_argument('--dqn', help="DQN checkpoint (model.pth) or TorchScript export")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--max-pending', type=int, default=64, help="MCTS requests queued or running before rejecting")
+    parser.add_argument('--deadline-ms', type=float, default=1000, help="Default deadline of a request")
+    parser.add_argument('--agent', default='mcts-1000', help="Agent the client plays with")
+    parser.add_argument('--sessions', type=int, default=8, help="Concurrent game sessions of the client")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    asyncio.run(_serve(args) if args.mode == 'serve' else _client(args))
@@ -0,0 +1,204 @@
+import math
+import time
+import numpy as np
+import torch
+from Azul import AzulState
+from AzulCompact import CompactAzulState, CompactAzulGame
+from AzulEncoding import compact_state_to_vector, encode_action, input_dim
+
+
+class PUCTNode:
+    """
+    Node of NetworkMCTS. The statistics of its moves are arrays in the order of moves: prior
+    probability, visits and total value, for the player to move at the node.
+    """
+
+    __slots__ = ('player', 'moves', 'actions', 'priors', 'visits', 'values', 'total', 'children', 'value')
+
+    def __init__(self, player, moves):
+        self.player = player
+        self.moves = moves
+        self.actions = [encode_action(*move) for move in moves]  # Network output index of every move
+        self.priors = None  # Set once the network has evaluated the node
+        self.visits = np.zeros(len(moves))
+        self.values = np.zeros(len(moves))
+        self.total = 0  # Visits of all the moves
+        self.children = [None] * len(moves)
+        self.value = None  # Exact value at the end of the round, for the player to move
+
+
+
+class NetworkMCTS:
+    """
+    PUCT search guided by a DuelingDQN (or its TorchScript export) instead of rollouts.
+
+    The masked Q-values of a position give the priors of its moves (a softmax at
+    prior_temperature). Leaves are collected batch_size at a time, spread over
+    the tree with a virtual loss, and evaluated with one forward pass. Every leaf
+    is valued in points, as the score lead of the player to move once the walls
+    are tiled: exact at the end of the round, where the tree stops, and the lead
+    the position would give if the round ended there otherwise. The Q-values are
+    not used as values, since they are discounted sums of the shaped training
+    reward (immediate_action_scoring / 100), a different scale from the points
+    of the round-end leaves. Values are negamax: each player maximizes its own lead.
+    """
+
+    def __init__(self, net, c_puct=1.5, batch_size=16, virtual_loss=1.0, prior_temperature=1.0, device='cpu'):
+        self.net = net
+        self.c_puct = c_puct  # Weight of the prior in the exploration term
+        self.batch_size = batch_size  # Leaves per forward pass
+        self.virtual_loss = virtual_loss  # Points taken from a move while one of its leaves waits for the network
+        self.prior_temperature = prior_temperature
+        self.device = device
+        self.engine = CompactAzulGame()
+        self.value_bound = 0.0  # Largest absolute value seen, to scale the values to [0, 1] in PUCT
+        self.simulations = 0  # Simulations and forward passes of the last search
+        self.forward_passes = 0
+
+    def search(self, initial_state, num_simulations=None, simulation_seconds=None):
+        """
+        Searches for a given number of simulations or seconds and returns the most visited move and the search time.
+        """
+        start_time = time.perf_counter()
+        root = self.build_tree(initial_state, num_simulations, simulation_seconds)
+        best_move = root.moves[int(root.visits.argmax())]
+        return best_move, time.perf_counter() - start_time
+
+    def build_tree(self, initial_state, num_simulations=None, simulation_seconds=None):
+        """
+        Runs the simulations of a search and returns the root node.
+        """
+        if isinstance(initial_state, AzulState):
+            state = CompactAzulState.from_state(initial_state)
+        else:
+            state = initial_state.clone()
+        end_time = time.perf_counter() + simulation_seconds if num_simulations is None else None
+        self.value_bound = 0.0
+        self.simulations = self.forward_passes = 0
+
+        root = PUCTNode(state.current_player, self.engine.get_legal_moves(state))
+        if not root.moves:
+            raise ValueError("No legal moves to search from.")
+        batch = np.zeros((self.batch_size, input_dim), dtype=np.float32)
+        compact_state_to_vector(state, out=batch[0])
+        self._evaluate(batch, [(root, [], self._tiled_lead(state, root.player))])
+        if len(root.moves) == 1:
+            return root
+
+        while num_simulations is None or self.simulations < num_simulations:
+            if end_time is not None and time.perf_counter() >= end_time:
+                break
+            size = self.batch_size if num_simulations is None else min(self.batch_size, num_simulations - self.simulations)
+            self._run_batch(root, state, batch, size)
+        return root
+
+    def _run_batch(self, root, state, batch, size):
+        """
+        Collects up to size leaves and evaluates them with one forward pass. Leaves at the end of
+        the round are backpropagated at once; a leaf already waiting for the network ends the batch.
+        """
+        pending = []
+        finished = 0  # Leaves at the end of the round
+        while len(pending) + finished < size:
+            path, leaf, records = self._select(root, state)
+            if leaf is None:
+                # Collision with a leaf of this batch: undo the virtual loss and evaluate what there is
+                for node, index in path:
+                    node.visits[index] -= 1
+                    node.total -= 1
+                    node.values[index] += self.virtual_loss
+                self._unmake(state, records)
+                break
+            if leaf.value is not None:
+                self._backpropagate(path, leaf.player, leaf.value)
+                finished += 1
+            else:
+                compact_state_to_vector(state, out=batch[len(pending)])
+                pending.append((leaf, path, self._tiled_lead(state, leaf.player)))
+            self._unmake(state, records)
+        if pending:
+            self._evaluate(batch, pending)
+        self.simulations += finished + len(pending)
+
+    def _select(self, node, state):
+        """
+        Goes down the tree by PUCT from node, applying the moves to state and a virtual loss to every move taken.
+        Returns the path of (node, move index), the leaf reached (None on a leaf waiting for the network)
+        and the records to unmake the moves.
+        """
+        path = []
+        records = []
+        while True:
+            if node.value is not None:
+                return path, node, records
+            if node.priors is None:
+                return path, None, records
+            index = self._puct_index(node)
+            node.visits[index] += 1
+            node.total += 1
+            node.values[index] -= self.virtual_loss
+            path.append((node, index))
+            records.append(state.make_move(*node.moves[index]))
+            child = node.children[index]
+            if child is None:
+                child = node.children[index] = PUCTNode(state.current_player, self.engine.get_legal_moves(state))
+                if not child.moves:
+                    # End of the round (possibly with the first player token left in the center)
+                    child.value = self._tiled_lead(state, child.player)
+                return path, child, records
+            node = child
+
+    def _puct_index(self, node):
+        """
+        Index of the move with the best value (scaled to [0, 1]) plus exploration bonus.
+        Unvisited moves take the average value of the node.
+        """
+        visits = node.visits
+        total = node.total
+        first_play = node.values.sum() / total if total else 0.0
+        q = np.where(visits > 0, node.values / np.maximum(visits, 1), first_play)
+        bound = self.value_bound
+        if bound:
+            q = (q / bound + 1) * 0.5
+        else:
+            q = np.full(len(visits), 0.5)
+        scores = q + self.c_puct * node.priors * math.sqrt(total + 1) / (1 + visits)
+        return int(scores.argmax())
+
+    def _evaluate(self, batch, pending):
+        """
+        One forward pass over the first len(pending) rows of batch: sets the priors of every pending
+        (leaf, path, value) and backpropagates its value.
+        """
+        with torch.no_grad():
+            states = torch.from_numpy(batch[:len(pending)]).to(self.device)
+            q_values = self.net(states).cpu().numpy()
+        self.forward_passes += 1
+        for row, (leaf, path, value) in zip(q_values, pending):
+            q = row[leaf.actions]
+            weights = np.exp((q - q.max()) / self.prior_temperature)
+            leaf.priors = weights / weights.sum()
+            self._backpropagate(path, leaf.player, value)
+
+    @staticmethod
+    def _tiled_lead(state, player):
+        """
+        Score lead of player once the walls of state are tiled.
+        """
+        record = state.make_move_tiles_to_wall()
+        lead = state.scores[player] - state.scores[1 - player]
+        state.unmake_move(record)
+        return lead
+
+    def _backpropagate(self, path, player, value):
+        """
+        Adds value (for player) to every move of path, taking back the virtual loss.
+        """
+        self.value_bound = max(self.value_bound, abs(value))
+        for node, index in path:
+            node.values[index] += (value if node.player == player else -value) + self.virtual_loss
+
+    @staticmethod
+    def _unmake(state, records):
+        while records:
+            state.unmake_move(records.pop())
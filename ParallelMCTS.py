@@ -0,0 +1,165 @@
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from Azul import AzulState, AzulGame
+from AzulCompact import CompactAzulState
+from MCTS import MCTS, MCTSNode
+
+
+def _root_worker(state, mcts_params, num_simulations, simulation_seconds, seed):
+    """
+    Builds one independent tree in a worker process and returns its root statistics.
+    """
+
+    mcts = MCTS(AzulGame(), rng=random.Random(seed), **mcts_params)
+    root = mcts.build_tree(state, num_simulations, simulation_seconds)
+    return {move: (child.visits, child.wins) for move, child in zip(root.moves, root.children)}, root.visits
+
+
+def _rollout_worker(state, mcts_params, num_rollouts, seed):
+    """
+    Runs several rollouts from the same leaf state in a worker process and returns their results.
+    """
+
+    mcts = MCTS(AzulGame(), rng=random.Random(seed), **mcts_params)
+    results = []
+    for _ in range(num_rollouts):
+        records = []
+        results.append(mcts._simulate(state, records))
+        while records:
+            state.unmake_move(records.pop())
+    return results
+
+
+class ParallelMCTS:
+    """
+    MCTS over a process pool.
+
+    mode='root' runs num_workers independent trees and merges the visits and
+    wins of each root move. mode='leaf' keeps a single tree in this process and
+    sends the rollouts of every selected leaf to the pool. Worker seeds are
+    drawn from seed, so a seeded search is reproducible.
+    """
+
+    def __init__(self, game, num_workers=None, mode='root', seed=None, rollouts_per_task=8,
+                 exploration_weight=2.5, max_simulation_depth=10, min_visits_per_node=15):
+        if mode not in ('root', 'leaf'):
+            raise ValueError("mode must be 'root' or 'leaf'")
+        self.game = game
+        self.num_workers = num_workers or os.cpu_count()
+        self.mode = mode
+        self.seed = seed
+        self.rollouts_per_task = rollouts_per_task  # Rollouts each worker runs per leaf in leaf mode
+        self.mcts_params = {'exploration_weight': exploration_weight,
+                            'max_simulation_depth': max_simulation_depth,
+                            'min_visits_per_node': min_visits_per_node}
+        self.mcts = MCTS(game, **self.mcts_params)
+        self.pool = None
+        self.simulations = 0  # Simulations run by the last search
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+        Shuts the worker pool down.
+        """
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def _get_pool(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.num_workers)
+        return self.pool
+
+    def search(self, initial_state, num_simulations=None, simulation_seconds=None):
+        """
+        Executes the parallel search and returns (best_move, search_time), like MCTS.search.
+        """
+        if num_simulations is None:
+            assert(simulation_seconds is not None)
+        if isinstance(initial_state, AzulState):
+            initial_state = CompactAzulState.from_state(initial_state)
+        seeder = random.Random(self.seed)
+        start_time = time.time()
+
+        if self.mode == 'root':
+            best_move = self._search_root(initial_state, num_simulations, simulation_seconds, seeder)
+        else:
+            best_move = self._search_leaf(initial_state, num_simulations, simulation_seconds, seeder)
+
+        return best_move, time.time() - start_time
+
+    def _search_root(self, state, num_simulations, simulation_seconds, seeder):
+        """
+        Root parallelism: independent trees whose root move statistics are summed.
+        """
+        pool = self._get_pool()
+        seeds = [seeder.getrandbits(32) for _ in range(self.num_workers)]
+        futures = []
+        for worker in range(self.num_workers):
+            if num_simulations is None:
+                worker_simulations = None
+            else:
+                # Split the budget so the total matches num_simulations
+                worker_simulations = num_simulations // self.num_workers + (worker < num_simulations % self.num_workers)
+                if not worker_simulations:
+                    continue
+            futures.append(pool.submit(_root_worker, state, self.mcts_params, worker_simulations,
+                                       simulation_seconds, seeds[worker]))
+
+        totals = {}
+        self.simulations = 0
+        for future in futures:
+            stats, simulations = future.result()
+            self.simulations += simulations
+            for move, (visits, wins) in stats.items():
+                total_visits, total_wins = totals.get(move, (0, 0))
+                totals[move] = (total_visits + visits, total_wins + wins)
+
+        # Same criterion as best_child(0): highest average result
+        return max(totals, key=lambda move: totals[move][1] / totals[move][0])
+
+    def _search_leaf(self, state, num_simulations, simulation_seconds, seeder):
+        """
+        Leaf parallelism: one tree, with the rollouts of each selected leaf run by the pool.
+        """
+        pool = self._get_pool()
+        self.mcts.random = random.Random(seeder.getrandbits(32))
+        state = state.clone()
+        root = MCTSNode(state, self.mcts.engine)
+        end_time = time.time() + simulation_seconds if num_simulations is None else None
+        self.simulations = 0
+
+        while True:
+            if num_simulations is not None:
+                remaining = num_simulations - self.simulations
+                if remaining <= 0:
+                    break
+            else:
+                if time.time() >= end_time:
+                    break
+                remaining = self.num_workers * self.rollouts_per_task
+
+            records = []
+            path = [root]
+            self.mcts._select(root, state, records, path)
+            tasks = []
+            while remaining > 0 and len(tasks) < self.num_workers:
+                num_rollouts = min(self.rollouts_per_task, remaining)
+                tasks.append(pool.submit(_rollout_worker, state, self.mcts_params, num_rollouts,
+                                         seeder.getrandbits(32)))
+                remaining -= num_rollouts
+            for task in tasks:
+                for result in task.result():
+                    self.mcts._backpropagate(path, result)
+                    self.simulations += 1
+            while records:
+                state.unmake_move(records.pop())
+
+        return root.moves[root.best_child_index(0)]
@@ -0,0 +1,281 @@
+import os
+import numpy as np
+import torch
+from AzulEncoding import input_dim
+
+
+class ReplayBuffer:
+    """
+    Experience replay buffer that samples uniformly, kept in preallocated arrays used as a ring.
+
+    States are stored as uint8 by default: every entry of the state_to_vector
+    encoding is a small count or color index. With a path, the arrays are
+    .npy files opened as memory maps, so the buffer survives restarts and
+    pickling it only stores the path. With pin_memory (and CUDA available),
+    samples are gathered into pinned staging tensors and copied to the device
+    asynchronously.
+    """
+
+    def __init__(self, size, device, state_dim=input_dim, state_dtype=np.uint8, path=None,
+                 pin_memory=False, seed=None):
+        self._size = size
+        self.device = device
+        self.state_dim = state_dim
+        self.state_dtype = state_dtype
+        self.path = path
+        self.pin_memory = pin_memory and torch.cuda.is_available()
+        self.rng = np.random.default_rng(seed)
+        self._staging = {}
+        self._copied = None  # CUDA event of the last copy out of the staging tensors
+        self._open()
+
+    def _fields(self):
+        """
+        Name, dtype and shape of every stored array.
+        """
+        return {'states': (self.state_dtype, (self._size, self.state_dim)),
+                'actions': (np.int16, (self._size,)),
+                'rewards': (np.float32, (self._size,)),
+                'next_states': (self.state_dtype, (self._size, self.state_dim)),
+                'dones': (np.bool_, (self._size,)),
+                'meta': (np.int64, (2,))}  # Next index to write and number of stored transitions
+
+    def _open(self):
+        if self.path is not None:
+            os.makedirs(self.path, exist_ok=True)
+        for name, (dtype, shape) in self._fields().items():
+            if self.path is None:
+                array = np.zeros(shape, dtype=dtype)
+            else:
+                file_name = os.path.join(self.path, name + '.npy')
+                if os.path.exists(file_name):
+                    array = np.load(file_name, mmap_mode='r+')
+                    if array.shape != shape or array.dtype != dtype:
+                        raise ValueError(f"{file_name} does not match the buffer size or dtype")
+                else:
+                    array = np.lib.format.open_memmap(file_name, mode='w+', dtype=dtype, shape=shape)
+            setattr(self, name, array)
+        self._next_idx, self._count = (int(value) for value in self.meta)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_staging'] = {}
+        state['_copied'] = None
+        if self.path is not None:
+            # The arrays are in the .npy files
+            self.flush()
+            for name in self._fields():
+                del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.path is not None:
+            self._open()
+
+    def __len__(self):
+        return self._count
+
+    def add(self, state, action, reward, next_state, done):
+        index = self._next_idx
+        self.states[index] = state
+        self.actions[index] = action
+        self.rewards[index] = reward
+        self.next_states[index] = next_state
+        self.dones[index] = done
+        self._next_idx = (index + 1) % self._size
+        self._count = min(self._count + 1, self._size)
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        """
+        Adds several transitions at once, e.g. one step of an AzulVectorEnv.
+        """
+        count = len(actions)
+        indices = (self._next_idx + np.arange(count)) % self._size
+        self.states[indices] = states
+        self.actions[indices] = actions
+        self.rewards[indices] = rewards
+        self.next_states[indices] = next_states
+        self.dones[indices] = dones
+        self._next_idx = (self._next_idx + count) % self._size
+        self._count = min(self._count + count, self._size)
+
+    def flush(self):
+        """
+        Writes the memory-mapped arrays, and the ring position, to disk.
+        """
+        self.meta[:] = self._next_idx, self._count
+        if self.path is not None:
+            for name in self._fields():
+                getattr(self, name).flush()
+
+    def _stage(self, name, shape, dtype):
+        """
+        Pinned tensor reused to gather the samples of one field.
+        """
+        tensor = self._staging.get(name)
+        if tensor is None or tuple(tensor.shape) != shape:
+            tensor = torch.empty(shape, dtype=dtype, pin_memory=True)
+            self._staging[name] = tensor
+        return tensor
+
+    def sample(self, num_samples):
+        idx = self.rng.integers(0, len(self), num_samples)
+        return self._gather(idx)
+
+    def _gather(self, idx):
+        """
+        Tensors (states, actions, rewards, next_states, dones) of the transitions idx, on the device.
+        """
+        num_samples = len(idx)
+        fields = (('states', self.states, torch.float32), ('actions', self.actions, torch.int64),
+                  ('rewards', self.rewards, torch.float32), ('next_states', self.next_states, torch.float32),
+                  ('dones', self.dones, torch.float32))
+
+        if self._copied is not None:
+            # The staging tensors are still being copied to the device by the previous sample
+            self._copied.synchronize()
+        batch = []
+        for name, array, dtype in fields:
+            if self.pin_memory:
+                staged = self._stage(name, (num_samples,) + array.shape[1:], torch.from_numpy(array[:0]).dtype)
+                np.take(array, idx, axis=0, out=staged.numpy())
+                tensor = staged.to(self.device, non_blocking=True)
+            else:
+                tensor = torch.from_numpy(array[idx]).to(self.device)
+            batch.append(tensor.to(dtype))
+
+        if self.pin_memory:
+            self._copied = torch.cuda.Event()
+            self._copied.record()
+
+        states, actions, rewards, next_states, dones = batch
+        return states, actions, rewards, next_states, dones
+
+
+class SumTree:
+    """
+    Binary tree in a flat array where every node holds the sum of its two children.
+
+    Leaves start at index capacity (rounded up to a power of two) and node i
+    has children 2 * i and 2 * i + 1, so the root, tree[1], is the total.
+    Updates and searches take O(log N) and are vectorized over batches.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.capacity = len(tree) // 2
+        self.depth = self.capacity.bit_length() - 1
+
+    @staticmethod
+    def size_for(capacity):
+        """
+        Length of the array that holds a tree with capacity leaves.
+        """
+        return 2 * (1 << max(capacity - 1, 0).bit_length())
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    def get(self, indices):
+        return self.tree[self.capacity + np.asarray(indices)]
+
+    def update(self, indices, values):
+        """
+        Sets the leaves indices to values and recomputes their ancestors.
+        """
+        nodes = self.capacity + np.asarray(indices)
+        self.tree[nodes] = values
+        for _ in range(self.depth):
+            # Parents are recomputed from both children, so repeated nodes just write the same sum
+            nodes //= 2
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values):
+        """
+        Leaf of every value, a cumulative sum in [0, total).
+        """
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = self.tree[2 * nodes]
+            # Rounding can leave a value just past the left sum when the right subtree is empty
+            right = (values >= left) & (self.tree[2 * nodes + 1] > 0)
+            values -= np.where(right, left, 0)
+            nodes = 2 * nodes + right
+        return nodes - self.capacity
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    Replay buffer that samples transitions in proportion to priority ** alpha, with priority = |TD error| + epsilon.
+
+    New transitions get the highest priority seen so far. sample also returns
+    the importance-sampling weights, (N * P(i)) ** -beta normalized by their
+    maximum, and the indices whose priorities update_priorities expects. beta
+    grows from its initial value to 1 by beta_increment per sample.
+    """
+
+    def __init__(self, size, device, alpha=0.6, beta=0.4, beta_increment=1e-4, epsilon=1e-3, **kwargs):
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.epsilon = epsilon
+        super().__init__(size, device, **kwargs)
+
+    def _fields(self):
+        fields = super()._fields()
+        fields['priorities'] = (np.float64, (SumTree.size_for(self._size),))
+        return fields
+
+    def _open(self):
+        super()._open()
+        self.sum_tree = SumTree(self.priorities)
+        self._max_priority = self.sum_tree.get(np.arange(self._count)).max() if self._count else 0.0
+        if not self._max_priority:
+            # Transitions stored without priorities, e.g. by a ReplayBuffer on the same path
+            self._max_priority = 1.0
+            self.sum_tree.update(np.arange(self._count), self._max_priority)
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        if self.path is not None:
+            del state['sum_tree']
+        return state
+
+    def add(self, state, action, reward, next_state, done):
+        index = self._next_idx
+        super().add(state, action, reward, next_state, done)
+        self.sum_tree.update([index], self._max_priority)
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        indices = (self._next_idx + np.arange(len(actions))) % self._size
+        super().add_batch(states, actions, rewards, next_states, dones)
+        self.sum_tree.update(indices, self._max_priority)
+
+    def sample(self, num_samples):
+        """
+        Returns (states, actions, rewards, next_states, dones, weights, indices).
+        """
+        # One value in each of num_samples equal segments of the total priority
+        total = self.sum_tree.total
+        values = (np.arange(num_samples) + self.rng.random(num_samples)) * (total / num_samples)
+        idx = self.sum_tree.find(np.minimum(values, np.nextafter(total, 0)))
+
+        probabilities = self.sum_tree.get(idx) / total
+        weights = (self._count * probabilities) ** -self.beta
+        weights /= weights.max()
+        self.beta = min(1.0, self.beta + self.beta_increment)
+
+        states, actions, rewards, next_states, dones = self._gather(idx)
+        weights = torch.as_tensor(weights, dtype=torch.float32, device=self.device)
+        return states, actions, rewards, next_states, dones, weights, idx
+
+    def update_priorities(self, indices, td_errors):
+        """
+        Sets the priorities of the sampled transitions from their new TD errors.
+        """
+        priorities = (np.abs(np.asarray(td_errors, dtype=np.float64)) + self.epsilon) ** self.alpha
+        self.sum_tree.update(indices, priorities)
+        self._max_priority = max(self._max_priority, priorities.max())
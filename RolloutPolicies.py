@@ -0,0 +1,117 @@
+import math
+from AzulCompact import (COLOR_INDEX, TOKEN, WALL_COLUMN, RUN_LENGTH, PLACEMENT_SCORE, FLOOR_PENALTIES,
+                         penalty)
+
+# Rollout policies for MCTS._simulate (MCTS(rollout_policy=...)). A policy chooses the move of the
+# player to move among the legal moves of a CompactAzulState with choose(state, legal_moves, rng).
+# The informed policies rank the moves by move_values, a one-ply estimate built from table lookups.
+
+MAX_FLOOR = len(FLOOR_PENALTIES) - 1  # Floor tiles beyond this cost nothing more
+MAX_TAKEN = 4 * 5 * 2 + 1  # More tiles of one color than any source can hold, plus the first player token
+
+# FLOOR_LOSS[floor_tiles][added]: (negative) change of the floor penalty when added tiles fall on a floor holding floor_tiles
+FLOOR_LOSS = [[penalty(floor_tiles + added) - penalty(floor_tiles) for added in range(MAX_TAKEN + 1)]
+              for floor_tiles in range(MAX_FLOOR + 1)]
+# FILL_VALUE[row][count]: progress of a pattern line holding count tiles, a fraction of a point below the
+# one point that completing any line is worth
+FILL_VALUE = [[count / (row + 1) * 0.5 for count in range(row + 2)] for row in range(5)]
+
+
+def move_values(state, legal_moves):
+    """
+    Cheap values of the legal moves for the player to move: the wall points of a completed pattern line
+    (with its adjacency) or the progress of a partial one, plus the floor penalty of the tiles that fall.
+    """
+
+    player = state.current_player
+    floor = player * 6
+    floors = state.floors
+    floor_tiles = min(floors[floor] + floors[floor + 1] + floors[floor + 2] + floors[floor + 3]
+                      + floors[floor + 4] + floors[floor + 5], MAX_FLOOR)
+    floor_loss = FLOOR_LOSS[floor_tiles]
+    center = state.center
+    factories = state.factories
+    wall = state.walls[player]
+    columns = state.columns[player]
+    line_counts = state.line_counts
+    token = center[TOKEN]
+
+    values = []
+    for factory_num, tile_color, row_num in legal_moves:
+        color = COLOR_INDEX[tile_color]
+        if factory_num == -1:
+            taken = center[color]
+            fallen = token
+        else:
+            taken = factories[factory_num * 5 + color]
+            fallen = 0
+        if row_num == -1:
+            values.append(floor_loss[taken + fallen])
+            continue
+        count = line_counts[player * 5 + row_num]
+        space = row_num + 1 - count
+        if taken >= space:
+            # The line is completed: its tile scores on the wall at the end of the round
+            col = WALL_COLUMN[row_num][color]
+            value = PLACEMENT_SCORE[RUN_LENGTH[wall >> (row_num * 5) & 31][col]][RUN_LENGTH[columns >> (col * 5) & 31][row_num]]
+            fallen += taken - space
+        else:
+            fill = FILL_VALUE[row_num]
+            value = fill[count + taken] - fill[count]
+        values.append(value + floor_loss[fallen] if fallen else value)
+    return values
+
+
+class UniformRollout:
+    """
+    Uniformly random moves, as MCTS does without a rollout policy.
+    """
+
+    def choose(self, state, legal_moves, rng):
+        return rng.choice(legal_moves)
+
+
+class EpsilonGreedyRollout:
+    """
+    A uniformly random move with probability epsilon, otherwise the best move by move_values (ties broken at random).
+    """
+
+    def __init__(self, epsilon=0.1):
+        self.epsilon = epsilon
+
+    def choose(self, state, legal_moves, rng):
+        if rng.random() < self.epsilon:
+            return rng.choice(legal_moves)
+        values = move_values(state, legal_moves)
+        best = max(values)
+        best_moves = [move for move, value in zip(legal_moves, values) if value == best]
+        return best_moves[0] if len(best_moves) == 1 else rng.choice(best_moves)
+
+
+class SoftmaxRollout:
+    """
+    Moves drawn with probability proportional to exp(move value / temperature).
+    """
+
+    def __init__(self, temperature=1.0):
+        self.temperature = temperature
+
+    def choose(self, state, legal_moves, rng):
+        values = move_values(state, legal_moves)
+        best = max(values)
+        temperature = self.temperature
+        weights = [math.exp((value - best) / temperature) for value in values]
+        return rng.choices(legal_moves, weights)[0]
+
+
+ROLLOUT_POLICIES = {'uniform': UniformRollout, 'epsilon_greedy': EpsilonGreedyRollout, 'softmax': SoftmaxRollout}
+
+
+def make_rollout_policy(name, **params):
+    """
+    Rollout policy by name ('uniform', 'epsilon_greedy' or 'softmax') with its keyword parameters.
+    """
+
+    if name not in ROLLOUT_POLICIES:
+        raise ValueError(f"Unknown rollout policy {name!r}, expected one of {', '.join(ROLLOUT_POLICIES)}")
+    return ROLLOUT_POLICIES[name](**params)
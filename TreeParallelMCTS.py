@@ -0,0 +1,255 @@
+import math
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from Azul import AzulState, AzulGame
+from AzulCompact import CompactAzulState, CompactAzulGame, COLOR_INDEX, TILES
+from MCTS import MCTS
+
+# Moves are stored in the tree as small integer codes: (source * 5 + color) * 6 + row, with -1 mapped to 5
+MOVES = [(source if source < 5 else -1, TILES[color], row if row < 5 else -1)
+         for source in range(6) for color in range(5) for row in range(6)]
+
+UNEXPANDED = 0
+EXPANDED = 1
+NUM_STRIPES = 64  # Locks guarding the node statistics, node i uses lock i % NUM_STRIPES
+
+
+def encode_move(move):
+    """
+    Returns the integer code of a (factory_num, tile_color, row_num) move.
+    """
+
+    factory_num, tile_color, row_num = move
+    return ((factory_num % 6) * 5 + COLOR_INDEX[tile_color]) * 6 + row_num % 6
+
+
+class SharedTree:
+    """
+    Search tree stored as flat arrays indexed by node id, so it can be shared by threads or processes.
+
+    Every update of the node statistics (visits, wins, virtual) is a read and a
+    write, so it is done under the striped lock of the node; selection reads
+    them without locks. With lock_free the updates take no lock at all: two
+    workers updating one node at once can lose a visit or leave a virtual
+    visit behind for good. The tree lock is only taken to allocate the
+    contiguous block of children of a node the first time it is expanded.
+    """
+
+    def __init__(self, max_nodes, lock_class, num_stripes=NUM_STRIPES, lock_free=False):
+        self.max_nodes = max_nodes
+        self.lock = lock_class()
+        self.stripes = None if lock_free else [lock_class() for _ in range(num_stripes)]
+        self.visits = multiprocessing.RawArray('d', max_nodes)
+        self.wins = multiprocessing.RawArray('d', max_nodes)
+        self.virtual = multiprocessing.RawArray('i', max_nodes)  # Workers currently below each node
+        self.move = multiprocessing.RawArray('i', max_nodes)
+        self.first_child = multiprocessing.RawArray('i', max_nodes)
+        self.num_children = multiprocessing.RawArray('i', max_nodes)
+        self.status = multiprocessing.RawArray('b', max_nodes)
+        self.num_nodes = multiprocessing.RawValue('i', 1)  # Node 0 is the root
+
+    def expand(self, node, legal_moves):
+        """
+        Allocates the children of node for legal_moves. Returns False when the tree is full.
+        """
+
+        with self.lock:
+            if self.status[node] == EXPANDED:
+                return True
+            first = self.num_nodes.value
+            if first + len(legal_moves) > self.max_nodes:
+                return False
+            for i, move in enumerate(legal_moves):
+                self.move[first + i] = encode_move(move)
+            self.first_child[node] = first
+            self.num_children[node] = len(legal_moves)
+            self.num_nodes.value = first + len(legal_moves)
+            # Published last: readers only follow the children of EXPANDED nodes
+            self.status[node] = EXPANDED
+        return True
+
+    def add_virtual(self, node):
+        """
+        Counts a worker going below node.
+        """
+
+        if self.stripes is None:
+            self.virtual[node] += 1
+            return
+        with self.stripes[node % len(self.stripes)]:
+            self.virtual[node] += 1
+
+    def backup(self, path, result):
+        """
+        Adds the result of a simulation to every node of path and takes back its virtual visit.
+        """
+
+        visits, wins, virtual, stripes = self.visits, self.wins, self.virtual, self.stripes
+        if stripes is None:
+            for node in path:
+                visits[node] += 1
+                wins[node] += result
+                virtual[node] -= 1
+            return
+        for node in path:
+            with stripes[node % len(stripes)]:
+                visits[node] += 1
+                wins[node] += result
+                virtual[node] -= 1
+
+    def select_child(self, node, exploration_weight, min_visits_per_node):
+        """
+        Same policy as MCTS._select with virtual loss: in-flight visits count as visits with no result.
+        """
+
+        visits, wins, virtual = self.visits, self.wins, self.virtual
+        first = self.first_child[node]
+        children = range(first, first + self.num_children[node])
+
+        for child in children:
+            if visits[child] + virtual[child] < min_visits_per_node:
+                return child
+
+        log_visits = math.log(visits[node] + virtual[node])
+        best_child = first
+        best_weight = -math.inf
+        for child in children:
+            child_visits = visits[child] + virtual[child]
+            if not child_visits:
+                return child
+            weight = wins[child] / child_visits + exploration_weight * math.sqrt(2 * log_visits / child_visits)
+            if weight > best_weight:
+                best_child = child
+                best_weight = weight
+        return best_child
+
+
+def _tree_worker(tree, state, mcts_params, num_simulations, end_time, seed, depths, counts, worker):
+    """
+    Runs simulations on the shared tree until the worker's budget is spent.
+    """
+
+    mcts = MCTS(AzulGame(), rng=random.Random(seed), **mcts_params)
+    engine = mcts.engine
+    visits = tree.visits
+    simulations = 0
+    max_depth = 0
+
+    while True:
+        if num_simulations is not None and simulations >= num_simulations:
+            break
+        if end_time is not None and time.time() >= end_time:
+            break
+
+        node = 0
+        path = [0]
+        records = []
+        tree.add_virtual(0)
+        while not engine.check_end_of_game(state):
+            if tree.status[node] != EXPANDED and not tree.expand(node, engine.get_legal_moves(state)):
+                break
+            if not tree.num_children[node]:
+                break
+            node = tree.select_child(node, mcts.exploration_weight, mcts.min_visits_per_node)
+            tree.add_virtual(node)
+            path.append(node)
+            records.append(state.make_move(*MOVES[tree.move[node]]))
+            if not visits[node]:
+                break
+
+        result = mcts._simulate(state, records)
+        tree.backup(path, result)
+        while records:
+            state.unmake_move(records.pop())
+
+        simulations += 1
+        max_depth = max(max_depth, len(path) - 1)
+
+    depths[worker] = max_depth
+    counts[worker] = simulations
+
+
+class TreeParallelMCTS:
+    """
+    MCTS with a single tree searched by several workers at once.
+
+    backend='thread' runs the workers as threads, which only scales on
+    free-threaded builds; backend='process' runs them as processes sharing
+    the tree through shared memory. backend='auto' picks threads when the GIL
+    is disabled and processes otherwise. lock_free drops the striped locks
+    of SharedTree: cheaper updates, at the cost of lost ones under contention.
+    """
+
+    def __init__(self, game, num_workers=None, backend='auto', seed=None, max_nodes=500000,
+                 exploration_weight=2.5, max_simulation_depth=10, min_visits_per_node=15, lock_free=False):
+        if backend == 'auto':
+            gil_enabled = getattr(sys, '_is_gil_enabled', lambda: True)()
+            backend = 'process' if gil_enabled else 'thread'
+        if backend not in ('thread', 'process'):
+            raise ValueError("backend must be 'auto', 'thread' or 'process'")
+        self.game = game
+        self.num_workers = num_workers or os.cpu_count()
+        self.backend = backend
+        self.seed = seed
+        self.max_nodes = max_nodes
+        self.lock_free = lock_free
+        self.mcts_params = {'exploration_weight': exploration_weight,
+                            'max_simulation_depth': max_simulation_depth,
+                            'min_visits_per_node': min_visits_per_node}
+        self.tree = None  # Tree of the last search
+        self.max_depth = 0  # Deepest node reached by the last search
+        self.simulations = 0  # Simulations run by all the workers in the last search
+
+    def search(self, initial_state, num_simulations=None, simulation_seconds=None):
+        """
+        Executes the search and returns (best_move, search_time), like MCTS.search.
+        """
+        if num_simulations is None:
+            assert(simulation_seconds is not None)
+        if isinstance(initial_state, AzulState):
+            initial_state = CompactAzulState.from_state(initial_state)
+        seeder = random.Random(self.seed)
+        start_time = time.time()
+        end_time = start_time + simulation_seconds if num_simulations is None else None
+
+        if self.backend == 'thread':
+            lock_class, worker_class = threading.Lock, threading.Thread
+        else:
+            lock_class, worker_class = multiprocessing.Lock, multiprocessing.Process
+        tree = SharedTree(self.max_nodes, lock_class, lock_free=self.lock_free)
+        depths = multiprocessing.RawArray('i', self.num_workers)
+        counts = multiprocessing.RawArray('i', self.num_workers)
+
+        workers = []
+        for worker in range(self.num_workers):
+            if num_simulations is None:
+                worker_simulations = None
+            else:
+                worker_simulations = num_simulations // self.num_workers + (worker < num_simulations % self.num_workers)
+            args = (tree, initial_state.clone(), self.mcts_params, worker_simulations, end_time,
+                    seeder.getrandbits(32), depths, counts, worker)
+            workers.append(worker_class(target=_tree_worker, args=args))
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.tree = tree
+        self.max_depth = max(depths)
+        self.simulations = sum(counts)
+        first = tree.first_child[0]
+        children = [child for child in range(first, first + tree.num_children[0]) if tree.visits[child]]
+        if not children:
+            # No simulation finished (no budget, or an expired deadline): fall back to the first legal move
+            legal_moves = CompactAzulGame.get_legal_moves(initial_state)
+            if not legal_moves:
+                raise ValueError("No legal moves to choose from.")
+            return legal_moves[0], time.time() - start_time
+        # Same criterion as best_child(0): highest average result
+        best_child = max(children, key=lambda child: tree.wins[child] / tree.visits[child])
+
+        return MOVES[tree.move[best_child]], time.time() - start_time
@@ -0,0 +1,43 @@
+import argparse
+import os
+import random
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Azul import AzulGame
+from AzulCompact import CompactAzulState
+from MCTS import MCTS
+from bench_suite import positions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deadline overshoot and early stops of MCTS.search_anytime against fixed budgets")
+    parser.add_argument('--positions', type=int, default=20)
+    parser.add_argument('--seconds', type=float, nargs='+', default=[0.05, 0.2])
+    parser.add_argument('--simulations', type=int, default=2000)
+    args = parser.parse_args()
+
+    states = [CompactAzulState.from_state(state) for state in positions(args.positions, seed=1)]
+
+    for seconds in args.seconds:
+        overshoots = []
+        for state in states:
+            result = MCTS(AzulGame(), rng=random.Random(0)).search_anytime(state, max_seconds=seconds,
+                                                                           stop_when_decided=False)
+            overshoots.append(result.elapsed - seconds)
+        print(f"deadline {seconds * 1000:6.1f} ms: overshoot mean {sum(overshoots) / len(overshoots) * 1000:6.2f} ms, "
+              f"max {max(overshoots) * 1000:6.2f} ms")
+
+    used, same, elapsed, full_elapsed = 0, 0, 0.0, 0.0
+    for state in states:
+        full = MCTS(AzulGame(), rng=random.Random(0)).search_anytime(state, max_simulations=args.simulations,
+                                                                     stop_when_decided=False)
+        early = MCTS(AzulGame(), rng=random.Random(0)).search_anytime(state, max_simulations=args.simulations)
+        used += early.simulations
+        same += early.best_move == full.best_move
+        elapsed += early.elapsed
+        full_elapsed += full.elapsed
+    print(f"{args.simulations} simulations per move, stopping when decided: {used / len(states):.0f} simulations "
+          f"({used / len(states) / args.simulations:.0%}), {elapsed / full_elapsed:.0%} of the time, "
+          f"same move in {same}/{len(states)} positions")
@@ -0,0 +1,103 @@
+import argparse
+import cProfile
+import os
+import pstats
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Azul import AzulGame
+from AzulBatch import BatchAzulGame
+from AzulEncoding import state_to_vector, encode_action, legal_action_mask
+
+
+def loop_steps_per_second(seconds=1.0):
+    """
+    Random games played one at a time with AzulGame, encoding every state as the DQN loop does.
+    Only the game and encoding calls are timed, not the choice of the action.
+    """
+
+    game = AzulGame()
+    state = game.get_initial_state()
+    game.draw_tiles(state)
+    legal_actions = game.get_legal_moves(state)
+    steps = 0
+    elapsed = 0.0
+    while elapsed < seconds:
+        action = random.choice(legal_actions)
+        start_time = time.perf_counter()
+        encode_action(*action)
+        state, _ = game.step(state, action)
+        state_to_vector(state)
+        if game.check_end_of_round(state) or not game.get_legal_moves(state):
+            state.move_tiles_to_wall()
+            if game.check_end_of_game(state):
+                state = game.get_initial_state()
+            game.draw_tiles(state)
+        legal_actions = game.get_legal_moves(state)
+        legal_action_mask(legal_actions)
+        elapsed += time.perf_counter() - start_time
+        steps += 1
+    return steps / elapsed
+
+
+def batch_steps_per_second(batch_size, seconds=1.0):
+    """
+    Random games stepped together with BatchAzulGame. Counts one step per game.
+    """
+
+    games = BatchAzulGame(batch_size, seed=0)
+    rng = np.random.default_rng(0)
+    mask = games.legal_mask()
+    steps = 0
+    elapsed = 0.0
+    while elapsed < seconds:
+        actions = np.argmax(rng.random(mask.shape) * mask, axis=1)
+        start_time = time.perf_counter()
+        _, _, _, mask = games.step(actions)
+        elapsed += time.perf_counter() - start_time
+        steps += batch_size
+    return steps / elapsed
+
+
+def profile_steps(batch_size, num_steps=300, limit=15):
+    """
+    cProfile of num_steps BatchAzulGame steps on random games, printed by time spent inside each function.
+    """
+
+    games = BatchAzulGame(batch_size, seed=0)
+    rng = np.random.default_rng(0)
+    mask = games.legal_mask()
+    profiler = cProfile.Profile()
+    for _ in range(num_steps):
+        actions = np.argmax(rng.random(mask.shape) * mask, axis=1)
+        profiler.enable()
+        _, _, _, mask = games.step(actions)
+        profiler.disable()
+    pstats.Stats(profiler).sort_stats('tottime').print_stats(limit)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Environment steps per second of AzulGame against BatchAzulGame")
+    parser.add_argument('--batch-size', type=int, default=1024)
+    parser.add_argument('--seconds', type=float, default=2.0)
+    parser.add_argument('--profile', type=int, metavar='STEPS',
+                        help="Print a cProfile of this many BatchAzulGame steps instead of the comparison")
+    args = parser.parse_args()
+
+    if args.profile:
+        profile_steps(args.batch_size, args.profile)
+        sys.exit()
+
+    random.seed(0)
+    before = loop_steps_per_second(args.seconds)
+    after = batch_steps_per_second(args.batch_size, args.seconds)
+
+    batch_label = f"BatchAzulGame (B={args.batch_size}):"
+    print(f"{'AzulGame loop:':30s} {before:12.0f} steps/s")
+    print(f"{batch_label:30s} {after:12.0f} steps/s")
+    print(f"Speedup: {after / before:.1f}x")
@@ -0,0 +1,50 @@
+import copy
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Azul import AzulGame
+from AzulCompact import CompactAzulState
+
+
+def mid_game_state(seed=0, num_moves=6):
+    """
+    Returns a seeded AzulState after a few random moves of the first round.
+    """
+
+    game = AzulGame(rng=random.Random(seed))
+    state = game.get_initial_state()
+    game.draw_tiles(state)
+    for _ in range(num_moves):
+        state.move_tiles(*game.random_player(state))
+    return state
+
+
+def clones_per_second(clone, state, seconds=1.0):
+    """
+    Repeats clone(state) for the given time and returns the achieved rate.
+    """
+
+    count = 0
+    start_time = time.perf_counter()
+    end_time = start_time + seconds
+    while time.perf_counter() < end_time:
+        for _ in range(100):
+            clone(state)
+        count += 100
+    return count / (time.perf_counter() - start_time)
+
+
+if __name__ == "__main__":
+    state = mid_game_state()
+    compact_state = CompactAzulState.from_state(state)
+
+    before = clones_per_second(copy.deepcopy, state)
+    after = clones_per_second(CompactAzulState.clone, compact_state)
+
+    print(f"copy.deepcopy(AzulState):   {before:12.0f} clones/s")
+    print(f"CompactAzulState.clone():   {after:12.0f} clones/s")
+    print(f"Speedup: {after / before:.1f}x")
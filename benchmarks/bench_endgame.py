@@ -0,0 +1,48 @@
+import argparse
+import collections
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Arena import Arena, MCTSAgent, summarize, format_summary
+from AzulCompact import CompactAzulState
+from Endgame import EndgameSolver, remaining_picks
+from bench_suite import positions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EndgameSolver time by picks left in the round, and MCTS with and without it")
+    parser.add_argument('--positions', type=int, default=400, help="Positions sampled, then grouped by picks left")
+    parser.add_argument('--per-group', type=int, default=8)
+    parser.add_argument('--max-picks', type=int, default=9)
+    parser.add_argument('--max-nodes', type=int, default=200000)
+    parser.add_argument('--games', type=int, default=0, help="Games of MCTS with the solver against MCTS without it")
+    parser.add_argument('--simulations', type=int, default=1000)
+    parser.add_argument('--endgame-picks', type=int, default=6)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    groups = collections.defaultdict(list)
+    for state in positions(args.positions, seed=2):
+        state = CompactAzulState.from_state(state)
+        groups[remaining_picks(state)].append(state)
+
+    print(f"{'picks':>5s} {'solved':>7s} {'mean ms':>9s} {'max ms':>9s} {'max nodes':>10s}")
+    for picks in sorted(group for group in groups if group <= args.max_picks):
+        times, nodes, solved = [], [], 0
+        for state in groups[picks][:args.per_group]:
+            solver = EndgameSolver(max_nodes=args.max_nodes)
+            start_time = time.perf_counter()
+            solved += solver.solve(state) is not None
+            times.append(time.perf_counter() - start_time)
+            nodes.append(solver.nodes)
+        print(f"{picks:5d} {solved:3d}/{len(times):<3d} {sum(times) / len(times) * 1000:9.1f} {max(times) * 1000:9.1f} "
+              f"{max(nodes):10d}")
+
+    if args.games:
+        agents = {'mcts': MCTSAgent(num_simulations=args.simulations),
+                  'mcts+endgame': MCTSAgent(num_simulations=args.simulations, endgame_picks=args.endgame_picks)}
+        rows = Arena(agents, args.workers).run(args.games)
+        print(format_summary(summarize(rows, list(agents))))
@@ -0,0 +1,34 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from AzulEnv import AzulVectorEnv
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Environment steps per second of AzulVectorEnv against worker count")
+    parser.add_argument('--num-envs', type=int, default=64)
+    parser.add_argument('--steps', type=int, default=200)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    workers = 1
+    baseline = None
+    print(f"{args.num_envs} environments, {args.steps} steps")
+    while workers <= args.max_workers:
+        with AzulVectorEnv(args.num_envs, num_workers=workers, seed=0) as envs:
+            _, masks = envs.reset()
+            start_time = time.perf_counter()
+            for _ in range(args.steps):
+                actions = np.argmax(rng.random(masks.shape) * masks, axis=1)
+                _, _, _, masks = envs.step(actions)
+            rate = args.num_envs * args.steps / (time.perf_counter() - start_time)
+        baseline = baseline or rate
+        print(f"{workers:3d} workers: {rate:10.0f} steps/s ({rate / baseline:.2f}x)")
+        workers *= 2
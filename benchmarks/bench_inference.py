@@ -0,0 +1,62 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+import torch
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from AzulDQN import DuelingDQN, export_inference_model, play_against_random
+from AzulEncoding import encode_action
+from AzulEnv import AzulEnv
+
+
+def per_move_games(net, num_games):
+    """
+    The notebook's previous evaluation: one forward pass per move and one .item() per legal action.
+    """
+
+    env = AzulEnv()
+    for _ in range(num_games):
+        state_vector, _ = env.reset()
+        done = False
+        while not done:
+            if env.state.current_player == 0:
+                with torch.no_grad():
+                    q_values = net(torch.tensor(state_vector, dtype=torch.float32).unsqueeze(0))
+                legal_action_indices = [encode_action(*action) for action in env.game.get_legal_moves(env.state)]
+                legal_q_values = {action: q_values[0, action].item() for action in legal_action_indices}
+                action = max(legal_q_values, key=legal_q_values.get)
+            else:
+                action = encode_action(*env.game.random_player(env.state))
+            state_vector, _, done, _ = env.step(action)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Games per second of the DQN against random_player: per-move against batched inference")
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--num-envs', type=int, default=256)
+    parser.add_argument('--compile', action='store_true', help="Also time a torch.compile model")
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    net = DuelingDQN().eval()
+    runs = [('per move', lambda: per_move_games(net, args.games)),
+            ('batched', lambda: play_against_random(net, args.games, args.num_envs))]
+    scripted = export_inference_model(net)
+    runs.append(('batched torchscript', lambda: play_against_random(scripted, args.games, args.num_envs)))
+    if args.compile:
+        compiled = export_inference_model(net, compile_model=True)
+        runs.append(('batched compiled', lambda: play_against_random(compiled, args.games, args.num_envs)))
+
+    baseline = None
+    print(f"{args.games} games against random_player")
+    for name, run in runs:
+        random.seed(0)
+        start_time = time.perf_counter()
+        run()
+        rate = args.games / (time.perf_counter() - start_time)
+        baseline = baseline or rate
+        print(f"  {name:20s} {rate:8.1f} games/s ({rate / baseline:.2f}x)")
@@ -0,0 +1,35 @@
+import argparse
+import os
+import random
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Azul import AzulGame
+from AzulCompact import CompactAzulState
+from MCTS import MCTS
+from bench_suite import positions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Phase times and counters of an instrumented MCTS search, to tune its parameters")
+    parser.add_argument('--simulations', type=int, default=2000)
+    parser.add_argument('--exploration-weight', type=float, nargs='+', default=[2.5])
+    parser.add_argument('--min-visits', type=int, nargs='+', default=[15])
+    parser.add_argument('--depth', type=int, nargs='+', default=[10])
+    parser.add_argument('--position', type=int, default=1, help="Seed of the fixed position")
+    parser.add_argument('--profile', help="Write the cProfile pstats of the last search to this file")
+    args = parser.parse_args()
+
+    state = CompactAzulState.from_state(positions(1, seed=args.position)[0])
+    settings = [(weight, visits, depth) for weight in args.exploration_weight
+                for visits in args.min_visits for depth in args.depth]
+    for i, (weight, visits, depth) in enumerate(settings):
+        mcts = MCTS(AzulGame(), exploration_weight=weight, min_visits_per_node=visits, max_simulation_depth=depth,
+                    rng=random.Random(0), instrument=True,
+                    profile=args.profile if i == len(settings) - 1 else None)
+        root = mcts.build_tree(state, num_simulations=args.simulations)
+        best = root.best_child(0)
+        print(f"exploration_weight={weight}, min_visits_per_node={visits}, max_simulation_depth={depth}: "
+              f"best move {root.moves[root.children.index(best)]} with {best.visits} visits")
+        print(mcts.stats)
@@ -0,0 +1,27 @@
+import argparse
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Azul import AzulGame
+from MCTS import MCTS
+from bench_clone import mid_game_state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Peak traced memory of an MCTS search per simulation")
+    parser.add_argument('--simulations', type=int, nargs='+', default=[1000, 5000])
+    args = parser.parse_args()
+
+    state = mid_game_state()
+    for num_simulations in args.simulations:
+        mcts = MCTS(AzulGame(), rng=random.Random(0))
+        tracemalloc.start()
+        root = mcts.build_tree(state, num_simulations=num_simulations)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del root
+        print(f"{num_simulations:6d} simulations: peak {peak / 1024:9.1f} KiB, {peak / num_simulations:7.1f} bytes/simulation")
@@ -0,0 +1,77 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Azul import AzulGame
+from MCTS import MCTS
+from ParallelMCTS import ParallelMCTS
+from TreeParallelMCTS import TreeParallelMCTS
+from bench_clone import mid_game_state
+
+
+def tree_depth(root):
+    """
+    Depth of the deepest node below root.
+    """
+
+    depth = 0
+    stack = [(root, 0)]
+    while stack:
+        node, node_depth = stack.pop()
+        depth = max(depth, node_depth)
+        stack.extend((child, node_depth + 1) for child in node.children)
+    return depth
+
+
+def bench_tree(game, state, seconds, max_workers):
+    """
+    Simulations per second and tree depth of TreeParallelMCTS, with and without its striped locks,
+    against single-threaded MCTS searching for the same wall-clock time.
+    """
+
+    mcts = MCTS(game, rng=random.Random(0))
+    start_time = time.perf_counter()
+    root = mcts.build_tree(state, end_time=start_time + seconds)
+    rate = mcts.simulations / (time.perf_counter() - start_time)
+    print(f"{'MCTS':>24s}: {rate:10.0f} simulations/s, depth {tree_depth(root)}")
+
+    workers = 1
+    while workers <= max_workers:
+        for lock_free in (False, True):
+            searcher = TreeParallelMCTS(game, num_workers=workers, seed=0, lock_free=lock_free)
+            _, search_time = searcher.search(state, simulation_seconds=seconds)
+            rate = searcher.simulations / search_time
+            label = f"{workers} workers, {'lock-free' if lock_free else 'locked'}"
+            print(f"{label:>24s}: {rate:10.0f} simulations/s, depth {searcher.max_depth}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulations per second of ParallelMCTS against worker count")
+    parser.add_argument('--mode', choices=['root', 'leaf', 'tree'], default='root',
+                        help="'tree' measures TreeParallelMCTS, with its tree depth against single-threaded MCTS")
+    parser.add_argument('--seconds', type=float, default=2.0)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    game = AzulGame()
+    state = mid_game_state()
+    print(f"mode={args.mode}, {args.seconds}s per search")
+    if args.mode == 'tree':
+        bench_tree(game, state, args.seconds, args.max_workers)
+        sys.exit()
+
+    workers = 1
+    baseline = None
+    while workers <= args.max_workers:
+        with ParallelMCTS(game, num_workers=workers, mode=args.mode, seed=0) as searcher:
+            searcher.search(state, num_simulations=workers)  # Start the worker processes
+            _, search_time = searcher.search(state, simulation_seconds=args.seconds)
+            rate = searcher.simulations / search_time
+        baseline = baseline or rate
+        print(f"{workers:3d} workers: {rate:10.0f} simulations/s ({rate / baseline:.2f}x)")
+        workers *= 2
@@ -0,0 +1,126 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from AzulDQN import DuelingDQN, select_actions, play_against_random
+from AzulEncoding import input_dim, num_actions
+from AzulEnv import AzulEnv
+from ReplayBuffer import ReplayBuffer, PrioritizedReplayBuffer
+
+
+def sampling_rate(buffer, batch_size, seconds=1.0):
+    """
+    Samples per second, including the priority update of a prioritized buffer.
+    """
+
+    count = 0
+    start_time = time.perf_counter()
+    while time.perf_counter() - start_time < seconds:
+        batch = buffer.sample(batch_size)
+        if isinstance(buffer, PrioritizedReplayBuffer):
+            buffer.update_priorities(batch[-1], np.random.random(batch_size))
+        count += 1
+    return count / (time.perf_counter() - start_time)
+
+
+def evaluate(net, games, seed):
+    """
+    Average score of the network as player 0 against AzulGame.random_player.
+    """
+
+    random.seed(seed)
+    return np.mean([result['score'] for result in play_against_random(net, games)])
+
+
+def episodes_to_target(prioritized, args):
+    """
+    Trains the notebook's DQN (self-play, epsilon-greedy) and returns the first episode whose evaluation reaches the target.
+    """
+
+    random.seed(args.seed)
+    torch.manual_seed(args.seed)
+    main_nn = DuelingDQN(input_dim, num_actions)
+    target_nn = DuelingDQN(input_dim, num_actions)
+    target_nn.load_state_dict(main_nn.state_dict())
+    optimizer = torch.optim.Adam(main_nn.parameters(), lr=1e-4, weight_decay=1e-5)
+    if prioritized:
+        buffer = PrioritizedReplayBuffer(args.buffer_size, 'cpu', seed=args.seed)
+    else:
+        buffer = ReplayBuffer(args.buffer_size, 'cpu', seed=args.seed)
+    env = AzulEnv(reward_scale=0.01)
+    epsilon = 1.0
+
+    for episode in range(1, args.episodes + 1):
+        state_vector, legal_mask = env.reset()
+        done = False
+        while not done:
+            if random.random() < epsilon:
+                action = random.choice(np.flatnonzero(legal_mask))
+            else:
+                action = select_actions(main_nn, state_vector[None], legal_mask[None])[0]
+            next_state_vector, reward, done, legal_mask = env.step(action)
+            buffer.add(state_vector, action, reward, next_state_vector, done)
+            state_vector = next_state_vector
+
+            if len(buffer) > args.batch_size:
+                batch = buffer.sample(args.batch_size)
+                states, actions, rewards, next_states, dones = batch[:5]
+                next_qs_argmax = main_nn(next_states).argmax(dim=-1, keepdim=True)
+                masked_next_qs = target_nn(next_states).gather(1, next_qs_argmax).squeeze()
+                target = rewards + (1.0 - dones) * 0.9 * masked_next_qs
+                masked_qs = main_nn(states).gather(1, actions.unsqueeze(dim=-1)).squeeze()
+                losses = F.smooth_l1_loss(masked_qs, target.detach(), reduction='none')
+                if prioritized:
+                    losses = losses * batch[5]
+                    buffer.update_priorities(batch[6], (target - masked_qs).detach().numpy())
+                optimizer.zero_grad()
+                losses.mean().backward()
+                torch.nn.utils.clip_grad_norm_(main_nn.parameters(), max_norm=1.0)
+                optimizer.step()
+                for target_param, main_param in zip(target_nn.parameters(), main_nn.parameters()):
+                    target_param.data.copy_(0.01 * main_param.data + 0.99 * target_param.data)
+
+        epsilon = max(0.01, epsilon * args.epsilon_decay)
+        if episode % args.eval_every == 0:
+            score = evaluate(main_nn, args.eval_games, args.seed)
+            print(f"  episode {episode:5d}: score {score:6.2f}")
+            if score >= args.target:
+                return episode
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Uniform against prioritized replay: sampling speed and episodes to a target score")
+    parser.add_argument('--capacity', type=int, default=200000)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--episodes', type=int, default=1000)
+    parser.add_argument('--buffer-size', type=int, default=50000)
+    parser.add_argument('--epsilon-decay', type=float, default=0.995)
+    parser.add_argument('--eval-every', type=int, default=50)
+    parser.add_argument('--eval-games', type=int, default=20)
+    parser.add_argument('--target', type=float, default=10.0, help="Average score against random_player")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skip-training', action='store_true')
+    args = parser.parse_args()
+
+    print(f"Sampling at capacity {args.capacity}, batch {args.batch_size}")
+    for name, buffer_class in (('uniform', ReplayBuffer), ('prioritized', PrioritizedReplayBuffer)):
+        buffer = buffer_class(args.capacity, 'cpu', seed=0)
+        states = np.random.randint(0, 6, (args.capacity, input_dim))
+        buffer.add_batch(states, np.random.randint(0, num_actions, args.capacity), np.zeros(args.capacity),
+                         states, np.zeros(args.capacity, dtype=bool))
+        print(f"  {name:12s} {sampling_rate(buffer, args.batch_size):8.0f} samples/s")
+
+    if not args.skip_training:
+        for name, prioritized in (('uniform', False), ('prioritized', True)):
+            print(f"Training with {name} replay, target score {args.target}")
+            episodes = episodes_to_target(prioritized, args)
+            print(f"  {name}: {episodes if episodes is not None else f'not reached in {args.episodes}'} episodes")
@@ -0,0 +1,58 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+import torch
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Arena import Arena, DQNAgent, MCTSAgent, NetworkMCTSAgent, summarize, format_summary
+from Azul import AzulGame
+from AzulCompact import CompactAzulState
+from AzulDQN import DuelingDQN
+from MCTS import MCTS
+from NetworkMCTS import NetworkMCTS
+from bench_suite import positions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="NetworkMCTS simulations per second by leaf batch size, and games against rollout MCTS")
+    parser.add_argument('--dqn', help="DQN checkpoint (model.pth) or TorchScript export; an untrained network otherwise")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 16, 32])
+    parser.add_argument('--simulations', type=int, default=400)
+    parser.add_argument('--games', type=int, default=0, help="Games of NetworkMCTS against MCTS with --mcts rollouts")
+    parser.add_argument('--mcts', type=int, default=5000)
+    parser.add_argument('--seconds', type=float, help="Seconds per move of NetworkMCTS in the games (default: --simulations)")
+    parser.add_argument('--equal-time', action='store_true',
+                        help="Give NetworkMCTS the mean time per move of MCTS with --mcts rollouts, measured on the sample positions")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    torch.manual_seed(0)
+    net = DQNAgent._load(args.dqn) if args.dqn else DuelingDQN().eval()
+    states = [CompactAzulState.from_state(state) for state in positions(5, seed=1)]
+
+    for batch_size in args.batch_sizes:
+        search = NetworkMCTS(net, batch_size=batch_size)
+        start_time = time.perf_counter()
+        passes = 0
+        for state in states:
+            search.build_tree(state, num_simulations=args.simulations)
+            passes += search.forward_passes
+        rate = args.simulations * len(states) / (time.perf_counter() - start_time)
+        print(f"batch {batch_size:3d}: {rate:8.0f} simulations/s, {args.simulations * len(states) / passes:5.1f} leaves per pass")
+
+    if args.equal_time:
+        mcts = MCTS(AzulGame(), rng=random.Random(0))
+        args.seconds = sum(mcts.search(state, num_simulations=args.mcts)[1] for state in states) / len(states)
+        print(f"MCTS with {args.mcts} rollouts: {args.seconds:.3f} s per move")
+
+    if args.games:
+        budget = {'simulation_seconds': args.seconds} if args.seconds else {'num_simulations': args.simulations}
+        agents = {f'mcts-{args.mcts}': MCTSAgent(num_simulations=args.mcts),
+                  'puct': NetworkMCTSAgent(args.dqn, None if args.dqn else net, **budget)}
+        rows = Arena(agents, args.workers).run(args.games)
+        print(format_summary(summarize(rows, list(agents))))
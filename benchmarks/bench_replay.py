@@ -0,0 +1,103 @@
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import torch
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from AzulEncoding import input_dim
+from ReplayBuffer import ReplayBuffer
+
+
+class UniformBuffer(object):
+  """UniformBuffer as it was in Azul_DQN.ipynb, kept as the baseline."""
+
+  def __init__(self, size, device):
+    self._size = size
+    self.buffer = []
+    self.device = device
+    self._next_idx = 0
+
+  def add(self, state, action, reward, next_state, done):
+    if self._next_idx >= len(self.buffer):
+      self.buffer.append((state, action, reward, next_state, done))
+    else:
+      self.buffer[self._next_idx] = (state, action, reward, next_state, done)
+    self._next_idx = (self._next_idx + 1) % self._size
+
+  def __len__(self):
+    return len(self.buffer)
+
+  def sample(self, num_samples):
+    states, actions, rewards, next_states, dones = [], [], [], [], []
+    idx = np.random.choice(len(self.buffer), num_samples)
+    for i in idx:
+      elem = self.buffer[i]
+      state, action, reward, next_state, done = elem
+      states.append(np.asarray(state))
+      actions.append(np.asarray(action))
+      rewards.append(reward)
+      next_states.append(np.asarray(next_state))
+      dones.append(done)
+
+    states = torch.as_tensor(np.array(states), device=self.device)
+    actions = torch.as_tensor(np.array(actions), device=self.device)
+    rewards = torch.as_tensor(np.array(rewards, dtype=np.float32),
+                              device=self.device)
+    next_states = torch.as_tensor(np.array(next_states), device=self.device)
+    dones = torch.as_tensor(np.array(dones, dtype=np.float32),
+                            device=self.device)
+
+    return states, actions, rewards, next_states, dones
+
+
+def fill(buffer, size):
+    """
+    Adds size random transitions shaped like the DQN ones. Returns the adds per second.
+    """
+
+    rng = np.random.default_rng(0)
+    states = rng.integers(0, 6, (1000, input_dim)).astype(np.float32)
+    start_time = time.perf_counter()
+    for i in range(size):
+        # Fresh arrays, as state_to_vector returns for every step
+        buffer.add(states[i % 1000].copy(), i % 180, 0.01, states[(i + 1) % 1000].copy(), i % 50 == 0)
+    return size / (time.perf_counter() - start_time)
+
+
+def samples_per_second(buffer, batch_size, seconds=1.0):
+    count = 0
+    start_time = time.perf_counter()
+    while time.perf_counter() - start_time < seconds:
+        buffer.sample(batch_size)
+        count += 1
+    return count / (time.perf_counter() - start_time)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory, add and sample speed of UniformBuffer against ReplayBuffer")
+    parser.add_argument('--size', type=int, default=200000)
+    parser.add_argument('--batch-size', type=int, default=64)
+    args = parser.parse_args()
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    with tempfile.TemporaryDirectory() as path:
+        buffers = [('UniformBuffer', lambda: UniformBuffer(args.size, device)),
+                   ('ReplayBuffer', lambda: ReplayBuffer(args.size, device, pin_memory=True)),
+                   ('ReplayBuffer (memmap)', lambda: ReplayBuffer(args.size, device, path=path))]
+        for name, make_buffer in buffers:
+            tracemalloc.start()
+            buffer = make_buffer()
+            adds = fill(buffer, args.size)
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            samples = samples_per_second(buffer, args.batch_size)
+            pickled = len(pickle.dumps(buffer))
+            print(f"{name:22s} memory {memory / 2**20:8.1f} MiB, pickled {pickled / 2**20:8.1f} MiB, "
+                  f"{adds:9.0f} adds/s, {samples:8.0f} samples/s")
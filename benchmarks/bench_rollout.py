@@ -0,0 +1,59 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Arena import Arena, MCTSAgent, summarize, wilson_interval
+from Azul import AzulGame
+from AzulCompact import CompactAzulState
+from MCTS import MCTS
+from RolloutPolicies import make_rollout_policy
+from bench_suite import positions
+
+POLICIES = {'uniform': {}, 'epsilon_greedy': {'epsilon': 0.1}, 'softmax': {'temperature': 0.5}}
+
+
+def simulations_per_second(policy, states, num_simulations, depth):
+    """
+    MCTS simulations per second with the rollout policy, over the fixed states.
+    """
+
+    start_time = time.perf_counter()
+    for state in states:
+        MCTS(AzulGame(), max_simulation_depth=depth, rng=random.Random(0),
+             rollout_policy=policy).build_tree(state, num_simulations=num_simulations)
+    return num_simulations * len(states) / (time.perf_counter() - start_time)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rollout policies: simulation cost and playing strength against uniform MCTS")
+    parser.add_argument('--policies', nargs='+', choices=list(POLICIES), default=list(POLICIES))
+    parser.add_argument('--budgets', type=int, nargs='+', default=[100, 250, 500], help="Simulations per move of the policies")
+    parser.add_argument('--reference', type=int, default=500, help="Simulations per move of the uniform reference")
+    parser.add_argument('--depth', type=int, default=10, help="max_simulation_depth of every agent")
+    parser.add_argument('--games', type=int, default=20, help="Games of every policy and budget against the reference")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    states = [CompactAzulState.from_state(state) for state in positions(5, seed=1)]
+    print(f"Cost at max_simulation_depth={args.depth}")
+    costs = {}
+    for name in args.policies:
+        costs[name] = simulations_per_second(make_rollout_policy(name, **POLICIES[name]), states, 300, args.depth)
+        print(f"  {name:15s} {costs[name]:8.0f} simulations/s ({costs[name] / costs[args.policies[0]]:.2f}x)")
+
+    print(f"Strength against uniform MCTS with {args.reference} simulations per move, {args.games} games each")
+    reference = MCTSAgent(num_simulations=args.reference, max_simulation_depth=args.depth)
+    for name in args.policies:
+        for budget in args.budgets:
+            agent = MCTSAgent(num_simulations=budget, max_simulation_depth=args.depth,
+                              rollout_policy=make_rollout_policy(name, **POLICIES[name]))
+            rows = Arena({'reference': reference, 'candidate': agent}, args.workers, args.seed).run(args.games)
+            stats = summarize(rows, ['reference', 'candidate'], bootstrap=0)['agents']['candidate']
+            low, high = wilson_interval(stats['wins'] + 0.5 * stats['draws'], stats['games'])
+            print(f"  {name:15s} {budget:6d} simulations: score {stats['win_rate']:6.1%} [{low:.0%}, {high:.0%}], "
+                  f"{stats['time_per_move'] * 1000:7.1f} ms/move")
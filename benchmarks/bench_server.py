@@ -0,0 +1,55 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import torch
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Arena import DQNAgent
+from AzulDQN import DuelingDQN
+from MoveServer import MoveServer, MoveClient, build_agents, play_session
+
+
+async def run(args):
+    agents = build_agents(args.mcts)
+    torch.manual_seed(0)
+    agents['dqn'] = DQNAgent(net=DuelingDQN().eval())
+    server = MoveServer(agents, args.workers, max_wait=args.max_wait)
+    _, port = await server.start(port=0)
+    client = MoveClient()
+    await client.connect(port=port)
+
+    for name in agents:
+        start_time = time.perf_counter()
+        results = await asyncio.gather(*(play_session(client, name, seed, args.deadline_ms)
+                                         for seed in range(args.sessions)))
+        duration = time.perf_counter() - start_time
+        stats = (await client.stats())[name]
+        latency = stats['latency']
+        print(f"{name:10s} {latency['count'] / duration:8.1f} moves/s  p50 {latency['p50_ms']:7.1f} ms  "
+              f"p95 {latency['p95_ms']:7.1f} ms  max {latency['max_ms']:7.1f} ms  "
+              f"failed {sum(failed for _, failed in results):3d}"
+              + (f"  mean batch {stats['mean_batch']:.1f}" if 'mean_batch' in stats else ""))
+        if args.verbose:
+            print(json.dumps(stats, indent=2))
+
+    await client.close()
+    await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput and latency of MoveServer with concurrent stand-in game sessions")
+    parser.add_argument('--sessions', type=int, default=32)
+    parser.add_argument('--mcts', type=int, nargs='*', default=[200])
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--deadline-ms', type=float, default=1000)
+    parser.add_argument('--max-wait', type=float, default=0.002, help="Seconds a DQN batch waits for more requests")
+    parser.add_argument('--verbose', action='store_true', help="Print the full stats of every agent")
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    asyncio.run(run(args))
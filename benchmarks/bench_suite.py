@@ -0,0 +1,313 @@
+import argparse
+import copy
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Azul import AzulGame
+from AzulCompact import CompactAzulState, CompactAzulGame
+from AzulEncoding import state_to_vector, compact_state_to_vector, input_dim, num_actions
+from MCTS import MCTS
+from ReplayBuffer import ReplayBuffer, PrioritizedReplayBuffer
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def round_is_over(game, state):
+    # A round also ends when only the first player token is left in the center
+    return game.check_end_of_round(state) or not game.get_legal_moves(state)
+
+
+def positions(count, seed=0):
+    """
+    Fixed AzulStates taken at random plies of seeded random games, from the first round to the last.
+    """
+
+    rng = random.Random(seed)
+    game = AzulGame(rng=random.Random(seed), sampled_draw=True)
+    states = []
+    while len(states) < count:
+        state = game.get_initial_state()
+        game.draw_tiles(state)
+        while not game.check_end_of_game(state):
+            if round_is_over(game, state):
+                state.move_tiles_to_wall()
+                if game.check_end_of_game(state):
+                    break
+                game.draw_tiles(state)
+            if rng.random() < 0.1:
+                states.append(copy.deepcopy(state))
+            state.move_tiles(*game.random_player(state, rng))
+    return states[:count]
+
+
+def end_of_round_positions(count, seed=0):
+    """
+    Fixed AzulStates whose round has just ended, before move_tiles_to_wall.
+    """
+
+    rng = random.Random(seed)
+    game = AzulGame(rng=random.Random(seed), sampled_draw=True)
+    states = []
+    while len(states) < count:
+        state = game.get_initial_state()
+        game.draw_tiles(state)
+        while True:
+            if round_is_over(game, state):
+                states.append(copy.deepcopy(state))
+                state.move_tiles_to_wall()
+                if game.check_end_of_game(state):
+                    break
+                game.draw_tiles(state)
+            state.move_tiles(*game.random_player(state, rng))
+    return states[:count]
+
+
+def best_time(batch, repeat, min_time):
+    """
+    Best seconds per operation over repeat runs of at least min_time each.
+    batch() does some operations and returns (operations, timed seconds).
+    """
+
+    best = math.inf
+    for _ in range(repeat):
+        operations = 0
+        elapsed = 0.0
+        while elapsed < min_time:
+            count, seconds = batch()
+            operations += count
+            elapsed += seconds
+        best = min(best, elapsed / operations)
+    return best
+
+
+def timed_loop(function, arguments):
+    """
+    Batch that calls function on every argument tuple.
+    """
+
+    def batch():
+        start_time = time.perf_counter()
+        for args in arguments:
+            function(*args)
+        return len(arguments), time.perf_counter() - start_time
+    return batch
+
+
+def timed_on_copies(function, states):
+    """
+    Batch that calls function once on a fresh copy of every state. The copies are made outside the timing.
+    """
+
+    def batch():
+        copies = [copy.deepcopy(state) for state in states]
+        start_time = time.perf_counter()
+        for state in copies:
+            function(state)
+        return len(copies), time.perf_counter() - start_time
+    return batch
+
+
+def micro_benchmarks(repeat, min_time):
+    """
+    Microseconds per call of the engine operations, on fixed positions.
+    """
+
+    game = AzulGame()
+    states = positions(200)
+    compact_states = [CompactAzulState.from_state(state) for state in states]
+    round_ends = end_of_round_positions(50)
+
+    rng = random.Random(0)
+    moves = [rng.choice(game.get_legal_moves(state)) for state in states]
+    move_index = {id(state): move for state, move in zip(states, moves)}
+    cells = [(player, row, col) for state in states for player in state.players
+             for row in range(5) for col in range(5) if player['board'][row][col]]
+
+    def move_tiles_on_copies():
+        copies = [(copy.deepcopy(state), move_index[id(state)]) for state in states]
+        start_time = time.perf_counter()
+        for state, move in copies:
+            state.move_tiles(*move)
+        return len(copies), time.perf_counter() - start_time
+
+    def compact_make_unmake():
+        start_time = time.perf_counter()
+        for state, move in zip(compact_states, moves):
+            state.unmake_move(state.make_move(*move))
+        return len(moves), time.perf_counter() - start_time
+
+    benchmarks = {
+        'get_legal_moves': timed_loop(game.get_legal_moves, [(state,) for state in states]),
+        'move_tiles': move_tiles_on_copies,
+        'move_tiles_to_wall': timed_on_copies(lambda state: state.move_tiles_to_wall(), round_ends),
+        'calculate_score': timed_loop(AzulGame.calculate_score, cells),
+        'deepcopy': timed_loop(copy.deepcopy, [(state,) for state in states]),
+        'state_to_vector': timed_loop(state_to_vector, [(state,) for state in states]),
+        'compact.get_legal_moves': timed_loop(CompactAzulGame.get_legal_moves, [(state,) for state in compact_states]),
+        'compact.make_unmake_move': compact_make_unmake,
+        'compact.clone': timed_loop(CompactAzulState.clone, [(state,) for state in compact_states]),
+        'compact.state_to_vector': timed_loop(compact_state_to_vector, [(state,) for state in compact_states]),
+    }
+    return {f'micro.{name}': (best_time(batch, repeat, min_time) * 1e6, 'us/op', False)
+            for name, batch in benchmarks.items()}
+
+
+def random_games(engine, seed, num_games):
+    """
+    Plays num_games seeded random games with AzulGame (engine='azul') or CompactAzulGame (engine='compact')
+    and returns the seconds they took. Both engines draw the same tiles from the same seed.
+    """
+
+    draw_rng, move_rng = random.Random(seed), random.Random(seed + 1)
+    if engine == 'compact':
+        game = CompactAzulGame()
+        draw_tiles = lambda state: game.draw_tiles(state, draw_rng)
+    else:
+        game = AzulGame(rng=draw_rng, sampled_draw=True)
+        draw_tiles = game.draw_tiles
+
+    start_time = time.perf_counter()
+    for _ in range(num_games):
+        state = game.get_initial_state()
+        draw_tiles(state)
+        while True:
+            state.move_tiles(*game.random_player(state, move_rng))
+            if round_is_over(game, state):
+                state.move_tiles_to_wall()
+                if game.check_end_of_game(state):
+                    break
+                draw_tiles(state)
+    return time.perf_counter() - start_time
+
+
+def macro_benchmarks(repeat, num_games, num_simulations, depths):
+    """
+    Random games per second, MCTS simulations per second by max_simulation_depth and replay samples per second.
+    """
+
+    results = {}
+    for engine in ('azul', 'compact'):
+        seconds = min(random_games(engine, 0, num_games) for _ in range(repeat))
+        results[f'macro.random_games.{engine}'] = (num_games / seconds, 'games/s', True)
+
+    state = CompactAzulState.from_state(positions(1, seed=1)[0])
+    for depth in depths:
+        best = math.inf
+        for _ in range(repeat):
+            mcts = MCTS(AzulGame(), max_simulation_depth=depth, rng=random.Random(0))
+            start_time = time.perf_counter()
+            mcts.build_tree(state, num_simulations=num_simulations)
+            best = min(best, time.perf_counter() - start_time)
+        results[f'macro.mcts.depth_{depth}'] = (num_simulations / best, 'simulations/s', True)
+
+    rng = np.random.default_rng(0)
+    capacity = 100000
+    stored = rng.integers(0, 6, (capacity, input_dim))
+    for name, buffer_class in (('uniform', ReplayBuffer), ('prioritized', PrioritizedReplayBuffer)):
+        buffer = buffer_class(capacity, 'cpu', seed=0)
+        buffer.add_batch(stored, rng.integers(0, num_actions, capacity), np.zeros(capacity), stored,
+                         np.zeros(capacity, dtype=bool))
+
+        def sample_batch():
+            start_time = time.perf_counter()
+            for _ in range(100):
+                batch = buffer.sample(64)
+                if isinstance(buffer, PrioritizedReplayBuffer):
+                    buffer.update_priorities(batch[-1], np.ones(64))
+            return 100, time.perf_counter() - start_time
+        results[f'macro.replay_sample.{name}'] = (64 / best_time(sample_batch, repeat, 0.2), 'samples/s', True)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ''
+
+
+def compare(results, baseline, threshold):
+    """
+    Prints current against baseline values and returns the names that regressed by more than
+    threshold (a fraction, or the threshold stored with the baseline entry).
+    """
+
+    regressions = []
+    print(f"{'benchmark':34s} {'baseline':>12s} {'current':>12s} {'change':>8s}")
+    for name, entry in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"{name:34s} {'-':>12s} {entry['value']:12.2f}")
+            continue
+        # Positive change is an improvement whichever the direction of the unit
+        ratio = entry['value'] / reference['value']
+        change = ratio - 1 if entry['higher_is_better'] else 1 / ratio - 1
+        limit = reference.get('threshold', threshold)
+        regressed = change < -limit
+        if regressed:
+            regressions.append(name)
+        print(f"{name:34s} {reference['value']:12.2f} {entry['value']:12.2f} {change:+8.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Engine, MCTS and DQN pipeline benchmarks with a stored baseline")
+    parser.add_argument('--output', default='bench_results.json', help="JSON file for the results")
+    parser.add_argument('--baseline', default=BASELINE, help="JSON results to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Store the results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Allowed slowdown before a regression")
+    parser.add_argument('--quick', action='store_true', help="Shorter runs, for a smoke test")
+    parser.add_argument('--only', choices=['micro', 'macro'])
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    repeat, min_time = (3, 0.05) if args.quick else (5, 0.2)
+    measured = {}
+    if args.only != 'macro':
+        measured.update(micro_benchmarks(repeat, min_time))
+    if args.only != 'micro':
+        measured.update(macro_benchmarks(repeat, num_games=5 if args.quick else 20,
+                                         num_simulations=200 if args.quick else 1000, depths=(5, 10, 20, 50)))
+
+    results = {name: {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+               for name, (value, unit, higher_is_better) in measured.items()}
+    report = {'meta': {'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                       'revision': git_revision(),
+                       'python': platform.python_version(),
+                       'machine': platform.platform(),
+                       'cpus': os.cpu_count(),
+                       'numpy': np.__version__,
+                       'torch': torch.__version__,
+                       'quick': args.quick},
+              'results': results}
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file)['results'], args.threshold)
+    else:
+        for name, entry in results.items():
+            print(f"{name:34s} {entry['value']:12.2f} {entry['unit']}")
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) over the threshold")
+        sys.exit(1)
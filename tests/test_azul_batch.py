@@ -0,0 +1,61 @@
+import random
+
+import numpy as np
+import pytest
+
+from Azul import AzulGame
+from AzulBatch import BatchAzulGame
+from AzulCompact import CompactAzulState
+from AzulEncoding import state_to_vector, legal_action_mask, encode_action
+
+
+@pytest.mark.parametrize('seed', range(2))
+def test_batch_engine_matches_dict_engine(seed):
+    # Every step loads the dict states into the batch, so the two engines only differ in their tile draws
+    num_games = 16
+    game = AzulGame(rng=random.Random(seed))
+    move_rng = random.Random(seed + 100)
+    batch = BatchAzulGame(num_games, seed=seed, auto_reset=False)
+    states = []
+    for _ in range(num_games):
+        state = game.get_initial_state()
+        game.draw_tiles(state)
+        states.append(state)
+
+    round_ends = 0
+    game_ends = 0
+    for _ in range(130):
+        batch.set_states(states)
+        legal_moves = [game.get_legal_moves(state) for state in states]
+        np.testing.assert_array_equal(batch.observations(), np.stack([state_to_vector(state) for state in states]))
+        np.testing.assert_array_equal(batch.legal_mask(), np.stack([legal_action_mask(moves) for moves in legal_moves]))
+
+        moves = [move_rng.choice(moves) for moves in legal_moves]
+        observations, rewards, dones, masks = batch.step([encode_action(*move) for move in moves])
+        for i, (state, move) in enumerate(zip(states, moves)):
+            state, reward = game.step(state, move)
+            assert rewards[i] == np.float32(reward)
+            if game.check_end_of_round(state) or not game.get_legal_moves(state):
+                # The batch drew other tiles: compare everything but the factories, center, bag and discard
+                state.move_tiles_to_wall()
+                round_ends += 1
+                compact = CompactAzulState.from_state(state)
+                assert batch.scores[i].tolist() == compact.scores
+                assert batch.walls[i].tolist() == compact.walls
+                assert batch.line_counts[i].flatten().tolist() == compact.line_counts
+                assert batch.line_colors[i].flatten().tolist() == compact.line_colors
+                assert not batch.floor_counts[i].any()
+                assert dones[i] == game.check_end_of_game(state)
+                # The first player token goes to the dict engine's discard pile, but is never drawn
+                assert int(batch.bag[i].sum() + batch.discard[i].sum() + batch.factories[i].sum()) == \
+                    len(state.bag) + len(state.discard) - state.discard.count('1')
+                if dones[i]:
+                    game_ends += 1
+                    state = game.get_initial_state()
+                game.draw_tiles(state)
+            else:
+                assert not dones[i]
+                np.testing.assert_array_equal(observations[i], state_to_vector(state))
+                np.testing.assert_array_equal(masks[i], legal_action_mask(game.get_legal_moves(state)))
+            states[i] = state
+    assert round_ends > num_games and game_ends
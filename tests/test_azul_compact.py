@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from Azul import AzulGame
+from AzulCompact import CompactAzulGame, CompactAzulState, BOARD_PATTERN, calculate_score, bounties
+
+
+def merged_moves(state, legal_moves):
+    """
+    Moves of the dict-based AzulGame with every factory replaced by the first factory holding the same
+    tiles, as CompactAzulGame lists the moves of identical factories only once.
+    """
+
+    first_factory = {}
+    for i, factory in enumerate(state.factories):
+        first_factory.setdefault(tuple(sorted(factory)), i)
+    return {(first_factory[tuple(sorted(state.factories[f]))] if f != -1 else -1, color, row)
+            for f, color, row in legal_moves}
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_playout_matches_dict_engine(seed):
+    # sampled_draw draws exactly the tiles of CompactAzulGame.draw_tiles from the same rng
+    game = AzulGame(rng=random.Random(seed), sampled_draw=True)
+    compact_game = CompactAzulGame()
+    compact_rng = random.Random(seed)
+    move_rng = random.Random(seed + 1000)
+
+    state = game.get_initial_state()
+    compact = compact_game.get_initial_state()
+    rounds = 0
+    while True:
+        game.draw_tiles(state)
+        compact_game.draw_tiles(compact, compact_rng)
+        assert CompactAzulState.from_state(state).key() == compact.key()
+
+        while not game.check_end_of_round(state):
+            assert not compact_game.check_end_of_round(compact)
+            legal_moves = game.get_legal_moves(state)
+            compact_moves = compact_game.get_legal_moves(compact)
+            assert len(set(compact_moves)) == len(compact_moves)
+            assert set(compact_moves) == merged_moves(state, legal_moves)
+
+            move = move_rng.choice(legal_moves)
+            state.move_tiles(*move)
+            compact.move_tiles(*move)
+            assert CompactAzulState.from_state(state).key() == compact.key()
+            assert compact.hash == compact.compute_hash()
+        assert compact_game.check_end_of_round(compact)
+
+        state.move_tiles_to_wall()
+        compact.move_tiles_to_wall()
+        rounds += 1
+        assert compact.scores == [player['score'] for player in state.players]
+        assert CompactAzulState.from_state(state).key() == compact.key()
+        assert compact_game.check_end_of_game(compact) == game.check_end_of_game(state)
+        if game.check_end_of_game(state):
+            break
+        assert rounds < 50
+
+    assert compact_game.get_result(compact) == game.get_result(state)
+
+
+def test_round_trip_through_dict_state():
+    game = CompactAzulGame()
+    rng = random.Random(7)
+    state = game.get_initial_state()
+    game.draw_tiles(state, rng)
+    for _ in range(5):
+        state.move_tiles(*game.random_player(state, rng))
+    assert CompactAzulState.from_state(state.to_state()).key() == state.key()
+
+
+def test_dict_scoring_matches_wall_masks():
+    rng = random.Random(3)
+    for _ in range(300):
+        wall = rng.getrandbits(25)
+        board = [[BOARD_PATTERN[row][col] if wall >> (row * 5 + col) & 1 else '' for col in range(5)]
+                 for row in range(5)]
+        player = {'board': board, 'score': 0}
+        AzulGame.bounties(player)
+        assert player['score'] == bounties(wall)
+        row, col = rng.randrange(5), rng.randrange(5)
+        board[row][col] = BOARD_PATTERN[row][col]
+        assert AzulGame.calculate_score(player, row, col) == calculate_score(wall | 1 << (row * 5 + col), row, col)
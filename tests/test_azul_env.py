@@ -0,0 +1,43 @@
+import random
+
+from Azul import AzulGame
+from AzulEnv import AzulEnv
+
+
+def test_seeded_reset_leaves_the_random_module_alone():
+    random.seed(123)
+    expected = [random.random() for _ in range(5)]
+
+    random.seed(123)
+    env = AzulEnv()
+    env.reset(seed=7)
+    assert [random.random() for _ in range(5)] == expected
+
+
+def test_seeded_reset_is_reproducible():
+    first, second = AzulEnv(), AzulEnv()
+    obs, mask = first.reset(seed=7)
+    random.random()
+    other_obs, other_mask = second.reset(seed=7)
+    assert (obs == other_obs).all() and (mask == other_mask).all()
+    assert first.state.factories == second.state.factories
+
+
+def test_seeded_reset_does_not_change_the_shared_game():
+    game = AzulGame(rng=random.Random(1))
+    seeded, other = AzulEnv(game), AzulEnv(game)
+    seeded.reset(seed=7)
+    assert game.rng is not seeded.rng
+
+    # The shared game keeps drawing from its own stream, as a game that was never reseeded does
+    reference = AzulEnv(AzulGame(rng=random.Random(1)))
+    other.reset()
+    reference.reset()
+    assert other.state.factories == reference.state.factories
+
+    # Unseeded resets of the seeded env keep using its own stream
+    seeded.reset()
+    replay = AzulEnv()
+    replay.reset(seed=7)
+    replay.reset()
+    assert seeded.state.factories == replay.state.factories
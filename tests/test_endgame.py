@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from Azul import AzulGame
+from AzulCompact import CompactAzulGame
+from Endgame import EndgameSolver, remaining_picks
+from MCTS import MCTS
+
+
+def near_round_end_state(seed, picks):
+    game = CompactAzulGame()
+    rng = random.Random(seed)
+    state = game.get_initial_state()
+    game.draw_tiles(state, rng)
+    while remaining_picks(state) > picks:
+        state.move_tiles(*game.random_player(state, rng))
+    return state
+
+
+def brute_force(state):
+    """
+    Final lead of the player to move, without pruning or caching
+    """
+    legal_moves = CompactAzulGame.get_legal_moves(state)
+    if not legal_moves:
+        record = state.make_move_tiles_to_wall()
+        player = state.current_player
+        value = state.scores[player] - state.scores[1 - player]
+        state.unmake_move(record)
+        return value
+    values = []
+    for move in legal_moves:
+        record = state.make_move(*move)
+        values.append(-brute_force(state))
+        state.unmake_move(record)
+    return max(values)
+
+
+def move_value(state, move):
+    record = state.make_move(*move)
+    value = -brute_force(state)
+    state.unmake_move(record)
+    return value
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_solver_matches_brute_force(seed):
+    state = near_round_end_state(seed, 4)
+    # One solver for all the positions, so later solves start from the bounds of earlier ones
+    solver = EndgameSolver()
+    for _ in range(3):
+        move, value = solver.solve(state)
+        assert value == brute_force(state)
+        assert move_value(state, move) == value
+        if not CompactAzulGame.get_legal_moves(state):
+            break
+        state.make_move(*CompactAzulGame.get_legal_moves(state)[0])
+        if not CompactAzulGame.get_legal_moves(state):
+            break
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_search_and_anytime_search_play_the_solved_move(seed):
+    state = near_round_end_state(seed, 3)
+    best = brute_force(state)
+
+    mcts = MCTS(AzulGame(), rng=random.Random(seed), endgame_picks=3)
+    move, _ = mcts.search(state, num_simulations=100)
+    assert mcts.solved
+    assert move_value(state, move) == best
+
+    mcts = MCTS(AzulGame(), rng=random.Random(seed), endgame_picks=3)
+    result = mcts.search_anytime(state, max_seconds=10)
+    assert mcts.solved
+    assert result.stop_reason == 'solved'
+    assert result.simulations == 0
+    assert move_value(state, result.best_move) == best
+
+
+def test_anytime_search_runs_the_tree_above_endgame_picks():
+    state = near_round_end_state(0, 6)
+    mcts = MCTS(AzulGame(), rng=random.Random(0), endgame_picks=2)
+    result = mcts.search_anytime(state, max_simulations=200, stop_when_decided=False)
+    assert not mcts.solved
+    assert result.stop_reason == 'budget'
+    assert result.best_move in CompactAzulGame.get_legal_moves(state)
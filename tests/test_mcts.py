@@ -0,0 +1,157 @@
+import random
+
+import pytest
+
+from Azul import AzulGame
+from AzulCompact import CompactAzulGame
+from Endgame import remaining_picks
+from MCTS import MCTS, ChanceNode
+
+
+def first_round_state(seed=0, num_moves=0):
+    game = CompactAzulGame()
+    rng = random.Random(seed)
+    state = game.get_initial_state()
+    game.draw_tiles(state, rng)
+    for _ in range(num_moves):
+        state.move_tiles(*game.random_player(state, rng))
+    return state
+
+
+@pytest.mark.parametrize('max_seconds', [0, 1e-9, -1.0])
+def test_anytime_search_returns_a_move_past_its_deadline(max_seconds):
+    state = first_round_state()
+    mcts = MCTS(AzulGame(), rng=random.Random(0))
+    result = mcts.search_anytime(state, max_seconds=max_seconds)
+    assert result.best_move in CompactAzulGame.get_legal_moves(state)
+    assert result.simulations >= 1
+    assert result.stop_reason == 'deadline'
+
+
+def test_anytime_search_without_simulations_falls_back_to_a_legal_move():
+    state = first_round_state()
+    mcts = MCTS(AzulGame(), rng=random.Random(0))
+    result = mcts.search_anytime(state, max_simulations=0)
+    assert result.simulations == 0
+    assert result.best_move in CompactAzulGame.get_legal_moves(state)
+
+
+def test_interrupt_before_the_search_stops_it():
+    state = first_round_state()
+    mcts = MCTS(AzulGame(), rng=random.Random(0))
+    mcts.interrupt()
+    result = mcts.search_anytime(state, max_seconds=60)
+    assert result.stop_reason == 'interrupted'
+    assert result.simulations >= 1
+    assert result.best_move in CompactAzulGame.get_legal_moves(state)
+
+    # The interrupt is used up: the next search runs to its budget
+    result = mcts.search_anytime(state, max_simulations=50, stop_when_decided=False)
+    assert result.stop_reason == 'budget'
+    assert result.simulations == 50
+
+
+def near_round_end_state(seed, picks=2):
+    game = CompactAzulGame()
+    rng = random.Random(seed)
+    state = game.get_initial_state()
+    game.draw_tiles(state, rng)
+    while remaining_picks(state) > picks:
+        state.move_tiles(*game.random_player(state, rng))
+    return state
+
+
+def most_visited_chance_node(root):
+    """
+    (moves, ChanceNode) of the most visited sampled end of round at most two plies below root
+    """
+    found = []
+    for move, child in zip(root.moves, root.children):
+        if isinstance(child, ChanceNode):
+            found.append(([move], child))
+        else:
+            found.extend(([move, next_move], grandchild) for next_move, grandchild in zip(child.moves, child.children)
+                         if isinstance(grandchild, ChanceNode))
+    return max(found, key=lambda entry: entry[1].visits)
+
+
+def assert_moves_match(node, state, depth):
+    assert set(node.moves) == set(CompactAzulGame.get_legal_moves(state))
+    if depth == 0 or isinstance(node, ChanceNode):
+        return
+    for move, child in zip(node.moves, node.children):
+        record = state.make_move(*move)
+        if not isinstance(child, ChanceNode):
+            assert_moves_match(child, state, depth - 1)
+        state.unmake_move(record)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_tree_is_reused_across_a_refill(seed):
+    engine = CompactAzulGame()
+    mcts = MCTS(AzulGame(), rng=random.Random(0), chance_nodes=True, reuse_tree=True)
+    mcts.search(near_round_end_state(seed), num_simulations=2000)
+    moves, chance = most_visited_chance_node(mcts.root)
+    index = max(range(len(chance.children)), key=lambda i: chance.children[i].visits)
+    subtree = chance.children[index]
+
+    # The game draws the same tiles as the sampled refill, with the factories in another order
+    state = mcts.root_state.clone()
+    for move in moves:
+        state.make_move(*move)
+    state.move_tiles_to_wall()
+    engine.make_refill(state, chance.refills[index])
+    state.factories = state.factories[20:] + state.factories[:20]
+    state.hash = state.compute_hash()
+
+    visits = subtree.visits
+    move, _ = mcts.search(state, num_simulations=visits + 100)
+    assert mcts.reused_visits == visits
+    assert mcts.root is subtree
+    assert move in engine.get_legal_moves(state)
+    assert_moves_match(subtree, state.clone(), 2)
+
+
+def test_unsampled_refill_starts_a_fresh_tree():
+    engine = CompactAzulGame()
+    mcts = MCTS(AzulGame(), rng=random.Random(0), chance_nodes=True, reuse_tree=True)
+    mcts.search(near_round_end_state(0), num_simulations=2000)
+    moves, chance = most_visited_chance_node(mcts.root)
+
+    state = mcts.root_state.clone()
+    for move in moves:
+        state.make_move(*move)
+    state.move_tiles_to_wall()
+    # A refill drawn with another rng, which none of the sampled ones match
+    sampled = {refill[:4] for refill in chance.refills}
+    rng = random.Random(1)
+    while True:
+        refilled = state.clone()
+        engine.draw_tiles(refilled, rng)
+        probe = refilled.clone()
+        engine.sort_factories(probe)
+        if engine.refill_of(probe)[:4] not in sampled:
+            break
+
+    mcts.search(refilled, num_simulations=100)
+    assert mcts.reused_visits == 0
+
+
+def test_instrumented_search_counts_the_refill_children():
+    mcts = MCTS(AzulGame(), rng=random.Random(0), chance_nodes=True, instrument=True)
+    root = mcts.build_tree(near_round_end_state(0), num_simulations=1000)
+
+    nodes = refill_children = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ChanceNode):
+            refill_children += len(node.children)
+        nodes += len(node.children)
+        stack.extend(node.children)
+    stats = mcts.stats
+    assert refill_children > 0
+    assert stats.nodes_allocated == nodes
+    assert sum(entry[0] for entry in stats.legal_moves.values()) == nodes
+    assert stats.simulations == 1000
+    assert stats.times['expand'] > 0
@@ -0,0 +1,49 @@
+import asyncio
+import json
+import random
+
+from Arena import MCTSAgent, RandomAgent
+from Azul import AzulGame
+from MoveServer import MoveServer
+
+
+def request_line(**request):
+    return json.dumps(request).encode() + b'\n'
+
+
+def first_round_state():
+    game = AzulGame(rng=random.Random(0))
+    state = game.get_initial_state()
+    game.draw_tiles(state)
+    return game, state
+
+
+def test_requests_that_are_not_objects_get_an_error():
+    async def run():
+        server = MoveServer({'random': RandomAgent()})
+        return [await server.handle_request(line) for line in (b'[]\n', b'1\n', b'"x"\n', b'null\n', b'{\n')]
+
+    for response in asyncio.run(run()):
+        assert response == {'id': None, 'error': "invalid JSON"}
+
+
+def test_expired_deadline_still_gets_a_move():
+    game, state = first_round_state()
+    legal_moves = [list(move) for move in game.get_legal_moves(state)]
+
+    async def run():
+        server = MoveServer({'mcts': MCTSAgent(num_simulations=200)}, num_workers=1)
+        await server.start(port=0)
+        try:
+            # The first request starts the worker process
+            warm_up = await server.handle_request(request_line(id=0, agent='mcts', state=state.to_dict(), seed=1))
+            responses = [await server.handle_request(request_line(id=i, agent='mcts', state=state.to_dict(),
+                                                                  deadline_ms=deadline_ms, seed=1))
+                         for i, deadline_ms in enumerate([0, 0.001, -5], 1)]
+        finally:
+            await server.stop()
+        return [warm_up] + responses
+
+    for response in asyncio.run(run()):
+        assert 'error' not in response
+        assert response['move'] in legal_moves
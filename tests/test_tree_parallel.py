@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+from Azul import AzulGame
+from TreeParallelMCTS import TreeParallelMCTS
+
+
+@pytest.mark.parametrize('backend', ['thread', 'process'])
+def test_shared_tree_statistics_are_consistent(backend):
+    game = AzulGame(rng=random.Random(0))
+    state = game.get_initial_state()
+    game.draw_tiles(state)
+    mcts = TreeParallelMCTS(game, num_workers=4, backend=backend, seed=1)
+    num_simulations = 2000
+    move, _ = mcts.search(state, num_simulations=num_simulations)
+
+    tree = mcts.tree
+    assert move in game.get_legal_moves(state)
+    assert mcts.simulations == num_simulations
+    assert tree.visits[0] == num_simulations
+    assert all(tree.virtual[node] == 0 for node in range(tree.num_nodes.value))
+    # Every simulation through the root went down one of its children
+    first = tree.first_child[0]
+    assert sum(tree.visits[child] for child in range(first, first + tree.num_children[0])) == num_simulations
+
+
+@pytest.mark.parametrize('budget', [{'num_simulations': 0}, {'simulation_seconds': 0}])
+def test_search_without_simulations_falls_back_to_a_legal_move(budget):
+    game = AzulGame(rng=random.Random(0))
+    state = game.get_initial_state()
+    game.draw_tiles(state)
+    mcts = TreeParallelMCTS(game, num_workers=4, backend='thread', seed=1)
+    move, _ = mcts.search(state, **budget)
+    assert mcts.simulations == 0
+    assert move in game.get_legal_moves(state)